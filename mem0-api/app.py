@@ -3,25 +3,50 @@ import time
 import sys
 import os
 import asyncio
+import json
+from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, APIRouter, Depends, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from typenv import Env
-from pydantic import BaseModel, Field
-from typing import Dict, Union, List
-from dependencies import get_memory_id, MemoryHistory, authorize, get_mem0
+from pydantic import BaseModel, Field, field_validator
+from typing import Dict, Union, List, Callable, Awaitable, Any, Literal, Optional
+from dependencies import (
+    get_memory_id, authorize, get_mem0, get_executor, reset_mem0,
+    get_job_queue, get_job_id, get_result_cache, peek_mem0, warm_up_components, get_keyword_index, list_tenants,
+    get_reranker, get_update_buffer, load_mem0, serving_tenant, shutdown_executor
+)
 from response import SuccessfulResponse, ErrorResponse
-from mem0_config import vector_config, llm_config, embedding_config, graph_config
-from errors.exception import UnauthorizedException, DatabaseConnectionError
+from mem0_config import (
+    vector_config, llm_config, embedding_config, graph_config, graph_stage_config, batch_config, job_config,
+    archive_config, warmup_config, hybrid_search_config, payload_index_config, raw_store_config,
+    bulk_delete_config, compaction_config, rerank_config
+)
+from errors.exception import UnauthorizedException, DatabaseConnectionError, ErrorHttpException, InvalidExportError, ServiceOverloadedError, ServiceTimeoutError, TenantError, UnindexedFilterError
 from errors.handler import (
     unauthorized_exception_handler, 
     qdrant_client_unexpected_handler, 
     database_connection_error_handler, 
     database_request_error_handler,
-    response_handling_exception_handler
+    response_handling_exception_handler,
+    service_unavailable_handler,
+    tenant_error_handler,
+    unindexed_filter_error_handler
 )
 from qdrant_client.http.exceptions import UnexpectedResponse, ResponseHandlingException
+from cache import CachedEmbedder, CachedLLM, SCOPE_KEYS
+from payload_index import check_filters, collection_status
+from retrieval import age_results, scroll_memories, search_filters, search_batch
+from bulk_delete import count_memories, delete_page
+from compaction import PeriodicTask, Throttle, check_ttl, compact, with_expiry
+from update_buffer import apply_updates
+from tenancy import RequestScopeMiddleware, current_tenant
+import archive
+from components import find_component
+from warmup import Readiness, warm_up
+from metrics import ServiceCollector, metrics_middleware, metrics_response, register_service_collector
 
 ROOT_DIR = Path(__file__).parent.parent
 
@@ -29,7 +54,27 @@ env = Env()
 # read .env from project root directory
 env.read_env(os.path.join(ROOT_DIR, '.env'))
 
+readiness = Readiness()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_job_workers()
+    warm_up_task = asyncio.create_task(warm_up(
+        readiness,
+        warm_up_components,
+        initial_delay=warmup_config["retry_initial_delay"],
+        max_delay=warmup_config["retry_max_delay"]
+    ))
+    yield
+    warm_up_task.cancel()
+    stop_job_workers()
+    # Requests still waiting for a pool thread get their result before the process exits
+    await run_in_threadpool(shutdown_executor)
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Mem0 to API",
     description="A RESTful API service for managing longterm memory storage and retrieval operations. This API provides endpoints for storing, updating, searching, and managing longterm memory entries with support for user-specific and agent-specific operations.",
     servers=[
@@ -54,9 +99,246 @@ class StoreMemoryData(BaseModel):
     user_id: Union[str, None] = Field(default=None, description="Optional identifier for the user associated with this memory. Used for user-specific memory management and retrieval. Example: 'user_123'")
     agent_id: Union[str, None] = Field(default=None, description="Optional identifier for the AI agent associated with this memory. Useful for tracking which AI agent generated or processed this memory. Example: 'agent_gpt4'")
     run_id: Union[str, None] = Field(default=None, description="Optional identifier for tracking specific execution runs. Helps in grouping related memories from the same interaction session. Example: 'run_20230615_001'")
-    metadata: Union[dict, None] = Field(default=None, description="Optional metadata to store with the memory. Can include any additional structured information about the memory. Example: {'source': 'chat', 'importance': 'high', 'tags': ['performance', 'code'], 'context': {'session_id': '123', 'timestamp': '2023-06-15T10:30:00Z'}}")
+    metadata: Union[dict, None] = Field(default=None, description="Optional metadata to store with the memory. Can include any additional structured information about the memory. A positive 'ttl_seconds' makes the memory expire after that many seconds. Example: {'source': 'chat', 'importance': 'high', 'tags': ['performance', 'code'], 'context': {'session_id': '123', 'timestamp': '2023-06-15T10:30:00Z'}}")
     filters: Union[Dict, None] = Field(default=None, description="Optional filtering criteria for memory retrieval. Supports complex nested structures for advanced filtering. Example: {'category': 'technical', 'date': '2023-06-15', 'tags': {'$in': ['performance', 'code']}, 'importance': {'$gte': 'medium'}, 'custom_field': {'$exists': true}}")
     prompt: Union[str, None] = Field(default=None, description="Optional prompt text that generated this memory. Useful for tracking the context that led to this memory's creation. Example: 'How can I improve my code performance?'")
+    graph: Union[bool, None] = Field(default=None, description="Whether to also extract entities and relations into the graph store. Defaults to the deployment setting; false skips the graph stage for this memory. Example: false")
+    async_mode: bool = Field(default=False, description="When true, the memory is queued and stored in the background. The response contains a job_id whose status and result can be fetched from /jobs/{job_id}. Example: true")
+    infer: bool = Field(default=True, description="When false, `data` is stored as-is as one memory: the LLM fact extraction and reconciliation are skipped, and so is the graph stage unless `graph` is true. Use it for facts that are already distilled. Example: false")
+    dedup_threshold: Union[float, None] = Field(default=None, ge=0, le=1, description="With infer=false: skip the memory if an existing memory in the same scope is at least this similar (0-1). 0 disables the check. Defaults to STORE_RAW_DEDUP_THRESHOLD. Example: 0.95")
+
+    @field_validator("metadata")
+    @classmethod
+    def validate_ttl(cls, metadata: Union[dict, None]) -> Union[dict, None]:
+        return check_ttl(metadata)
+
+
+def scope_of(user_id=None, agent_id=None, run_id=None, filters: Union[dict, None] = None) -> dict:
+    """Merge explicit user/agent/run ids with the ones given in filters, the way mem0 does."""
+    filters = filters or {}
+    return {
+        "user_id": user_id or filters.get("user_id"),
+        "agent_id": agent_id or filters.get("agent_id"),
+        "run_id": run_id or filters.get("run_id")
+    }
+
+
+def memory_scope(memory_id: str) -> dict:
+    """Return the user/agent/run ids stored with a memory, or an empty dict if it doesn't exist."""
+    memory = get_mem0().vector_store.get(vector_id=memory_id)
+    if memory is None:
+        return {}
+    return {key: memory.payload.get(key) for key in SCOPE_KEYS}
+
+
+def invalidate_results(user_id=None, agent_id=None, run_id=None):
+    """Drop cached search and listing results that a write to this scope may have changed."""
+    result_cache = get_result_cache()
+    if result_cache is not None:
+        result_cache.invalidate(user_id, agent_id, run_id)
+
+
+async def cached_result(key: str, scope: dict, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """Return the cached result for `key`, computing and caching it on a miss."""
+    result_cache = get_result_cache()
+    if result_cache is None:
+        return await compute()
+    result = result_cache.get(key)
+    if result is None:
+        scopes = result_cache.scopes(**scope)
+        # Snapshot before computing, so a write that lands meanwhile invalidates this entry
+        generation = result_cache.generation(scopes)
+        result = await compute()
+        result_cache.set(key, result, scopes, generation)
+    return result
+
+
+def add_memory(data: StoreMemoryData):
+    """Store a memory with mem0. Shared by /store, /store/batch and the background store jobs."""
+    mem0 = get_mem0()
+    data = data.model_copy(update={"metadata": with_expiry(data.metadata, compaction_config["default_ttl_seconds"])})
+    # Without inference the graph stage (which needs the LLM) only runs when asked for explicitly
+    with_graph = mem0.enable_graph and (data.graph is not False if data.infer else data.graph is True)
+    if data.infer and with_graph and not graph_stage_config["deferred"]:
+        # Vector and graph stages run side by side, as mem0 does by default
+        execute_results = mem0.add(
+            data.data,
+            user_id=data.user_id,
+            agent_id=data.agent_id,
+            run_id=data.run_id,
+            metadata=data.metadata,
+            filters=data.filters,
+            prompt=data.prompt
+        )
+    else:
+        execute_results = add_to_vector_store(mem0, data, with_graph)
+    invalidate_results(**scope_of(data.user_id, data.agent_id, data.run_id, data.filters))
+    return execute_results
+
+
+def add_to_vector_store(mem0, data: StoreMemoryData, with_graph: bool) -> dict:
+    """Run the vector stage of `Memory.add`, then the graph stage if requested.
+
+    The graph stage is queued as a background job unless GRAPH_STORE_DEFERRED is off, in which
+    case it runs after the vector write and its relations are returned.
+    """
+    metadata = dict(data.metadata or {})
+    filters = dict(data.filters or {})
+    for key in SCOPE_KEYS:
+        if getattr(data, key):
+            filters[key] = metadata[key] = getattr(data, key)
+    if not any(key in filters for key in SCOPE_KEYS):
+        raise ValueError("One of the filters: user_id, agent_id or run_id is required!")
+
+    messages = [{"role": "user", "content": data.data}]
+    if data.infer:
+        results = mem0._add_to_vector_store(messages, metadata, dict(filters))
+    else:
+        threshold = raw_store_config["dedup_threshold"] if data.dedup_threshold is None else data.dedup_threshold
+        results = insert_memory(mem0, data.data, metadata, filters, threshold)
+    execute_results = {"results": results, "relations": []}
+    if with_graph and not graph_stage_config["deferred"]:
+        execute_results["relations"] = mem0._add_to_graph(messages, dict(filters))
+    elif with_graph:
+        job_id = get_job_queue().enqueue("graph", {"messages": messages, "filters": filters}, current_tenant.get())
+        execute_results["graph_job"] = {"job_id": job_id, "status": "queued"}
+    return execute_results
+
+
+def insert_memory(mem0, text: str, metadata: dict, filters: dict, dedup_threshold: float) -> list:
+    """Store `text` as one memory without the LLM: embed it, insert it and record its history.
+
+    With a `dedup_threshold`, the text is skipped when the closest memory in the same scope is at
+    least that similar. The check is best effort: two concurrent inserts of one text can both pass it.
+    """
+    embedding = mem0.embedding_model.embed(text)
+    if dedup_threshold:
+        closest = mem0.vector_store.search(query=embedding, limit=1, filters=filters)
+        if closest and closest[0].score >= dedup_threshold:
+            return [{"id": str(closest[0].id), "memory": closest[0].payload.get("data"), "event": "NONE"}]
+    memory_id = mem0._create_memory(text, {text: embedding}, metadata)
+    return [{"id": memory_id, "memory": text, "event": "ADD"}]
+
+
+def run_graph_job(payload: dict):
+    mem0 = get_mem0()
+    if not mem0.enable_graph:
+        raise ValueError("The graph store is disabled")
+    relations = mem0._add_to_graph(payload["messages"], payload["filters"])
+    # Graph relations are part of /search and /retrieve results
+    invalidate_results(**scope_of(filters=payload["filters"]))
+    return relations
+
+
+def update_memory_by_id(memory_id: str, data: str):
+    mem0 = get_mem0()
+    memory = mem0.vector_store.get(vector_id=memory_id)
+    payload = memory.payload if memory is not None else {}
+    # What mem0.update does, but keeping the metadata of the memory (e.g. its expiry), which mem0 drops
+    mem0._update_memory(memory_id, data, {data: mem0.embedding_model.embed(data)}, dict(payload))
+    invalidate_results(**{key: payload.get(key) for key in SCOPE_KEYS})
+    return {"message": "Memory updated successfully!"}
+
+
+def apply_buffered_updates(tenant: Optional[str], updates: List[tuple]):
+    """Apply a flush of the update buffer to the collection of `tenant`."""
+    with serving_tenant(tenant):
+        payloads = apply_updates(get_mem0(), updates)
+        for scope in {tuple(payload.get(key) for key in SCOPE_KEYS) for payload in payloads}:
+            invalidate_results(*scope)
+
+
+def delete_memory_by_id(memory_id: str):
+    mem0 = get_mem0()
+    update_buffer = get_update_buffer()
+    if update_buffer is not None:
+        update_buffer.discard(current_tenant.get(), memory_id)
+    scope = memory_scope(memory_id) if get_result_cache() is not None else {}
+    execute_result = mem0.delete(memory_id=memory_id)
+    invalidate_results(**scope)
+    return execute_result
+
+
+def run_delete_job(payload: dict):
+    """Delete the memories matching `payload["filters"]` page by page, resuming after a restart.
+
+    The progress (memories found at the start, memories and history rows deleted so far) is saved
+    after every page and is part of the job status.
+    """
+    with serving_tenant(payload.get("tenant")):
+        mem0 = get_mem0()
+        filters = payload["filters"]
+        points_filter = mem0.vector_store._create_filter(filters)
+        job_queue = get_job_queue()
+        progress = job_queue.current_progress() or {
+            "total": count_memories(mem0, points_filter), "deleted": 0, "history_deleted": 0
+        }
+        job_queue.report_progress(progress)
+        while True:
+            memories, history = delete_page(mem0, points_filter, bulk_delete_config["page_size"])
+            if not memories:
+                break
+            progress["deleted"] += memories
+            progress["history_deleted"] += history
+            job_queue.report_progress(progress)
+            # Searches stop returning the deleted memories page by page
+            invalidate_results(**scope_of(filters=filters))
+        if mem0.enable_graph:
+            mem0.graph.delete_all(filters)
+            invalidate_results(**scope_of(filters=filters))
+        return progress
+
+
+def run_reset_job(payload: dict):
+    with serving_tenant(payload.get("tenant")):
+        reset_mem0()
+        result_cache = get_result_cache()
+        if result_cache is not None:
+            result_cache.clear()
+
+
+def run_compact_job(payload: dict):
+    """Run a compaction pass over the collection of `payload["tenant"]`, see compaction.compact."""
+    with serving_tenant(payload.get("tenant")):
+        job_queue = get_job_queue()
+        throttle = Throttle(compaction_config["duty_cycle"], busy=serving_requests)
+        progress = compact(get_mem0(), compaction_config, throttle, job_queue.report_progress)
+        if progress["expired"] or progress["merged"]:
+            result_cache = get_result_cache()
+            if result_cache is not None:
+                result_cache.clear()
+        return progress
+
+
+def serving_requests() -> bool:
+    """Whether this process is running or queueing store or search calls."""
+    stats = get_executor().stats()
+    return any(stats[pool]["running"] or stats[pool]["queued"] for pool in ("write", "search"))
+
+
+def schedule_compaction():
+    """Queue a compaction pass for the default collection and every tenant, unless one is pending.
+
+    Tenants are listed from their Qdrant collections, so idle and evicted tenants are compacted too.
+    """
+    job_queue = get_job_queue()
+    if job_queue.count("compact", "queued") or job_queue.count("compact", "running"):
+        return
+    for tenant in [None] + list_tenants():
+        job_queue.enqueue("compact", {"tenant": tenant}, tenant)
+
+
+def run_store_job(payload: dict):
+    with serving_tenant(payload.pop("tenant", None)):
+        return add_memory(StoreMemoryData(**payload))
+
+
+async def enqueue_store_job(data: StoreMemoryData) -> dict:
+    tenant = current_tenant.get()
+    job_id = await run_in_threadpool(
+        get_job_queue().enqueue, "store", {**data.model_dump(exclude={"async_mode"}), "tenant": tenant}, tenant
+    )
+    return {"job_id": job_id, "status": "queued"}
 
 
 @api_router.get("/authorized", description="Check authorization status")
@@ -70,21 +352,114 @@ def authorized(token=Depends(authorize)):
     response_model=SuccessfulResponse
 )
 async def store_memory(data: StoreMemoryData, token=Depends(authorize)):
-    mem0 = get_mem0()
-    execute_results = mem0.add(
-        data.data,
-        user_id=data.user_id,
-        agent_id=data.agent_id,
-        run_id=data.run_id,
-        metadata=data.metadata,
-        filters=data.filters,
-        prompt=data.prompt
-    )
+    if data.async_mode:
+        return JSONResponse(
+            content=SuccessfulResponse(data=await enqueue_store_job(data)).model_dump(),
+            status_code=status.HTTP_202_ACCEPTED
+        )
+    execute_results = await get_executor().run("write", add_memory, data)
     return SuccessfulResponse(
         data=execute_results
     )
 
 
+class StoreMemoryBatchData(BaseModel):
+    """Request model for storing several memory entries in one request.
+
+    Each entry is processed like a `/store` request. Entries are stored concurrently so that their
+    embeddings and vector upserts are coalesced into shared batches.
+    Learn more: https://docs.mem0.ai/api-reference/memory/batch-update
+    """
+    memories: List[StoreMemoryData] = Field(
+        min_length=1,
+        max_length=batch_config["store_max_items"],
+        description=f"The memories to store. Up to {batch_config['store_max_items']} entries per request."
+    )
+
+
+@api_router.post(
+    path="/store/batch",
+    description="Create several memories in one request. Returns one result per memory, in request order.",
+    response_model=SuccessfulResponse
+)
+async def store_memories_batch(data: StoreMemoryBatchData, token=Depends(authorize)):
+    executor = get_executor()
+    # Never queue more items than the write pool can run, so a large batch is not rejected as overload
+    concurrency = asyncio.Semaphore(executor.pools["write"].max_workers)
+
+    async def store_one(item: StoreMemoryData):
+        async with concurrency:
+            try:
+                if item.async_mode:
+                    return SuccessfulResponse(data=await enqueue_store_job(item)).model_dump()
+                execute_results = await executor.run("write", add_memory, item)
+                return SuccessfulResponse(data=execute_results).model_dump()
+            except ErrorHttpException as e:
+                return ErrorResponse(code=e.code, error=e.error, message=e.message).model_dump()
+            except ValueError as e:
+                return ErrorResponse(
+                    code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    error="ValueError",
+                    message=str(e)
+                ).model_dump()
+            except Exception as e:
+                return ErrorResponse.from_exception(e).model_dump()
+
+    results = await asyncio.gather(*[store_one(item) for item in data.memories])
+    return SuccessfulResponse(
+        data=results
+    )
+
+
+@api_router.get(
+    path="/jobs/stats",
+    description="Get the number of background jobs of the tenant per kind and status, e.g. the backlog of deferred graph writes.",
+    dependencies=[Depends(authorize)]
+)
+async def get_job_stats():
+    stats = await run_in_threadpool(get_job_queue().stats, current_tenant.get())
+    return SuccessfulResponse(
+        data=stats
+    )
+
+
+@api_router.get(
+    path="/admin/collection",
+    description="Get the size of the vector collection and the status of its payload indexes.",
+    dependencies=[Depends(authorize)]
+)
+async def get_collection_status():
+    status_data = await get_executor().run(
+        "admin", collection_status, (await load_mem0()).vector_store, payload_index_config["fields"]
+    )
+    return SuccessfulResponse(
+        data=status_data
+    )
+
+
+@api_router.post(
+    path="/admin/compact",
+    description="Queue a compaction pass: delete expired memories and merge near-duplicates. Returns a job_id.",
+    dependencies=[Depends(authorize)]
+)
+async def compact_memories():
+    return await enqueue_admin_job("compact", {"tenant": current_tenant.get()})
+
+
+@api_router.get(
+    path="/jobs/{job_id}",
+    description="Get the status, progress and result of a background job, such as an asynchronous store or a bulk deletion."
+)
+async def get_job(
+        job_id: str = Depends(get_job_id),
+        token=Depends(authorize)
+):
+    job = await run_in_threadpool(get_job_queue().get, job_id)
+    return SuccessfulResponse(
+        data=job
+    )
+
+
 class UpdateMemoryData(BaseModel):
     """Request model for updating a memory entry.
     
@@ -105,8 +480,20 @@ async def update_memory(
         memory_id: str = Depends(get_memory_id),
         token=Depends(authorize)
 ):
-    mem0 = get_mem0()
-    execute_result = mem0.update(
+    update_buffer = get_update_buffer()
+    if update_buffer is not None:
+        # The flush skips deleted memories, so make sure this one still exists before answering "queued"
+        mem0 = await load_mem0()
+        if await get_executor().run("search", mem0.vector_store.get, vector_id=memory_id) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Memory {memory_id} not found')
+        # Applied within UPDATE_BUFFER_WINDOW_MS, together with the other pending updates
+        await run_in_threadpool(update_buffer.submit, current_tenant.get(), memory_id, data.data)
+        return SuccessfulResponse(
+            data={"message": "Memory update queued"}
+        )
+    execute_result = await get_executor().run(
+        "write",
+        update_memory_by_id,
         memory_id=memory_id,
         data=data.data
     )
@@ -127,6 +514,42 @@ class SearchMemoryData(BaseModel):
     run_id: Union[str, None] = Field(default=None, description="Filter results by specific run ID. Useful for retrieving memories from a specific interaction session. Example: 'run_20230615_001'")
     limit: Union[int, None] = Field(default=10, ge=1, le=100, description="Maximum number of results to return. Range: 1-100. Default: 10. Example: 20")
     filters: Union[dict, None] = Field(default=None, description="Additional filtering criteria for the search. Supports complex nested queries with operators. Example: {'category': 'technical', 'date_range': {'$gte': '2023-01-01', '$lte': '2023-12-31'}, 'importance': {'$in': ['high', 'medium']}, 'tags': {'$all': ['performance', 'optimization']}, 'custom_field': {'$exists': true}}")
+    mode: Union[Literal["dense", "hybrid"], None] = Field(default=None, description="'dense' for embedding similarity only, 'hybrid' to also match exact terms (ids, codes, names) with the keyword index and fuse both rankings. Defaults to HYBRID_SEARCH_DEFAULT_MODE when hybrid search is enabled, 'dense' otherwise.")
+    dense_weight: Union[float, None] = Field(default=None, ge=0, description="Hybrid mode: weight of the dense ranking in the fusion. Defaults to HYBRID_SEARCH_DENSE_WEIGHT.")
+    sparse_weight: Union[float, None] = Field(default=None, ge=0, description="Hybrid mode: weight of the keyword ranking in the fusion. Defaults to HYBRID_SEARCH_SPARSE_WEIGHT.")
+    rerank: Union[Literal["none", "cross-encoder", "mmr"], None] = Field(default=None, description="Re-order the best RERANK_CANDIDATES results before keeping `limit` of them: 'cross-encoder' rescores them with a local cross-encoder model (scores are its relevance scores), 'mmr' prefers relevant memories that differ from each other. Defaults to RERANK_DEFAULT_MODE.")
+
+
+def check_search_filters(data: SearchMemoryData):
+    """Apply PAYLOAD_INDEX_FILTER_POLICY to the fields a search filters on."""
+    filters = {**(data.filters or {}), **{key: value for key, value in scope_of(data.user_id, data.agent_id, data.run_id).items() if value}}
+    check_filters(filters, payload_index_config["fields"], payload_index_config["filter_policy"])
+
+
+def hybrid_options(data: SearchMemoryData) -> Optional[dict]:
+    """Return the fusion options of a hybrid search, or None for a dense search."""
+    if data.mode is None and not hybrid_search_config["enabled"]:
+        return None
+    if (data.mode or hybrid_search_config["default_mode"]) != "hybrid":
+        return None
+    if not hybrid_search_config["enabled"]:
+        raise ValueError("Hybrid search is disabled. Set HYBRID_SEARCH_ENABLED=true to enable it.")
+    return {
+        "dense_weight": hybrid_search_config["dense_weight"] if data.dense_weight is None else data.dense_weight,
+        "sparse_weight": hybrid_search_config["sparse_weight"] if data.sparse_weight is None else data.sparse_weight,
+        "rrf_k": hybrid_search_config["rrf_k"],
+        "candidates": hybrid_search_config["candidates"],
+    }
+
+
+def rerank_options(data: SearchMemoryData) -> Optional[dict]:
+    """Return the rerank options of a search, or None when its results are kept in search order."""
+    mode = data.rerank or rerank_config["default_mode"]
+    if mode == "none":
+        return None
+    if mode not in ("cross-encoder", "mmr"):
+        raise ValueError(f"Unknown rerank mode '{mode}'. Use 'none', 'cross-encoder' or 'mmr'.")
+    return {"mode": mode, "candidates": rerank_config["candidates"], "mmr_lambda": rerank_config["mmr_lambda"]}
 
 
 @api_router.post(
@@ -137,25 +560,123 @@ class SearchMemoryData(BaseModel):
 async def search_memories(
         data: SearchMemoryData
 ):
-    mem0 = get_mem0()
-    memories = mem0.search(
-        **data.model_dump()
+    mem0 = await load_mem0()
+    check_search_filters(data)
+    try:
+        hybrid = hybrid_options(data)
+        rerank = rerank_options(data)
+        if hybrid or rerank:
+            filters = search_filters(data.user_id, data.agent_id, data.run_id, data.filters)
+    except ValueError as e:
+        return JSONResponse(
+            content=ErrorResponse(
+                code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                error="ValueError",
+                message=str(e)
+            ).model_dump(),
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+
+    async def search():
+        if hybrid or rerank:
+            results = await get_executor().run(
+                "search", search_batch, mem0, [(data.query, filters, data.limit, hybrid, rerank)],
+                get_keyword_index(mem0), get_reranker()
+            )
+            return age_results(results[0], compaction_config["recency_half_life_days"])
+        results = await get_executor().run(
+            "search",
+            mem0.search,
+            **data.model_dump(include={"query", "user_id", "agent_id", "run_id", "limit", "filters"})
+        )
+        return age_results(results, compaction_config["recency_half_life_days"])
+
+    memories = await cached_result(
+        "search:" + json.dumps(data.model_dump(), sort_keys=True, default=str),
+        scope_of(data.user_id, data.agent_id, data.run_id, data.filters),
+        search
     )
     return SuccessfulResponse(
         data=memories
     )
 
 
+class SearchMemoryBatchData(BaseModel):
+    """Request model for running several searches in one request.
+
+    All queries are embedded in one model batch and sent to the vector database in one batch request.
+    """
+    searches: List[SearchMemoryData] = Field(
+        min_length=1,
+        max_length=batch_config["search_max_queries"],
+        description=f"The searches to run. Up to {batch_config['search_max_queries']} per request."
+    )
+
+
+@api_router.post(
+    path="/search/batch",
+    description="Run several searches in one request. Returns one result per search, in request order.",
+    dependencies=[Depends(authorize)]
+)
+async def search_memories_batch(data: SearchMemoryBatchData):
+    result_cache = get_result_cache()
+    results: List[Any] = [None] * len(data.searches)
+    pending = []
+    for i, search in enumerate(data.searches):
+        key = "search:" + json.dumps(search.model_dump(), sort_keys=True, default=str)
+        cached = result_cache.get(key) if result_cache is not None else None
+        if cached is not None:
+            results[i] = SuccessfulResponse(data=cached).model_dump()
+            continue
+        try:
+            check_search_filters(search)
+            filters = search_filters(search.user_id, search.agent_id, search.run_id, search.filters)
+            hybrid = hybrid_options(search)
+            rerank = rerank_options(search)
+        except ErrorHttpException as e:
+            results[i] = ErrorResponse(code=e.code, error=e.error, message=e.message).model_dump()
+            continue
+        except ValueError as e:
+            results[i] = ErrorResponse(
+                code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                error="ValueError",
+                message=str(e)
+            ).model_dump()
+            continue
+        scopes = result_cache.scopes(**scope_of(search.user_id, search.agent_id, search.run_id, search.filters)) if result_cache is not None else None
+        # Snapshot before searching, so a write that lands meanwhile invalidates these entries
+        generation = result_cache.generation(scopes) if result_cache is not None else None
+        pending.append((i, key, scopes, generation, (search.query, filters, search.limit, hybrid, rerank)))
+
+    if pending:
+        mem0 = await load_mem0()
+        memories = await get_executor().run(
+            "search", search_batch, mem0, [search for _, _, _, _, search in pending], get_keyword_index(mem0),
+            get_reranker()
+        )
+        for (i, key, scopes, generation, _), result in zip(pending, memories):
+            result = age_results(result, compaction_config["recency_half_life_days"])
+            if result_cache is not None:
+                result_cache.set(key, result, scopes, generation)
+            results[i] = SuccessfulResponse(data=result).model_dump()
+
+    return SuccessfulResponse(
+        data=results
+    )
+
+
 @api_router.get(
     path="/retrieve",
-    description="List all memories.",
+    description="List all memories, page by page or as an NDJSON stream.",
     dependencies=[Depends(authorize)]
 )
 async def retrieve_memories(
         user_id: Union[str, None] = None,
         agent_id: Union[str, None] = None,
         run_id: Union[str, None] = None,
-        limit: Union[int, None] = 100
+        limit: Union[int, None] = 100,
+        cursor: Union[str, None] = None,
+        stream: bool = False
 ):
     """Retrieve all memories with optional filtering by user, agent, or run ID.
     
@@ -163,21 +684,67 @@ async def retrieve_memories(
     - user_id: Optional filter to retrieve memories for a specific user
     - agent_id: Optional filter to retrieve memories created by a specific AI agent
     - run_id: Optional filter to retrieve memories from a specific execution run
-    - limit: Maximum number of memories to return (default: 100)
+    - limit: Maximum number of memories to return per page (default: 100)
+    - cursor: The `next_cursor` of the previous page, to continue listing from there
+    - stream: Stream all remaining memories as NDJSON (one memory per line), fetched `limit` at a time
     """
-    mem0 = get_mem0()
-    memories = mem0.get_all(
-        user_id=user_id,
-        agent_id=agent_id,
-        run_id=run_id,
-        limit=limit
-    )
+    filters = {key: value for key, value in scope_of(user_id, agent_id, run_id).items() if value}
+    limit = limit or 100
+
+    try:
+        if stream:
+            # Fetch the first page before streaming, so bad cursors and overload still get a proper status code
+            mem0 = await load_mem0()
+            first_page = await get_executor().run("search", scroll_memories, mem0, filters, limit, cursor)
+            return StreamingResponse(
+                stream_memories(mem0, first_page, filters, limit), media_type="application/x-ndjson"
+            )
+
+        memories = await cached_result(
+            "retrieve:" + json.dumps([user_id, agent_id, run_id, limit, cursor]),
+            scope_of(user_id, agent_id, run_id),
+            lambda: get_executor().run("search", list_memories, filters, limit, cursor)
+        )
+    except ValueError as e:
+        return JSONResponse(
+            content=ErrorResponse(
+                code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                error="InvalidCursorError",
+                message=str(e)
+            ).model_dump(),
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
 
     return SuccessfulResponse(
         data=memories
     )
 
 
+def list_memories(filters: dict, limit: int, cursor: Union[str, None]) -> dict:
+    mem0 = get_mem0()
+    memories, next_cursor = scroll_memories(mem0, filters, limit, cursor)
+    result = {"results": memories, "next_cursor": next_cursor}
+    # Graph relations aren't paginated, so they are only returned with the first page
+    if mem0.enable_graph and cursor is None:
+        result["relations"] = mem0.graph.get_all(filters, limit)
+    return result
+
+
+async def stream_memories(mem0, first_page: tuple, filters: dict, limit: int):
+    memories, cursor = first_page
+    while True:
+        for memory in memories:
+            yield json.dumps(memory) + "\n"
+        if cursor is None:
+            return
+        try:
+            memories, cursor = await get_executor().run("search", scroll_memories, mem0, filters, limit, cursor)
+        except Exception as e:
+            # The status line is already sent, so report the failure as the last line of the stream
+            yield json.dumps(ErrorResponse.from_exception(e).model_dump(), default=str) + "\n"
+            return
+
+
 @api_router.get(
     path="/retrieve/{memory_id}",
     description="Get the history of changes for a memory by ID."
@@ -186,8 +753,8 @@ async def retrieve_memory(
         memory_id: str = Depends(get_memory_id),
         token=Depends(authorize)
 ):
-    mem0 = get_mem0()
-    memory = mem0.history(memory_id=memory_id)
+    mem0 = await load_mem0()
+    memory = await get_executor().run("search", mem0.history, memory_id=memory_id)
     return SuccessfulResponse(
         data=memory
     )
@@ -202,24 +769,9 @@ async def delete_memory(
         token=Depends(authorize)
 ):
     try:
-        mem0 = get_mem0()
-        # Get memory history records
-        memory_histories: List[MemoryHistory] = mem0.history(memory_id=memory_id)
-        
-        # If no history records or last record shows deletion, return 404
-        if not memory_histories or memory_histories[-1] is None or memory_histories[-1].get("is_deleted"):
-            return JSONResponse(
-                content=ErrorResponse(
-                    code=status.HTTP_404_NOT_FOUND,
-                    error="NotFoundError",
-                    message=f"Memory {memory_id} not found or already deleted."
-                ).model_dump(),
-                status_code=status.HTTP_404_NOT_FOUND
-            )
-        
-        # If checks passed, proceed with deletion
+        # get_memory_id has already checked that the memory exists and is not deleted
         try:
-            delete_result = mem0.delete(memory_id=memory_id)
+            delete_result = await get_executor().run("write", delete_memory_by_id, memory_id=memory_id)
             # mem0.delete() returns None on success
             if delete_result is None:
                 return SuccessfulResponse()
@@ -246,6 +798,9 @@ async def delete_memory(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
             )
 
+    except ErrorHttpException:
+        # Let overload and timeout errors from the executor reach their handlers
+        raise
     except Exception as e:
         # Handle unexpected errors
         return JSONResponse(
@@ -260,12 +815,13 @@ async def delete_memory(
 
 @api_router.delete(
     path="/delete-all",
-    description="Delete all memories matching the specified criteria."
+    description="Delete all memories matching the specified criteria, as a background job by default."
 )
 async def delete_memory(
         user_id: Union[str, None] = None,
         agent_id: Union[str, None] = None,
         run_id: Union[str, None] = None,
+        async_mode: bool = True,
         token=Depends(authorize)
 ):
     """Delete all memories that match the specified filtering criteria.
@@ -274,43 +830,153 @@ async def delete_memory(
     - user_id: Optional filter to delete memories for a specific user
     - agent_id: Optional filter to delete memories created by a specific AI agent
     - run_id: Optional filter to delete memories from a specific execution run
+    - async_mode: When true (the default), return a job_id at once; /jobs/{job_id} reports the progress.
+      When false, wait for the deletion to finish.
     """
-    try:
-        mem0 = get_mem0()
-        mem0.delete_all(
-            user_id, agent_id, run_id
-        )
-
-        return SuccessfulResponse()
-    except ValueError as e:
+    filters = {key: value for key, value in scope_of(user_id, agent_id, run_id).items() if value}
+    if not filters:
         return JSONResponse(
             content=ErrorResponse(
+                code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 error="ValueError",
-                message=e
-            ),
+                message="At least one of user_id, agent_id or run_id is required. Use /reset-all to delete all memories."
+            ).model_dump(),
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY
         )
+    payload = {"filters": filters, "tenant": current_tenant.get()}
+    if not async_mode:
+        return SuccessfulResponse(data=await get_executor().run("admin", run_delete_job, payload))
+    return await enqueue_admin_job("delete", payload)
 
 
 @api_router.delete(
     path="/reset-all",
-    description="Reset the memory store."
+    description="Reset the memory store, as a background job by default."
 )
-async def reset_all_memories(token=Depends(authorize)):
-    mem0 = get_mem0()
-    mem0.reset()
+async def reset_all_memories(async_mode: bool = True, token=Depends(authorize)):
+    payload = {"tenant": current_tenant.get()}
+    if not async_mode:
+        await get_executor().run("admin", run_reset_job, payload)
+        return SuccessfulResponse()
+    return await enqueue_admin_job("reset", payload)
+
+
+async def enqueue_admin_job(kind: str, payload: dict) -> JSONResponse:
+    job_id = await run_in_threadpool(get_job_queue().enqueue, kind, payload, current_tenant.get())
     return JSONResponse(
-        content=SuccessfulResponse().model_dump_json(),
+        content=SuccessfulResponse(data={"job_id": job_id, "status": "queued"}).model_dump(),
         status_code=status.HTTP_202_ACCEPTED
     )
 
 
+@api_router.get(
+    path="/export",
+    description="Export memories with their vectors and history as a compressed binary file.",
+    dependencies=[Depends(authorize)]
+)
+async def export_memories(
+        user_id: Union[str, None] = None,
+        agent_id: Union[str, None] = None,
+        run_id: Union[str, None] = None
+):
+    """Stream the memories matching the optional filters in the format read by /import.
+
+    The file is written page by page while the collection is scrolled, so any number of
+    memories can be exported with constant server memory.
+    """
+    filters = {key: value for key, value in scope_of(user_id, agent_id, run_id).items() if value}
+    compression_level = archive_config["compression_level"]
+    mem0 = await load_mem0()
+    header = await get_executor().run("admin", archive.header_frame, mem0, filters, compression_level)
+
+    async def frames():
+        yield header
+        offset, points, history = None, 0, 0
+        while True:
+            data, offset, page_points, page_history = await get_executor().run(
+                "admin", archive.export_page, mem0, filters, archive_config["page_size"], offset, compression_level
+            )
+            yield data
+            points += page_points
+            history += page_history
+            if offset is None:
+                break
+        # A missing end frame tells /import that the export was cut short
+        yield archive.end_frame(points, history, compression_level)
+
+    return StreamingResponse(
+        frames(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="mem0-export-{int(time.time())}.bin"'}
+    )
+
+
+@api_router.post(
+    path="/import",
+    description="Import a file created by /export, without re-running the LLM or the embedder.",
+    dependencies=[Depends(authorize)]
+)
+async def import_memories(request: Request):
+    """Upsert the memories, vectors and history rows of an export file sent as the request body.
+
+    Memories with the same id are overwritten, so importing the same file twice is harmless.
+    """
+    mem0 = await load_mem0()
+    reader = archive.FrameReader()
+    points, history = 0, 0
+    try:
+        async for chunk in request.stream():
+            for frame in reader.feed(chunk):
+                frame_points, frame_history = await get_executor().run("admin", archive.import_frame, mem0, frame)
+                points += frame_points
+                history += frame_history
+        reader.close()
+    except InvalidExportError as e:
+        return JSONResponse(
+            content=ErrorResponse(
+                code=e.code,
+                error=e.error,
+                message=e.message,
+                details={"points": points, "history": history}
+            ).model_dump(),
+            status_code=e.code
+        )
+    finally:
+        result_cache = get_result_cache()
+        if result_cache is not None and points:
+            result_cache.clear()
+
+    return SuccessfulResponse(data={"points": points, "history": history})
+
+
+@api_router.get("/health/live", description="Liveness probe: the process is up and serving requests")
+async def liveness_check():
+    return SuccessfulResponse(data={"status": "alive"})
+
+
+@api_router.get("/health/ready", description="Readiness probe: models are loaded and databases connected")
+async def readiness_check():
+    if not readiness.ready:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content=ErrorResponse(
+                code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                error="ServiceStarting",
+                message="Service is still warming up",
+                details=readiness.status()
+            ).model_dump()
+        )
+    return SuccessfulResponse(data=readiness.status())
+
+
 @api_router.get("/health", description="Check service health status")
 async def health_check():
+    if not readiness.ready:
+        return await readiness_check()
     try:
-        mem0 = get_mem0()
+        mem0 = await load_mem0()
         # Test database connection
-        mem0.vector_store.client.get_collections()
+        await run_in_threadpool(mem0.vector_store.client.get_collections)
         return SuccessfulResponse(data={
             "status": "healthy",
             "database": "connected",
@@ -345,52 +1011,100 @@ async def health_check():
         )
 
 
-def check_database_connection():
-    """Check database connection status"""
-    try:
-        mem0 = get_mem0()
-        mem0.vector_store.client.get_collections()
-        return True, None
-    except Exception as e:
-        return False, str(e)
+@api_router.get(
+    path="/cache/stats",
+    description="Get size and hit rate counters of the service caches.",
+    dependencies=[Depends(authorize)]
+)
+async def cache_stats():
+    return SuccessfulResponse(
+        data=collect_cache_stats(await load_mem0())
+    )
 
-def wait_for_database(max_retries=None):
-    """Wait for database connection to be ready"""
-    retry_count = 0
-    while True:
-        print("Checking database connection...")
-        is_connected, error = check_database_connection()
-        
-        if is_connected:
-            print("✓ Database connection successful!")
-            return True
-        
-        retry_count += 1
-        if max_retries and retry_count >= max_retries:
-            print(f"✗ Database connection failed, maximum retry count {max_retries} reached")
-            print(f"错误信息: {error}")
-            return False
-            
-        print(f"✗ Database connection failed: {error}")
-        print("Will retry in 10 seconds...")
-        time.sleep(10)
+
+def collect_cache_stats(mem0) -> dict:
+    stats = {}
+    embedder = find_component(mem0.embedding_model, CachedEmbedder)
+    if embedder is not None:
+        stats["embedding"] = embedder.stats()
+    result_cache = get_result_cache()
+    if result_cache is not None:
+        stats["results"] = result_cache.stats()
+    llm = find_component(mem0.llm, CachedLLM)
+    if llm is not None:
+        stats["llm"] = llm.stats()
+    if rerank_config["cache_size"]:
+        stats["rerank"] = get_reranker().stats()
+    return stats
+
+
+def collect_service_stats() -> dict:
+    stats = {"executor": get_executor().stats(), "jobs": get_job_queue().stats()}
+    # Don't let a scrape be the one that loads the models and connects to the databases
+    mem0 = peek_mem0()
+    if mem0 is not None:
+        stats["caches"] = collect_cache_stats(mem0)
+    return stats
+
+
+@api_router.get(
+    path="/metrics",
+    description="Prometheus metrics: request counts and latencies, per-stage timings, executor queues and caches.",
+    dependencies=[Depends(authorize)]
+)
+async def metrics():
+    return await run_in_threadpool(metrics_response)
+
+
+def start_job_workers():
+    job_queue = get_job_queue()
+    job_queue.register("store", run_store_job, workers=job_config["store_workers"])
+    job_queue.register("graph", run_graph_job, workers=graph_stage_config["workers"])
+    job_queue.register("delete", run_delete_job, workers=bulk_delete_config["workers"])
+    job_queue.register("reset", run_reset_job, workers=1)
+    job_queue.register("compact", run_compact_job, workers=1)
+    job_queue.start()
+    if compaction_config["enabled"]:
+        compaction_task.start()
+    update_buffer = get_update_buffer()
+    if update_buffer is not None:
+        update_buffer.start(apply_buffered_updates)
+
+
+def stop_job_workers():
+    compaction_task.stop()
+    update_buffer = get_update_buffer()
+    if update_buffer is not None:
+        update_buffer.stop()
+    get_job_queue().stop()
+
+
+compaction_task = PeriodicTask(schedule_compaction, compaction_config["interval_seconds"], "compaction")
 
 
 app.include_router(api_router)
+app.middleware("http")(metrics_middleware)
+app.add_middleware(RequestScopeMiddleware)
+register_service_collector(ServiceCollector(collect_service_stats))
 app.add_exception_handler(UnauthorizedException, unauthorized_exception_handler)
 app.add_exception_handler(UnexpectedResponse, qdrant_client_unexpected_handler)
 app.add_exception_handler(ConnectionError, database_connection_error_handler)
 app.add_exception_handler(Exception, database_request_error_handler)
 app.add_exception_handler(ResponseHandlingException, response_handling_exception_handler)
+app.add_exception_handler(ServiceOverloadedError, service_unavailable_handler)
+app.add_exception_handler(ServiceTimeoutError, service_unavailable_handler)
+app.add_exception_handler(TenantError, tenant_error_handler)
+app.add_exception_handler(UnindexedFilterError, unindexed_filter_error_handler)
 
 if __name__ == "__main__":
+    # Single-process development server. In production run: gunicorn -c gunicorn.conf.py app:app
     try:
         port = env.int('MEM0_API_PORT', default=8000)
         uvicorn.run(
             "app:app",
             host="0.0.0.0",  # listening on all interfaces
             port=port,
-            reload=True
+            reload=env.bool('MEM0_API_RELOAD', default=False)
         )
     except Exception as e:
         print(f"Failed to start service: {str(e)}")
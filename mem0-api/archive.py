@@ -0,0 +1,208 @@
+import struct
+import time
+import uuid
+import zlib
+from typing import List, Optional, Tuple
+
+import msgpack
+import numpy as np
+from mem0 import Memory
+
+from bulk_delete import id_chunks
+from errors.exception import InvalidExportError
+
+# File layout: MAGIC followed by frames. A frame is a little-endian uint32 length and that many
+# bytes of zlib-compressed msgpack. The first frame is the header, then "points" and "history"
+# frames alternate page by page, and an "end" frame with the totals closes the file.
+MAGIC = b"MEM0EXP1"
+FORMAT_VERSION = 1
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+
+_length = struct.Struct("<I")
+
+
+def encode_frame(frame: dict, compression_level: int = 6) -> bytes:
+    data = zlib.compress(msgpack.packb(frame, use_bin_type=True), compression_level)
+    return _length.pack(len(data)) + data
+
+
+def header_frame(mem0: Memory, filters: dict, compression_level: int = 6) -> bytes:
+    vector_store = mem0.vector_store
+    return MAGIC + encode_frame({
+        "type": "header",
+        "version": FORMAT_VERSION,
+        "collection": vector_store.collection_name,
+        "dims": mem0.config.vector_store.config.embedding_model_dims,
+        "filters": filters,
+        "created_at": time.time(),
+    }, compression_level)
+
+
+def end_frame(points: int, history: int, compression_level: int = 6) -> bytes:
+    return encode_frame({"type": "end", "points": points, "history": history}, compression_level)
+
+
+def export_page(mem0: Memory, filters: dict, limit: int, offset=None,
+                compression_level: int = 6) -> Tuple[bytes, Optional[object], int, int]:
+    """Encode one page of points (with vectors) and their history rows.
+
+    Returns the encoded frames, the offset of the next page (None after the last one)
+    and the number of points and history rows written.
+    """
+    vector_store = mem0.vector_store
+    points, next_offset = vector_store.client.scroll(
+        collection_name=vector_store.collection_name,
+        scroll_filter=vector_store._create_filter(filters) if filters else None,
+        limit=limit,
+        offset=offset,
+        with_payload=True,
+        with_vectors=True,
+    )
+    if not points:
+        return b"", None, 0, 0
+
+    ids = [str(point.id) for point in points]
+    vectors = np.asarray([point.vector for point in points], dtype="<f4")
+    data = encode_frame({
+        "type": "points",
+        "ids": ids,
+        "payloads": [point.payload for point in points],
+        "dims": vectors.shape[1],
+        "vectors": vectors.tobytes(),
+    }, compression_level)
+
+    rows = []
+    with mem0.db.lock:
+        for chunk in id_chunks(ids):
+            cursor = mem0.db.connection.execute(
+                f"SELECT * FROM history WHERE memory_id IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            columns = [column[0] for column in cursor.description]
+            rows.extend(dict(zip(columns, row)) for row in cursor.fetchall())
+    if rows:
+        data += encode_frame({"type": "history", "rows": rows}, compression_level)
+    return data, next_offset, len(points), len(rows)
+
+
+def _check(condition: bool, message: str):
+    if not condition:
+        raise InvalidExportError(f"Invalid export frame: {message}")
+
+
+def check_frame(frame) -> dict:
+    """Check that a decoded frame has the fields `import_frame` reads, with the right types."""
+    _check(isinstance(frame, dict), "not a map")
+    kind = frame.get("type")
+    if kind == "header":
+        _check(isinstance(frame.get("version"), int), "header without a format version")
+        _check(isinstance(frame.get("dims"), int), "header without the vector dimensions")
+    elif kind == "points":
+        ids, payloads, dims, vectors = frame.get("ids"), frame.get("payloads"), frame.get("dims"), frame.get("vectors")
+        _check(isinstance(ids, list) and isinstance(payloads, list) and len(ids) == len(payloads),
+               "points need as many ids as payloads")
+        _check(all(isinstance(payload, dict) for payload in payloads), "point payloads must be maps")
+        try:
+            for memory_id in ids:
+                uuid.UUID(memory_id)
+        except (TypeError, ValueError, AttributeError):
+            _check(False, "point ids must be UUIDs")
+        _check(isinstance(dims, int) and dims > 0, "points without the vector dimensions")
+        _check(isinstance(vectors, bytes) and len(vectors) == len(ids) * dims * 4,
+               "point vectors don't match the number of points and dimensions")
+    elif kind == "history":
+        rows = frame.get("rows")
+        _check(isinstance(rows, list) and all(isinstance(row, dict) for row in rows), "history rows must be maps")
+        _check(all(isinstance(row.get("id"), str) and isinstance(row.get("memory_id"), str) for row in rows),
+               "history rows need an id and a memory_id")
+    elif kind == "end":
+        _check(isinstance(frame.get("points"), int) and isinstance(frame.get("history"), int), "end without totals")
+    else:
+        _check(False, f"unknown frame type {kind!r}")
+    return frame
+
+
+class FrameReader:
+    """Incrementally decode an export file fed in arbitrary chunks.
+
+    Raises InvalidExportError unless the input is MAGIC, a header frame, then well-formed frames
+    up to an end frame.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._magic_checked = False
+        self._dims = None
+        self.finished = False
+
+    def feed(self, data: bytes) -> List[dict]:
+        self._buffer += data
+        frames = []
+        if not self._magic_checked:
+            if len(self._buffer) < len(MAGIC):
+                return frames
+            if bytes(self._buffer[:len(MAGIC)]) != MAGIC:
+                raise InvalidExportError("Not a memory export file")
+            del self._buffer[:len(MAGIC)]
+            self._magic_checked = True
+        while len(self._buffer) >= _length.size:
+            (size,) = _length.unpack_from(self._buffer)
+            if size > MAX_FRAME_SIZE:
+                raise InvalidExportError(f"Export frame of {size} bytes exceeds the {MAX_FRAME_SIZE} bytes limit")
+            if len(self._buffer) < _length.size + size:
+                break
+            try:
+                frame = msgpack.unpackb(zlib.decompress(self._buffer[_length.size:_length.size + size]), raw=False)
+            except (zlib.error, ValueError, msgpack.UnpackException) as e:
+                raise InvalidExportError(f"Corrupt export frame: {e}")
+            del self._buffer[:_length.size + size]
+            check_frame(frame)
+            if self.finished:
+                raise InvalidExportError("Export file continues after its end frame")
+            if (self._dims is None) != (frame["type"] == "header"):
+                raise InvalidExportError("Export file must start with exactly one header frame")
+            if frame["type"] == "header":
+                self._dims = frame["dims"]
+            if frame["type"] == "points" and frame["dims"] != self._dims:
+                raise InvalidExportError(f"Points of {frame['dims']} dimensions in an export of {self._dims}")
+            if frame["type"] == "end":
+                self.finished = True
+            frames.append(frame)
+        return frames
+
+    def close(self):
+        if not self.finished or self._buffer:
+            raise InvalidExportError("Export file is truncated")
+
+
+def import_frame(mem0: Memory, frame: dict) -> Tuple[int, int]:
+    """Write one frame decoded (and checked) by FrameReader to the vector store or the history database.
+
+    Points are upserted with their stored vectors, so nothing is re-embedded or sent to the LLM.
+    Returns the number of points and history rows written.
+    """
+    kind = frame.get("type")
+    if kind == "header":
+        if frame.get("version") != FORMAT_VERSION:
+            raise InvalidExportError(f"Unsupported export format version: {frame.get('version')}")
+        dims = mem0.config.vector_store.config.embedding_model_dims
+        if frame.get("dims") != dims:
+            raise InvalidExportError(f"Export has {frame.get('dims')}-dimensional vectors, the collection expects {dims}")
+        return 0, 0
+    if kind == "points":
+        vectors = np.frombuffer(frame["vectors"], dtype="<f4").reshape(len(frame["ids"]), frame["dims"])
+        mem0.vector_store.insert(vectors=vectors.tolist(), payloads=frame["payloads"], ids=frame["ids"])
+        return len(frame["ids"]), 0
+    if kind == "history":
+        rows = frame["rows"]
+        if not rows:
+            return 0, 0
+        with mem0.db.lock:
+            known_columns = {row[1] for row in mem0.db.connection.execute("PRAGMA table_info(history)")}
+            columns = [column for column in rows[0].keys() if column in known_columns]
+            with mem0.db.connection:
+                mem0.db.connection.executemany(
+                    f"INSERT OR REPLACE INTO history ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    [[row.get(column) for column in columns] for row in rows],
+                )
+        return 0, len(rows)
+    return 0, 0
@@ -0,0 +1,127 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, List
+
+from components import ComponentProxy
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-item calls into one batched call.
+
+    Callers block in `submit` while a background thread collects items for up to
+    `max_wait` seconds (or until `max_batch_size` items are queued), passes them to
+    `handler` in one call and hands each caller its own result. Items that arrive while
+    a batch is being processed are picked up by the next batch. The thread exits after
+    `idle_timeout` seconds without items and is restarted by the next `submit`, so a
+    batcher that is no longer used (e.g. of a dropped tenant) doesn't keep a thread.
+    """
+
+    def __init__(self, handler: Callable[[List[Any]], List[Any]], max_batch_size: int = 64, max_wait: float = 0.002,
+                 name: str = "batcher", idle_timeout: float = 60):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self.idle_timeout = idle_timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, item: Any) -> Any:
+        future = Future()
+        # Queue first: the thread only exits while holding the lock and seeing an empty queue
+        self._queue.put((item, future))
+        self._ensure_started()
+        return future.result()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"mem0-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        try:
+            batch = [self._queue.get(timeout=self.idle_timeout)]
+        except queue.Empty:
+            with self._lock:
+                if self._queue.empty():
+                    self._thread = None
+                    return None
+            batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                timeout = deadline - time.monotonic()
+                batch.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            items = [item for item, _ in batch]
+            try:
+                results = self.handler(items)
+            except Exception as e:
+                logger.error(f"{self.name} failed to process a batch of {len(items)} items: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class BatchingEmbedder(ComponentProxy):
+    """Embedder wrapper that encodes concurrent `embed` calls in a single model batch."""
+
+    def __init__(self, embedder, max_batch_size: int = 64, max_wait: float = 0.002):
+        super().__init__(embedder)
+        self._batcher = MicroBatcher(self.embed_batch, max_batch_size, max_wait, name="embed-batcher")
+
+    def embed(self, text):
+        return self._batcher.submit(text)
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts at once, using one `encode` call when the model supports it.
+
+        The model splits the texts into batches of the embedder's own `max_batch_size` (e.g.
+        EMBEDDING_ONNX_MAX_BATCH_SIZE) if it has one, and of the batcher's otherwise.
+        """
+        model = getattr(self._component, "model", None)
+        if hasattr(model, "encode"):
+            batch_size = getattr(self._component, "max_batch_size", None) or self._batcher.max_batch_size
+            return model.encode(texts, batch_size=batch_size, convert_to_numpy=True).tolist()
+        return [self._component.embed(text) for text in texts]
+
+
+class BatchingVectorStore(ComponentProxy):
+    """Vector store wrapper that merges concurrent `insert` calls into one bulk upsert."""
+
+    def __init__(self, vector_store, max_batch_size: int = 64, max_wait: float = 0.002):
+        super().__init__(vector_store)
+        self._batcher = MicroBatcher(self._insert_batch, max_batch_size, max_wait, name="insert-batcher")
+
+    def insert(self, vectors: list, payloads: list = None, ids: list = None):
+        # Without explicit ids the store derives them from the position in the call,
+        # so those inserts cannot be merged with others.
+        if ids is None:
+            return self._component.insert(vectors=vectors, payloads=payloads, ids=ids)
+        return self._batcher.submit((vectors, payloads, ids))
+
+    def _insert_batch(self, inserts):
+        vectors, payloads, ids = [], [], []
+        for insert_vectors, insert_payloads, insert_ids in inserts:
+            vectors.extend(insert_vectors)
+            payloads.extend(insert_payloads or [{} for _ in insert_vectors])
+            ids.extend(insert_ids)
+        self._component.insert(vectors=vectors, payloads=payloads, ids=ids)
+        return [None] * len(inserts)
@@ -0,0 +1,370 @@
+"""Benchmark of the API under concurrent load, against local stand-ins for Qdrant, Neo4j and the LLM.
+
+Boots app.py with uvicorn on an in-memory Qdrant (`QdrantClient(":memory:")`), a stub LLM with a
+configurable delay and, optionally, a stub graph store. The in-memory Qdrant handles one call at a
+time and scans instead of using an HNSW index, so numbers are for comparing versions of the service,
+not for predicting production latency. It seeds memories for a set of users,
+then drives /store, /search, /retrieve and /delete with a weighted mix of concurrent requests and
+reports the throughput and p50/p95/p99 latency of each endpoint. Results are saved as JSON so
+runs of different versions can be compared.
+
+    cd mem0-api
+    poetry run python -m bench.run --label baseline
+    poetry run python -m bench.run --label change --compare bench/results/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BENCH_DIR = Path(__file__).parent
+
+TOPICS = {
+    "travel": ["prefers window seats", "flies economy on short trips", "is allergic to peanuts", "collects airline miles"],
+    "food": ["is vegetarian", "likes spicy Sichuan dishes", "drinks oat milk latte", "avoids gluten"],
+    "work": ["works as a data engineer", "uses Python and Rust", "has standup at 9am", "reviews pull requests on Fridays"],
+    "shopping": ["ordered a mechanical keyboard", "returned running shoes", "wants a 27 inch monitor", "pays with credit card"],
+    "health": ["runs 5km three times a week", "sleeps around 7 hours", "takes vitamin D", "does yoga on weekends"],
+}
+
+QDRANT_CLIENT_METHODS = (
+    "upsert", "search", "search_batch", "query_points", "scroll", "retrieve", "count", "delete", "set_payload",
+    "overwrite_payload", "get_collection", "get_collections", "create_collection", "delete_collection",
+    "update_collection", "create_payload_index",
+)
+
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - {"store", "search", "retrieve", "delete"}
+    if unknown:
+        raise ValueError(f"Unknown endpoints in --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def make_fact(rng: random.Random, user: int) -> str:
+    topic = rng.choice(list(TOPICS))
+    return f"User {user} {rng.choice(TOPICS[topic])} (ref {topic[:3].upper()}-{rng.randint(1000, 9999)})"
+
+
+def make_query(rng: random.Random) -> str:
+    topic = rng.choice(list(TOPICS))
+    return rng.choice(TOPICS[topic]).split(" ", 1)[1]
+
+
+def prepare_environment(state_dir: str):
+    """Point all local service state at a fresh directory and provide the settings .env would."""
+    os.environ.setdefault("VECTOR_STORE_DB_HOST", "localhost")
+    os.environ.setdefault("VECTOR_STORE_DB_PORT", "6333")
+    # Only read into the config: the stub graph store replaces Neo4j and the API schema isn't served
+    os.environ.setdefault("GRAPH_STORE_DB_HOST", "localhost")
+    os.environ.setdefault("GRAPH_STORE_DB_PORT", "7687")
+    os.environ.setdefault("MEM0_API_HOST", "localhost")
+    os.environ.setdefault("TEMPERATURE", "0")
+    os.environ.setdefault("TOP_P", "1")
+    os.environ.setdefault("MAX_TOKENS", "2000")
+    for name, file_name in (
+        ("MEMORY_INDEX_PATH", "memory_index.log"),
+        ("JOB_QUEUE_DB_PATH", "jobs.db"),
+        ("HYBRID_SEARCH_INDEX_PATH", "keyword_index.db"),
+        ("LLM_CACHE_PATH", "llm_cache.db"),
+    ):
+        os.environ[name] = os.path.join(state_dir, file_name)
+    os.environ.pop("EMBEDDING_CACHE_PATH", None)
+    # Metrics of this process only
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+
+def build_memory(args, state_dir: str):
+    """Build Memory on the in-memory Qdrant and the stubs, and install it as the service's instance."""
+    from mem0 import Memory
+    from mem0.utils.factory import EmbedderFactory
+    from qdrant_client import QdrantClient
+
+    import dependencies
+    from bench.stubs import StubGraph, StubLLM
+    from components import SerializedComponent
+    from mem0_config import qdrant_tuning_config
+    from tuned_qdrant import register_tuned_qdrant
+
+    embedder = {"provider": "huggingface", "config": {"model": args.embedding_model}}
+    if args.embedding_model == "stub":
+        EmbedderFactory.provider_to_class["huggingface"] = "bench.stubs.StubEmbedding"
+        embedder["config"]["model_kwargs"] = {"latency": args.embed_latency_ms / 1000}
+    else:
+        from shared_models import register_shared_embedders
+        register_shared_embedders()
+    # The vector store the service builds, with the batch and update methods its wrappers rely on
+    register_tuned_qdrant(qdrant_tuning_config)
+
+    mem0 = Memory.from_config({
+        "vector_store": {"provider": "qdrant", "config": {
+            "client": QdrantClient(":memory:"), "collection_name": "bench", "embedding_model_dims": args.embedding_dims
+        }},
+        # The OpenAI client is only constructed, never called: the LLM is replaced by the stub below
+        "llm": {"provider": "openai", "config": {"api_key": "bench"}},
+        "embedder": embedder,
+        "history_db_path": os.path.join(state_dir, "history.db"),
+        "version": "v1.1",
+    })
+    # The in-memory Qdrant isn't thread-safe: the service calls it from several pool threads
+    mem0.vector_store.client = SerializedComponent(mem0.vector_store.client, QDRANT_CLIENT_METHODS)
+    mem0.llm = StubLLM(args.llm_latency_ms / 1000)
+    if args.graph:
+        mem0.graph = StubGraph(args.graph_latency_ms / 1000, llm=StubLLM(args.llm_latency_ms / 1000))
+        mem0.enable_graph = True
+    dependencies.install_components(mem0)
+    dependencies._mem0 = mem0
+    return mem0
+
+
+class Server:
+    """Runs the app with uvicorn in a background thread."""
+
+    def __init__(self, app, port: int):
+        import uvicorn
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def start(self, timeout: float = 120) -> str:
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("The server didn't start")
+            time.sleep(0.05)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=30)
+
+
+class Workload:
+    """Tracks the memories of each simulated user, so deletes and searches hit existing data."""
+
+    def __init__(self, users: int, seed: int):
+        self.users = users
+        self.rng = random.Random(seed)
+        self.memory_ids: Dict[int, List[str]] = defaultdict(list)
+
+    def remember(self, user: int, response: dict):
+        for item in (response.get("data") or {}).get("results", []):
+            if item.get("event") == "ADD":
+                self.memory_ids[user].append(item["id"])
+
+    def take_memory(self) -> Optional[str]:
+        users = [user for user, ids in self.memory_ids.items() if ids]
+        if not users:
+            return None
+        ids = self.memory_ids[self.rng.choice(users)]
+        return ids.pop(self.rng.randrange(len(ids)))
+
+
+async def seed(client, workload: Workload, memories: int, batch_size: int = 50):
+    """Store the initial memories through /store/batch with infer=false, without the LLM."""
+    users = [i % workload.users for i in range(memories)]
+    pending = [(user, make_fact(workload.rng, user)) for user in users]
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        response = (await client.post("/store/batch", json={"memories": [
+            {"data": fact, "user_id": f"user-{user}", "infer": False} for user, fact in batch
+        ]})).json()
+        for (user, _), item in zip(batch, response["data"]):
+            workload.remember(user, item)
+
+
+async def request(client, workload: Workload, endpoint: str, args):
+    """Send one request to `endpoint`. Returns False when there was nothing to send (no memory to delete)."""
+    rng = workload.rng
+    user = rng.randrange(workload.users)
+    if endpoint == "store":
+        response = await client.post("/store", json={
+            "data": make_fact(rng, user), "user_id": f"user-{user}", "infer": not args.raw_store
+        })
+        body = response.json()
+        workload.remember(user, body)
+    elif endpoint == "search":
+        response = await client.post("/search", json={"query": make_query(rng), "user_id": f"user-{user}", "limit": args.search_limit})
+        body = response.json()
+    elif endpoint == "retrieve":
+        response = await client.get("/retrieve", params={"user_id": f"user-{user}", "limit": 20})
+        body = response.json()
+    else:
+        memory_id = workload.take_memory()
+        if memory_id is None:
+            return False
+        response = await client.delete(f"/delete/{memory_id}")
+        body = response.json()
+    return response.status_code == 200 and body.get("code") == 0
+
+
+async def drive(base_url: str, args, workload: Workload) -> dict:
+    import httpx
+
+    weights = parse_mix(args.mix)
+    endpoints, endpoint_weights = list(weights), list(weights.values())
+    samples: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        print(f"Seeding {args.seed_memories} memories for {args.users} users ...", file=sys.stderr)
+        await seed(client, workload, args.seed_memories)
+
+        async def worker(deadline: float, record: bool):
+            while time.monotonic() < deadline:
+                endpoint = workload.rng.choices(endpoints, endpoint_weights)[0]
+                start = time.perf_counter()
+                try:
+                    sent = await request(client, workload, endpoint, args)
+                    ok = sent
+                except Exception:
+                    sent, ok = True, False
+                elapsed = time.perf_counter() - start
+                if record and sent:
+                    samples[endpoint].append(elapsed)
+                    if not ok:
+                        errors[endpoint] += 1
+
+        if args.warmup > 0:
+            print(f"Warming up for {args.warmup}s ...", file=sys.stderr)
+            deadline = time.monotonic() + args.warmup
+            await asyncio.gather(*(worker(deadline, False) for _ in range(args.concurrency)))
+
+        print(f"Running {args.mix} at concurrency {args.concurrency} for {args.duration}s ...", file=sys.stderr)
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(worker(deadline, True) for _ in range(args.concurrency)))
+        elapsed = time.monotonic() - started
+
+    results = {endpoint: summarize(samples[endpoint], errors[endpoint], elapsed) for endpoint in endpoints}
+    results["all"] = summarize([s for values in samples.values() for s in values], sum(errors.values()), elapsed)
+    return results
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of sorted `values`."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, int(round(p / 100 * len(values))) - 1))]
+
+
+def summarize(samples: List[float], errors: int, elapsed: float) -> dict:
+    samples = sorted(samples)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 2) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(samples[-1] * 1000, 2) if samples else 0.0,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict, baseline: Optional[dict] = None):
+    columns = ("requests", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+    print(f"\n{report['label']} ({report['git_commit'] or 'unknown commit'})")
+    print(f"{'endpoint':<10}" + "".join(f"{column:>16}" for column in columns))
+    for endpoint, stats in report["endpoints"].items():
+        row = f"{endpoint:<10}"
+        for column in columns:
+            cell = f"{stats[column]:g}"
+            previous = (baseline or {}).get("endpoints", {}).get(endpoint, {}).get(column)
+            if previous and column not in ("requests", "errors"):
+                cell += f" ({(stats[column] - previous) / previous:+.0%})"
+            row += f"{cell:>16}"
+        print(row)
+    if baseline:
+        print(f"Changes relative to {baseline['label']} ({baseline.get('git_commit') or 'unknown commit'})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--label", default=None, help="Name of this run, used for the result file. Defaults to the git commit.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of measured load.")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of unmeasured load before measuring.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients.")
+    parser.add_argument("--mix", default="store=1,search=6,retrieve=2,delete=1", help="Relative weights of the endpoints.")
+    parser.add_argument("--users", type=int, default=50, help="Number of simulated users.")
+    parser.add_argument("--seed-memories", type=int, default=1000, help="Memories stored before the run.")
+    parser.add_argument("--search-limit", type=int, default=10)
+    parser.add_argument("--raw-store", action="store_true", help="Store with infer=false, skipping the LLM.")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="Delay of each stub LLM call.")
+    parser.add_argument("--graph", action="store_true", help="Enable the graph stage with a stub Neo4j.")
+    parser.add_argument("--graph-latency-ms", type=float, default=20, help="Delay of each stub graph store call.")
+    parser.add_argument("--embedding-model", default="stub", help="'stub' for a hashing encoder, or a Hugging Face model name.")
+    parser.add_argument("--embedding-dims", type=int, default=384)
+    parser.add_argument("--embed-latency-ms", type=float, default=0, help="Delay of each stub encoder batch.")
+    parser.add_argument("--port", type=int, default=0, help="Port of the server, 0 for any free port.")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed of the workload.")
+    parser.add_argument("--output-dir", default=str(BENCH_DIR / "results"))
+    parser.add_argument("--compare", default=None, help="Result file of a previous run to compare with.")
+    args = parser.parse_args(argv)
+    parse_mix(args.mix)
+
+    state_dir = tempfile.mkdtemp(prefix="mem0-bench-")
+    prepare_environment(state_dir)
+    # app.py and its modules are imported from the mem0-api directory
+    sys.path.insert(0, str(BENCH_DIR.parent))
+    warnings.filterwarnings("ignore", message="Payload indexes have no effect in the local Qdrant")
+
+    build_memory(args, state_dir)
+    import app
+    server = Server(app.app, args.port)
+    base_url = server.start()
+    try:
+        endpoints = asyncio.run(drive(base_url, args, Workload(args.users, args.seed)))
+    finally:
+        server.stop()
+
+    commit = git_commit()
+    report = {
+        "label": args.label or commit or "run",
+        "git_commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output_dir", "compare", "port")},
+        "endpoints": endpoints,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    output = os.path.join(args.output_dir, f"{report['label']}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"\nSaved to {output}")
+
+
+if __name__ == "__main__":
+    main()
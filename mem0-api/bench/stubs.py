@@ -0,0 +1,125 @@
+"""Local stand-ins for the LLM, the embedding model and Neo4j, with configurable latency.
+
+They answer quickly and deterministically, so a benchmark measures the service itself
+(request handling, executor pools, batching, caches, Qdrant calls) rather than remote APIs.
+"""
+import ast
+import hashlib
+import json
+import re
+import time
+from functools import lru_cache
+from typing import List, Optional
+
+import numpy as np
+from mem0.configs.embeddings.base import BaseEmbedderConfig
+from mem0.embeddings.base import EmbeddingBase
+from mem0.llms.base import LLMBase
+
+
+class StubLLM(LLMBase):
+    """Answers mem0's fact extraction and memory update prompts after a fixed delay.
+
+    Extraction returns the input text as the only fact; the update step adds every new fact
+    that isn't already stored word for word.
+    """
+
+    _facts = re.compile(r"```\s*(\[.*?\])\s*```", re.S)
+    _memory = re.compile(r"``\s*(\[.*?\])\s*``", re.S)
+
+    def __init__(self, latency: float = 0.0, config=None):
+        super().__init__(config)
+        self.latency = latency
+
+    def generate_response(self, messages, response_format=None, tools=None, tool_choice="auto"):
+        time.sleep(self.latency)
+        content = messages[-1]["content"]
+        if content.startswith("Input:"):
+            lines = [line.split(":", 1)[-1].strip() for line in content[len("Input:"):].strip().splitlines()]
+            return json.dumps({"facts": [line for line in lines if line]})
+        facts = self._facts.search(content)
+        memory = self._memory.search(content)
+        existing = {item["text"] for item in ast.literal_eval(memory.group(1))} if memory else set()
+        new_facts = ast.literal_eval(facts.group(1)) if facts else []
+        return json.dumps({"memory": [
+            {"id": str(i), "text": fact, "event": "NONE" if fact in existing else "ADD"}
+            for i, fact in enumerate(new_facts)
+        ]})
+
+
+class HashingEncoder:
+    """Bag-of-words hashing encoder: texts sharing words get similar unit vectors.
+
+    Mirrors the `encode` interface of SentenceTransformer, so the service batches it like a real model.
+    """
+
+    _word = re.compile(r"\w+")
+
+    def __init__(self, dims: int, latency: float = 0.0):
+        self.dims = dims
+        self.latency = latency
+
+    @lru_cache(maxsize=100000)
+    def _word_vector(self, word: str) -> np.ndarray:
+        seed = int.from_bytes(hashlib.md5(word.encode()).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dims).astype(np.float32)
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dims, dtype=np.float32)
+        for word in self._word.findall(text.lower()):
+            vector += self._word_vector(word)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        # One model call per batch, like a real encoder
+        time.sleep(self.latency)
+        if isinstance(sentences, str):
+            return self._encode_one(sentences)
+        return np.stack([self._encode_one(text) for text in sentences]) if sentences else np.zeros((0, self.dims))
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dims
+
+
+class StubEmbedding(EmbeddingBase):
+    """mem0 embedder backed by HashingEncoder. The latency is read from `model_kwargs["latency"]`."""
+
+    def __init__(self, config: Optional[BaseEmbedderConfig] = None):
+        super().__init__(config)
+        self.config.embedding_dims = self.config.embedding_dims or 384
+        options = self.config.model_kwargs or {}
+        self.model = HashingEncoder(self.config.embedding_dims, options.get("latency", 0.0))
+
+    def embed(self, text) -> List[float]:
+        return self.model.encode(text).tolist()
+
+
+class StubGraph:
+    """Stands in for mem0's Neo4j MemoryGraph: every call waits `latency` and stores nothing."""
+
+    def __init__(self, latency: float = 0.0, llm: Optional[LLMBase] = None):
+        self.latency = latency
+        self.llm = llm or StubLLM()
+        self.embedding_model = None
+        # warm_up_components runs a query on the Neo4j connection
+        self.graph = self
+
+    def query(self, *args, **kwargs):
+        time.sleep(self.latency)
+        return []
+
+    def add(self, data, filters):
+        time.sleep(self.latency)
+        return {"added_entities": [], "deleted_entities": []}
+
+    def search(self, query, filters, limit=100):
+        time.sleep(self.latency)
+        return []
+
+    def get_all(self, filters, limit=100):
+        time.sleep(self.latency)
+        return []
+
+    def delete_all(self, filters):
+        time.sleep(self.latency)
@@ -0,0 +1,53 @@
+from typing import Iterator, List, Optional, Tuple
+
+from mem0 import Memory
+from qdrant_client.http import models
+
+# SQLite before 3.32 allows at most 999 variables per statement
+SQLITE_MAX_VARIABLES = 500
+
+
+def id_chunks(ids: List[str], size: int = SQLITE_MAX_VARIABLES) -> Iterator[List[str]]:
+    """Split ids for `IN (?, ...)` queries, which can't take more than SQLite's variable limit."""
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def count_memories(mem0: Memory, points_filter: Optional[models.Filter]) -> int:
+    vector_store = mem0.vector_store
+    return vector_store.client.count(
+        collection_name=vector_store.collection_name,
+        count_filter=points_filter,
+        exact=True,
+    ).count
+
+
+def delete_page(mem0: Memory, points_filter: Optional[models.Filter], limit: int) -> Tuple[int, int]:
+    """Delete up to `limit` memories matching `points_filter`, with their history rows.
+
+    Returns the number of memories and history rows deleted; no memories means none are left.
+    The history rows go first, so a page interrupted midway leaves its memories to the next
+    call instead of leaving history rows behind. Calling it again after a crash is safe.
+    """
+    vector_store = mem0.vector_store
+    points, _ = vector_store.client.scroll(
+        collection_name=vector_store.collection_name,
+        scroll_filter=points_filter,
+        limit=limit,
+        with_payload=False,
+        with_vectors=False,
+    )
+    if not points:
+        return 0, 0
+
+    ids = [str(point.id) for point in points]
+    history = 0
+    with mem0.db.lock:
+        with mem0.db.connection:
+            for chunk in id_chunks(ids):
+                history += mem0.db.connection.execute(
+                    f"DELETE FROM history WHERE memory_id IN ({', '.join('?' * len(chunk))})", chunk
+                ).rowcount
+    # Through the wrappers, so the memory and keyword indexes drop the ids too
+    vector_store.delete_many(ids)
+    return len(ids), history
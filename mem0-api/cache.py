@@ -0,0 +1,526 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+from components import ComponentProxy
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """A thread-safe LRU cache bounded by entry count and, optionally, entry age (ttl seconds)."""
+
+    def __init__(self, max_size: int, ttl: float = 0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key) -> Any:
+        """Return the cached value for `key`, or None when it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class EmbeddingStore:
+    """On-disk SQLite store of embeddings, so cached query embeddings survive restarts."""
+
+    def __init__(self, db_path: str, max_size: int, ttl: float = 0):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        self._inserts = 0
+        with self._lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB, created_at REAL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS embeddings_created_at ON embeddings (created_at)")
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (self.ttl and row[1] + self.ttl < time.time()):
+            return None
+        return array("f", row[0]).tolist()
+
+    def set(self, key: str, vector: List[float]):
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                (key, array("f", vector).tobytes(), time.time()),
+            )
+            self._inserts += 1
+            # Trim the oldest entries once in a while instead of on every insert
+            if self._inserts % 1000 == 0:
+                self.connection.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_size,),
+                )
+
+
+class CachedEmbedder(ComponentProxy):
+    """Embedder wrapper that caches embeddings by normalized text and embedding model name.
+
+    Texts that only differ in Unicode form or whitespace (and case, when `lowercase` is set)
+    share one cache entry. Normalization only builds the cache key: the model embeds the text
+    as given, so such texts get the vector of the first one embedded.
+    """
+
+    _whitespace = re.compile(r"\s+")
+
+    def __init__(self, embedder, model_name: str, max_size: int, ttl: float = 0, lowercase: bool = False,
+                 store: Optional[EmbeddingStore] = None):
+        super().__init__(embedder)
+        self.model_name = model_name
+        self.lowercase = lowercase
+        self._cache = LRUCache(max_size, ttl)
+        self._store = store
+        self._store_hits = 0
+
+    def normalize(self, text: str) -> str:
+        text = self._whitespace.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+        return text.lower() if self.lowercase else text
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{self.normalize(text)}".encode()).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[List[float]]:
+        vector = self._cache.get(key)
+        if vector is None and self._store is not None:
+            vector = self._store.get(key)
+            if vector is not None:
+                self._store_hits += 1
+                self._cache.set(key, vector)
+        return vector
+
+    def _remember(self, key: str, vector: List[float]):
+        self._cache.set(key, vector)
+        if self._store is not None:
+            try:
+                self._store.set(key, vector)
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to persist embedding to the cache store: {e}")
+
+    def embed(self, text):
+        key = self._key(text)
+        vector = self._lookup(key)
+        if vector is None:
+            vector = self._component.embed(text)
+            self._remember(key, vector)
+        return vector
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        vectors = [self._lookup(key) for key in keys]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            if hasattr(self._component, "embed_batch"):
+                computed = self._component.embed_batch([texts[i] for i in missing])
+            else:
+                computed = [self._component.embed(texts[i]) for i in missing]
+            for i, vector in zip(missing, computed):
+                vectors[i] = vector
+                self._remember(keys[i], vector)
+        return vectors
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        stats["model"] = self.model_name
+        stats["persistent_hits"] = self._store_hits
+        # Lookups served from the on-disk store count as in-memory misses but are still cache hits
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + self._store_hits) / lookups if lookups else 0.0
+        return stats
+
+
+class LLMResponseStore:
+    """On-disk SQLite store of LLM responses, bounded by entry count and age."""
+
+    def __init__(self, db_path: str, max_size: int, ttl: float = 0):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        self._inserts = 0
+        with self._lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses (key TEXT PRIMARY KEY, response TEXT, created_at REAL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS llm_responses_created_at ON llm_responses (created_at)")
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (self.ttl and row[1] + self.ttl < time.time()):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, response: Any):
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, response, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(response), time.time()),
+            )
+            self._inserts += 1
+            if self._inserts % 100 == 0:
+                self.connection.execute(
+                    "DELETE FROM llm_responses WHERE key IN "
+                    "(SELECT key FROM llm_responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_size,),
+                )
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+
+class CachedLLM(ComponentProxy):
+    """LLM wrapper that replays responses to identical prompts and coalesces identical concurrent calls.
+
+    Responses are keyed by a hash of the model settings (model, temperature, top_p, max_tokens)
+    and the full request (messages, response format and tools), so a cached response is only
+    returned for a request the LLM has already answered. Replaying is only equivalent to calling
+    the LLM again when the temperature is 0. Concurrent identical calls in this process wait for
+    the first one instead of each calling the LLM.
+    """
+
+    def __init__(self, llm, store: LLMResponseStore):
+        super().__init__(llm)
+        self._store = store
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _key(self, **request) -> str:
+        config = self._component.config
+        settings = {name: getattr(config, name, None) for name in ("model", "temperature", "top_p", "max_tokens")}
+        return hashlib.sha256(
+            json.dumps({**settings, **request}, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def _lookup(self, key: str) -> Any:
+        try:
+            return self._store.get(key)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read the LLM response cache: {e}")
+            return None
+
+    def generate_response(self, messages, response_format=None, tools=None, tool_choice="auto"):
+        request = {"messages": messages, "response_format": response_format, "tools": tools, "tool_choice": tool_choice}
+        key = self._key(**request)
+        response = self._lookup(key)
+        if response is not None:
+            self.hits += 1
+            return response
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            self.coalesced += 1
+            return future.result()
+
+        try:
+            # The previous leader may have finished between the lookup and taking the lead
+            response = self._lookup(key)
+            if response is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                response = self._component.generate_response(**request)
+                if response:
+                    try:
+                        self._store.set(key, response)
+                    except sqlite3.Error as e:
+                        logger.warning(f"Failed to persist the LLM response to the cache: {e}")
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._store),
+            "max_size": self._store.max_size,
+            "hits": self.hits + self.coalesced,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+SCOPE_KEYS = ("user_id", "agent_id", "run_id")
+
+
+class LocalScopeGenerations:
+    """Generation counters of result cache scopes, kept in this process."""
+
+    def __init__(self, max_scopes: int = 100000):
+        self._generations: Dict[tuple, int] = {}
+        self._max_scopes = max_scopes
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def get(self, scopes: tuple) -> tuple:
+        with self._lock:
+            return (self._epoch,) + tuple(self._generations.get(scope, 0) for scope in scopes)
+
+    def bump(self, scopes: List[tuple]):
+        with self._lock:
+            if len(self._generations) + len(scopes) > self._max_scopes:
+                # Forget the counters instead of growing forever; the epoch bump keeps old entries invalid
+                self._generations.clear()
+                self._epoch += 1
+            for scope in scopes:
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._generations.clear()
+            self._epoch += 1
+
+
+class SharedScopeGenerations:
+    """Generation counters of result cache scopes in a SQLite database shared by the server processes.
+
+    A write handled by one process then invalidates the results every other process cached.
+    """
+
+    _epoch = "*epoch"
+
+    def __init__(self, db_path: str, max_scopes: int = 100000):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._max_scopes = max_scopes
+        self._bumps = 0
+        self._connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache_generations (scope TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+            )
+
+    @staticmethod
+    def _key(scope: tuple) -> str:
+        return json.dumps(scope, ensure_ascii=False)
+
+    def get(self, scopes: tuple) -> tuple:
+        keys = [self._epoch] + [self._key(scope) for scope in scopes]
+        with self._lock:
+            rows = dict(self._connection.execute(
+                f"SELECT scope, generation FROM result_cache_generations WHERE scope IN ({', '.join('?' * len(keys))})",
+                keys,
+            ).fetchall())
+        return tuple(rows.get(key, 0) for key in keys)
+
+    def bump(self, scopes: List[tuple]):
+        with self._lock:
+            self._bumps += 1
+            if self._bumps % 1000 == 0:
+                count = self._connection.execute("SELECT COUNT(*) FROM result_cache_generations").fetchone()[0]
+                if count > self._max_scopes:
+                    self._reset()
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.executemany(
+                    """
+                    INSERT INTO result_cache_generations (scope, generation) VALUES (?, 1)
+                    ON CONFLICT (scope) DO UPDATE SET generation = generation + 1
+                """,
+                    [(self._key(scope),) for scope in scopes],
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def _reset(self):
+        # Forget the counters; the epoch bump keeps old entries invalid in every process
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._connection.execute("DELETE FROM result_cache_generations WHERE scope != ?", (self._epoch,))
+            self._connection.execute(
+                """
+                INSERT INTO result_cache_generations (scope, generation) VALUES (?, 1)
+                ON CONFLICT (scope) DO UPDATE SET generation = generation + 1
+            """,
+                (self._epoch,),
+            )
+            self._connection.execute("COMMIT")
+        except Exception:
+            self._connection.execute("ROLLBACK")
+            raise
+
+
+class ScopedResultCache:
+    """Cache of search and listing results that is invalidated per user/agent/run scope.
+
+    Every scope (e.g. `user_id=alice`) has a generation counter that writes bump. A cached
+    result remembers the generations of its scopes at the time it was computed and is only
+    served while they are unchanged. A memory matching a query carries all of the query's
+    scope ids, so any write that could change a result bumps at least one of its scopes.
+    Queries without any scope id depend on every write and use the catch-all scope.
+    The counters live in `generations`; with SharedScopeGenerations, writes in one server
+    process invalidate the results cached by the others.
+    """
+
+    _all = ("*",)
+
+    def __init__(self, max_size: int, ttl: float = 0, generations=None):
+        self._cache = LRUCache(max_size, ttl)
+        self._generations = generations if generations is not None else LocalScopeGenerations()
+        self._stale = 0
+
+    @classmethod
+    def scopes(cls, user_id=None, agent_id=None, run_id=None, namespace: Optional[str] = None) -> tuple:
+        ids = {"user_id": user_id, "agent_id": agent_id, "run_id": run_id}
+        scopes = tuple((key, ids[key]) for key in SCOPE_KEYS if ids[key]) or (cls._all,)
+        return tuple((namespace,) + scope for scope in scopes) if namespace else scopes
+
+    def generation(self, scopes: tuple) -> tuple:
+        """Snapshot the generations of `scopes`. Take it before computing the result to cache."""
+        return self._generations.get(scopes)
+
+    def get(self, key: str) -> Any:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        value, scopes, generation = entry
+        if self.generation(scopes) != generation:
+            self._cache.delete(key)
+            self._stale += 1
+            return None
+        return value
+
+    def set(self, key: str, value: Any, scopes: tuple, generation: tuple):
+        self._cache.set(key, (value, scopes, generation))
+
+    def invalidate(self, user_id=None, agent_id=None, run_id=None, namespace: Optional[str] = None):
+        """Invalidate results that may include memories of the given scope. Call after the write completed."""
+        (catch_all,) = self.scopes(namespace=namespace)
+        scopes = [scope for scope in self.scopes(user_id, agent_id, run_id, namespace) if scope != catch_all]
+        self._generations.bump(scopes + [catch_all])
+
+    def clear(self):
+        self._generations.clear()
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self._cache.stats()
+        # Entries found but invalidated by a write are misses from the client's point of view
+        stats["hits"] -= self._stale
+        stats["misses"] += self._stale
+        stats["stale"] = self._stale
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+class NamespacedResultCache:
+    """View of a ScopedResultCache whose keys and scopes belong to one namespace, e.g. a tenant.
+
+    Results of one namespace are never served to another, and writes only invalidate their own namespace.
+    """
+
+    def __init__(self, cache: ScopedResultCache, namespace: str):
+        self._cache = cache
+        self.namespace = namespace
+
+    def scopes(self, user_id=None, agent_id=None, run_id=None) -> tuple:
+        return self._cache.scopes(user_id, agent_id, run_id, self.namespace)
+
+    def generation(self, scopes: tuple) -> tuple:
+        return self._cache.generation(scopes)
+
+    def get(self, key: str) -> Any:
+        return self._cache.get((self.namespace, key))
+
+    def set(self, key: str, value: Any, scopes: tuple, generation: tuple):
+        self._cache.set((self.namespace, key), value, scopes, generation)
+
+    def invalidate(self, user_id=None, agent_id=None, run_id=None):
+        self._cache.invalidate(user_id, agent_id, run_id, self.namespace)
+
+    def clear(self):
+        # Drops the other namespaces' results too; only resets and imports clear the cache
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
@@ -0,0 +1,220 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from mem0 import Memory
+from qdrant_client.http import models
+
+from bulk_delete import delete_page
+from cache import SCOPE_KEYS
+
+logger = logging.getLogger(__name__)
+
+# Payload key holding the expiry time of a memory, set at store time from its TTL
+EXPIRES_AT = "expires_at"
+
+# About 100 years; longer TTLs would overflow the expiry datetime
+MAX_TTL_SECONDS = 100 * 365 * 86400
+
+
+def check_ttl(metadata: Optional[dict]) -> Optional[dict]:
+    """Reject a `ttl_seconds` in store metadata that isn't a positive number of seconds."""
+    ttl = (metadata or {}).get("ttl_seconds")
+    if ttl is None:
+        return metadata
+    if isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or not 0 < ttl <= MAX_TTL_SECONDS:
+        raise ValueError(f"metadata.ttl_seconds must be a number of seconds between 0 and {MAX_TTL_SECONDS}")
+    return metadata
+
+
+def with_expiry(metadata: Optional[dict], default_ttl: float) -> Optional[dict]:
+    """Add `expires_at` to the metadata of a new memory from `metadata["ttl_seconds"]` or the default TTL."""
+    ttl = (metadata or {}).get("ttl_seconds") or default_ttl
+    if not ttl:
+        return metadata
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=float(ttl))
+    return {**(metadata or {}), EXPIRES_AT: expires_at.isoformat()}
+
+
+def expired_filter(now: Optional[datetime] = None) -> models.Filter:
+    return models.Filter(must=[
+        models.FieldCondition(key=EXPIRES_AT, range=models.DatetimeRange(lt=now or datetime.now(timezone.utc)))
+    ])
+
+
+def scope_filter(scope: Tuple) -> models.Filter:
+    """Match exactly one user/agent/run combination: memories with more scope ids belong to another scope."""
+    must = []
+    for key, value in zip(SCOPE_KEYS, scope):
+        if value is None:
+            must.append(models.IsEmptyCondition(is_empty=models.PayloadField(key=key)))
+        else:
+            must.append(models.FieldCondition(key=key, match=models.MatchValue(value=value)))
+    return models.Filter(must=must)
+
+
+def list_scopes(mem0: Memory, page_size: int, throttle: "Throttle") -> List[Tuple]:
+    """Return the distinct (user_id, agent_id, run_id) combinations in the collection."""
+    vector_store = mem0.vector_store
+    scopes, offset = set(), None
+    while True:
+        started = time.monotonic()
+        points, offset = vector_store.client.scroll(
+            collection_name=vector_store.collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=list(SCOPE_KEYS),
+            with_vectors=False,
+        )
+        scopes.update(tuple((point.payload or {}).get(key) for key in SCOPE_KEYS) for point in points)
+        if offset is None:
+            return sorted(scopes, key=str)
+        throttle.pause(time.monotonic() - started)
+
+
+def near_duplicates(vectors: np.ndarray, threshold: float, block_size: int = 512) -> List[Tuple[int, int]]:
+    """Find near-duplicate rows of `vectors`, which are ordered by preference (e.g. newest first).
+
+    Returns (kept, dropped) index pairs: every row at least `threshold` cosine-similar to an
+    earlier kept row is dropped in its favour. Similarities are computed one block of rows
+    against all rows at a time, so memory stays at `block_size * len(vectors)` floats.
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.where(norms == 0, 1, norms)
+    dropped = np.zeros(len(unit), dtype=bool)
+    pairs = []
+    for start in range(0, len(unit), block_size):
+        similarities = unit[start:start + block_size] @ unit.T
+        for offset, row in enumerate(similarities):
+            i = start + offset
+            if dropped[i]:
+                continue
+            duplicates = np.nonzero(row[i + 1:] >= threshold)[0] + i + 1
+            duplicates = duplicates[~dropped[duplicates]]
+            dropped[duplicates] = True
+            pairs.extend((i, int(j)) for j in duplicates)
+    return pairs
+
+
+def _timestamp(payload: dict) -> float:
+    value = payload.get("updated_at") or payload.get("created_at")
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def merge_scope(mem0: Memory, scope: Tuple, threshold: float, max_size: int, page_size: int,
+                throttle: "Throttle") -> int:
+    """Delete the near-duplicates of one scope, keeping the most recently written memory of each group.
+
+    Each removal is recorded as a DELETE in the memory's history. Returns the number of memories removed.
+    """
+    vector_store = mem0.vector_store
+    points, offset = [], None
+    while True:
+        started = time.monotonic()
+        page, offset = vector_store.client.scroll(
+            collection_name=vector_store.collection_name,
+            scroll_filter=scope_filter(scope),
+            limit=page_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        points.extend(page)
+        throttle.pause(time.monotonic() - started)
+        if len(points) > max_size:
+            logger.warning(f"Not merging scope {scope}: it has more than {max_size} memories")
+            return 0
+        if offset is None:
+            break
+    if len(points) < 2:
+        return 0
+
+    started = time.monotonic()
+    points.sort(key=lambda point: _timestamp(point.payload or {}), reverse=True)
+    pairs = near_duplicates(np.asarray([point.vector for point in points], dtype=np.float32), threshold)
+    if not pairs:
+        throttle.pause(time.monotonic() - started)
+        return 0
+    dropped = [points[j] for _, j in pairs]
+    vector_store.delete_many([str(point.id) for point in dropped])
+    for point in dropped:
+        mem0.db.add_history(str(point.id), (point.payload or {}).get("data"), None, "DELETE", is_deleted=1)
+    throttle.pause(time.monotonic() - started)
+    return len(dropped)
+
+
+class Throttle:
+    """Keeps a background task to a share of wall time and holds it back while live requests run.
+
+    After each unit of work taking `t` seconds it sleeps `t * (1 - duty_cycle) / duty_cycle`, then
+    waits (up to `max_wait` seconds) for `busy()` to turn false.
+    """
+
+    def __init__(self, duty_cycle: float, busy: Callable[[], bool] = lambda: False, max_wait: float = 30):
+        self.duty_cycle = min(max(duty_cycle, 0.01), 1.0)
+        self.busy = busy
+        self.max_wait = max_wait
+
+    def pause(self, worked: float):
+        time.sleep(worked * (1 - self.duty_cycle) / self.duty_cycle)
+        deadline = time.monotonic() + self.max_wait
+        while self.busy() and time.monotonic() < deadline:
+            time.sleep(0.2)
+
+
+def compact(mem0: Memory, settings: dict, throttle: Throttle, report: Callable[[dict], None]) -> Dict[str, int]:
+    """Run one compaction pass: delete expired memories, then merge near-duplicates scope by scope."""
+    progress = {"expired": 0, "scopes": 0, "merged": 0}
+    cutoff = datetime.now(timezone.utc)
+    while True:
+        started = time.monotonic()
+        deleted, _ = delete_page(mem0, expired_filter(cutoff), settings["page_size"])
+        if not deleted:
+            break
+        progress["expired"] += deleted
+        report(progress)
+        throttle.pause(time.monotonic() - started)
+
+    if settings["dedup_threshold"]:
+        for scope in list_scopes(mem0, settings["page_size"], throttle):
+            progress["merged"] += merge_scope(
+                mem0, scope, settings["dedup_threshold"], settings["max_scope_size"], settings["page_size"], throttle
+            )
+            progress["scopes"] += 1
+            report(progress)
+    return progress
+
+
+class PeriodicTask:
+    """Calls `func` every `interval` seconds on a daemon thread until stopped."""
+
+    def __init__(self, func: Callable[[], None], interval: float, name: str):
+        self.func = func
+        self.interval = interval
+        self.name = name
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name=f"mem0-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.func()
+            except Exception as e:
+                logger.error(f"{self.name} failed: {e}")
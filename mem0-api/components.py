@@ -0,0 +1,55 @@
+import functools
+import threading
+
+
+class ComponentProxy:
+    """Base class for wrappers around the components mem0 builds (embedder, vector store, LLM...).
+
+    Subclasses override the methods they want to intercept; every other attribute is
+    forwarded to the wrapped component, so mem0 keeps working with the wrapper unchanged.
+    """
+
+    def __init__(self, component):
+        self._component = component
+
+    def __getattr__(self, name):
+        return getattr(self._component, name)
+
+    @property
+    def wrapped(self):
+        return self._component
+
+
+def find_component(component, cls):
+    """Return the first object of type `cls` in a chain of wrappers around a component, or None."""
+    while component is not None:
+        if isinstance(component, cls):
+            return component
+        component = component.wrapped if isinstance(component, ComponentProxy) else None
+    return None
+
+
+class SerializedComponent(ComponentProxy):
+    """Wrapper that lets only one thread at a time call the listed methods of a component.
+
+    Meant for components that aren't thread-safe, such as mem0's history database, which
+    shares a single SQLite connection between all threads. Code that uses the component's
+    internals directly should hold `lock` as well.
+    """
+
+    def __init__(self, component, methods):
+        super().__init__(component)
+        self.lock = threading.RLock()
+        self._methods = set(methods)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._component, name)
+        if name not in self._methods:
+            return attribute
+
+        @functools.wraps(attribute)
+        def serialized(*args, **kwargs):
+            with self.lock:
+                return attribute(*args, **kwargs)
+
+        return serialized
@@ -1,15 +1,52 @@
+import logging
+import threading
+from contextlib import contextmanager
 import dotenv
 from typenv import Env
-from fastapi import status, Depends
+from fastapi import status, Depends, Request
 from fastapi.exceptions import HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import List, Optional
-from typing_extensions import TypedDict
+from typing import Dict, List, Optional
 from mem0 import Memory
-from mem0_config import vector_config, llm_config, embedding_config, graph_config
-from errors.exception import UnauthorizedException, DatabaseConnectionError
+from mem0.configs.base import MemoryConfig
+from mem0_config import (
+    vector_config, llm_config, embedding_config, graph_config,
+    executor_config, batch_config, job_config, embedding_cache_config, result_cache_config,
+    memory_index_config, onnx_embedding_config, hybrid_search_config, payload_index_config,
+    qdrant_tuning_config, llm_cache_config, tenancy_config, rerank_config,
+    update_buffer_config
+)
+from executor import MemoryExecutor
+from jobs import JobQueue
+from update_buffer import UpdateBuffer
+from batcher import BatchingEmbedder, BatchingVectorStore
+from cache import (
+    CachedEmbedder,
+    CachedLLM,
+    EmbeddingStore,
+    LLMResponseStore,
+    NamespacedResultCache,
+    ScopedResultCache,
+    SharedScopeGenerations,
+)
+from components import ComponentProxy, SerializedComponent, find_component
+from memory_index import MemoryIndex, IndexedVectorStore
+from payload_index import ensure_payload_indexes
+from keyword_index import KeywordIndex, KeywordIndexedVectorStore, rebuild_keyword_index
+from metrics import InstrumentedComponent
+from rerank import CrossEncoderReranker
+from shared_models import load_cross_encoder, register_shared_embedders
+from onnx_embedder import register_onnx_embedder
+from tuned_qdrant import register_tuned_qdrant
+from tenancy import (
+    InvalidTenantError, TenantPool, collection_tenants, current_tenant, hold_for_request, resolve_tenant,
+    tenant_collection, tenant_context, tenant_path
+)
+from errors.exception import UnauthorizedException, DatabaseConnectionError, TenantError
 from qdrant_client.http.exceptions import ResponseHandlingException
 
+logger = logging.getLogger(__name__)
+
 dotenv.load_dotenv()
 
 env = Env()
@@ -17,49 +54,422 @@ env = Env()
 authorization_scheme = HTTPBearer(auto_error=False)
 
 
-class MemoryHistory(TypedDict):
-    is_deleted: bool
+async def authorize(
+        request: Request,
+        token: Optional[HTTPAuthorizationCredentials] = Depends(authorization_scheme)
+):
+    """Check the bearer token and serve the rest of the request for the tenant it (or the tenant header) names.
+
+    Async, so that the tenant set here is seen by the endpoint and the work it hands to the executor.
+    """
+    auth_key = env.str("MEM0_API_AUTH_KEY", default="")
+    credentials = token.credentials if token is not None else None
+    if not (auth_key == "" or credentials == auth_key or credentials in tenancy_config["tokens"]):
+        raise UnauthorizedException()
+    try:
+        tenant = resolve_tenant(
+            tenancy_config["mode"], request.headers.get(tenancy_config["header"]), credentials, tenancy_config["tokens"]
+        )
+    except InvalidTenantError as e:
+        raise TenantError(str(e))
+    if tenant is None and tenancy_config["required"]:
+        raise TenantError("This request needs a tenant")
+    current_tenant.set(tenant)
+    if tenant is not None:
+        # An instance evicted while the request uses it is closed after the response
+        hold_for_request(get_tenant_pool().hold(tenant))
 
 
 # delay initialization mem0
 _mem0 = None
+_mem0_lock = threading.Lock()
 
 def get_mem0():
+    """Return the Memory instance of the current tenant, or the default one outside of a tenant."""
+    tenant = current_tenant.get()
+    if tenant is not None:
+        return get_tenant_pool().get(tenant)
     global _mem0
     if _mem0 is None:
-        try:
-            _mem0 = Memory.from_config({
-                "vector_store": vector_config,
-                "llm": llm_config,
-                "embedder": embedding_config,
-                "graph_store": graph_config,
-                "version": "v1.1"
-            })
-        except ResponseHandlingException as e:
-            if "timed out" in str(e):
-                raise DatabaseConnectionError()
-            raise
+        # Concurrent first requests wait for one construction instead of each loading the models
+        with _mem0_lock:
+            if _mem0 is None:
+                if onnx_embedding_config["enabled"]:
+                    register_onnx_embedder()
+                else:
+                    register_shared_embedders()
+                register_tuned_qdrant(qdrant_tuning_config)
+                mem0 = create_memory()
+                install_components(mem0)
+                _mem0 = mem0
+    return _mem0
+
+
+async def load_mem0() -> Memory:
+    """Return the Memory instance of the current tenant from an async endpoint.
+
+    Building an instance creates its collection, payload indexes and keyword index, so an instance
+    that isn't built yet is built on the admin pool instead of blocking the event loop.
+    """
+    tenant = current_tenant.get()
+    mem0 = get_tenant_pool().peek(tenant) if tenant is not None else _mem0
+    if mem0 is None:
+        mem0 = await get_executor().run("admin", get_mem0)
+    return mem0
+
+
+def create_memory(tenant: Optional[str] = None) -> Memory:
+    """Build a Memory instance on the default collection, or on the collection and history database of `tenant`."""
+    config = {
+        "vector_store": vector_config,
+        "llm": llm_config,
+        "embedder": embedding_config,
+        "version": "v1.1"
+    }
+    if tenant is not None:
+        collection_name = tenant_collection(vector_config["config"]["collection_name"], tenant)
+        config["vector_store"] = {**vector_config, "config": {**vector_config["config"], "collection_name": collection_name}}
+        config["history_db_path"] = tenant_path(MemoryConfig().history_db_path, tenant)
+    elif graph_config is not None:
+        # The graph store keeps no tenant apart from another, so only the default collection uses it
+        config["graph_store"] = graph_config
+    try:
+        return Memory.from_config(config)
+    except ResponseHandlingException as e:
+        if "timed out" in str(e):
+            raise DatabaseConnectionError()
+        raise
+
+
+def create_tenant_memory(tenant: str) -> Memory:
+    default = _default_mem0()
+    mem0 = create_memory(tenant)
+    # Share the loaded embedding model, its batcher and caches, and the LLM with the default instance
+    mem0.embedding_model = default.embedding_model
+    mem0.llm = default.llm
+    install_components(mem0, tenant)
+    ensure_payload_indexes(mem0.vector_store, payload_index_config["fields"])
+    logger.info(f"Opened collection {mem0.collection_name} of tenant {tenant}")
+    return mem0
+
+
+def _default_mem0() -> Memory:
+    with tenant_context(None):
+        return get_mem0()
+
+
+def peek_mem0() -> Optional[Memory]:
+    """Return the Memory instance if it has already been initialized, without initializing it."""
     return _mem0
 
 
+def drop_tenant_indexes(tenant: str, mem0: Memory):
+    # The next instance of the tenant opens them again; this one's are closed with it by close_tenant_memory
+    with _index_lock:
+        _memory_indexes.pop(tenant, None)
+        _keyword_indexes.pop(tenant, None)
+
+
+def close_tenant_memory(tenant: str, mem0: Memory):
+    """Close the connections and files of an evicted tenant instance, once no request or job uses it."""
+    closers = [mem0.db.connection.close]
+    for wrapper in (IndexedVectorStore, KeywordIndexedVectorStore):
+        vector_store = find_component(mem0.vector_store, wrapper)
+        if vector_store is not None:
+            closers.append(vector_store.index.close)
+    # The default instance's client may be shared, e.g. by a local Qdrant
+    if _mem0 is None or _unwrap(mem0.vector_store.client) is not _unwrap(_mem0.vector_store.client):
+        closers.append(mem0.vector_store.client.close)
+    for close in closers:
+        try:
+            close()
+        except Exception as e:
+            logger.warning(f"Failed to close a resource of tenant {tenant}: {e}")
+    logger.info(f"Closed collection {mem0.collection_name} of tenant {tenant}")
+
+
+def _unwrap(component):
+    while isinstance(component, ComponentProxy):
+        component = component.wrapped
+    return component
+
+
+_tenant_pool = None
+
+def get_tenant_pool() -> TenantPool:
+    global _tenant_pool
+    if _tenant_pool is None:
+        _tenant_pool = TenantPool(
+            create_tenant_memory, tenancy_config["max_instances"], on_evict=drop_tenant_indexes, close=close_tenant_memory
+        )
+    return _tenant_pool
+
+
+@contextmanager
+def serving_tenant(tenant: Optional[str]):
+    """Serve the enclosed calls (e.g. a background job) for `tenant`, holding its instance open meanwhile."""
+    with tenant_context(tenant):
+        if tenant is None:
+            yield
+            return
+        with get_tenant_pool().hold(tenant):
+            yield
+
+
+def list_tenants() -> List[str]:
+    """Return every tenant with a collection in Qdrant, including the ones without an open instance."""
+    if tenancy_config["mode"] == "off":
+        return []
+    client = _default_mem0().vector_store.client
+    collections = [collection.name for collection in client.get_collections().collections]
+    tenants = collection_tenants(vector_config["config"]["collection_name"], collections)
+    return sorted(set(tenants) | set(get_tenant_pool().tenants()))
+
+
+# Memory and keyword indexes per tenant (None is the default collection). They are kept across
+# `Memory.reset()`, which empties them through the vector store wrappers.
+_memory_indexes: Dict[Optional[str], MemoryIndex] = {}
+_keyword_indexes: Dict[Optional[str], KeywordIndex] = {}
+_index_lock = threading.Lock()
+
+def open_memory_index(tenant: Optional[str], history_connection) -> MemoryIndex:
+    with _index_lock:
+        if tenant not in _memory_indexes:
+            _memory_indexes[tenant] = MemoryIndex(
+                tenant_path(memory_index_config["path"], tenant), history_connection=history_connection
+            )
+        return _memory_indexes[tenant]
+
+
+def open_keyword_index(tenant: Optional[str], vector_store) -> KeywordIndex:
+    """Open the keyword index of hybrid search.
+
+    An empty index is filled from the collection on first use, so enabling hybrid search on
+    an existing collection needs no separate migration.
+    """
+    with _index_lock:
+        if tenant not in _keyword_indexes:
+            index = KeywordIndex(tenant_path(hybrid_search_config["path"], tenant), hybrid_search_config["tokenizer"])
+            if len(index) == 0:
+                rebuild_keyword_index(index, vector_store)
+            _keyword_indexes[tenant] = index
+        return _keyword_indexes[tenant]
+
+
+def get_memory_index() -> MemoryIndex:
+    return find_component(get_mem0().vector_store, IndexedVectorStore).index
+
+
+def get_keyword_index(mem0: Optional[Memory] = None) -> Optional[KeywordIndex]:
+    """Return the keyword index of hybrid search, or None when it is disabled."""
+    vector_store = find_component((mem0 or get_mem0()).vector_store, KeywordIndexedVectorStore)
+    return vector_store.index if vector_store is not None else None
+
+
+def embedding_cache_model_name() -> str:
+    """Name cached embeddings by model and backend: ONNX (and int8) vectors differ slightly from PyTorch ones."""
+    model_name = embedding_config["config"]["model"]
+    if onnx_embedding_config["enabled"]:
+        model_name += ":onnx-int8" if onnx_embedding_config["options"]["quantize"] else ":onnx"
+    return model_name
+
+
+_llm_response_store = None
+
+def cached_llm(llm):
+    """Wrap an LLM with the response cache when it is enabled."""
+    global _llm_response_store
+    if not llm_cache_config["enabled"]:
+        return llm
+    if _llm_response_store is None:
+        _llm_response_store = LLMResponseStore(
+            llm_cache_config["path"], max_size=llm_cache_config["max_size"], ttl=llm_cache_config["ttl_seconds"]
+        )
+    if getattr(llm.config, "temperature", 0):
+        logger.warning(
+            f"The LLM response cache is enabled with temperature {llm.config.temperature}: "
+            "identical prompts will get the first response instead of a new sample"
+        )
+    return CachedLLM(llm, _llm_response_store)
+
+
+def install_components(mem0: Memory, tenant: Optional[str] = None):
+    """Wrap the components built by mem0 with the service's batching, caching, indexing and metrics layers.
+
+    Safe to call again after `Memory.reset()`, which replaces the vector store with a fresh instance.
+    """
+    max_wait = batch_config["max_wait_ms"] / 1000
+    if not isinstance(mem0.embedding_model, ComponentProxy):
+        mem0.embedding_model = BatchingEmbedder(mem0.embedding_model, batch_config["max_size"], max_wait)
+        if embedding_cache_config["enabled"]:
+            mem0.embedding_model = CachedEmbedder(
+                mem0.embedding_model,
+                model_name=embedding_cache_model_name(),
+                max_size=embedding_cache_config["max_size"],
+                ttl=embedding_cache_config["ttl_seconds"],
+                lowercase=embedding_cache_config["lowercase"],
+                store=EmbeddingStore(
+                    embedding_cache_config["path"],
+                    max_size=embedding_cache_config["disk_max_size"],
+                    ttl=embedding_cache_config["ttl_seconds"]
+                ) if embedding_cache_config["path"] else None
+            )
+        mem0.embedding_model = InstrumentedComponent(mem0.embedding_model, "embed")
+    if not isinstance(mem0.vector_store, ComponentProxy):
+        mem0.vector_store = BatchingVectorStore(mem0.vector_store, batch_config["max_size"], max_wait)
+        mem0.vector_store = IndexedVectorStore(mem0.vector_store, open_memory_index(tenant, mem0.db.connection))
+        if hybrid_search_config["enabled"]:
+            mem0.vector_store = KeywordIndexedVectorStore(mem0.vector_store, open_keyword_index(tenant, mem0.vector_store))
+        mem0.vector_store = InstrumentedComponent(mem0.vector_store, "vector_store")
+    if not isinstance(mem0.llm, ComponentProxy):
+        mem0.llm = InstrumentedComponent(cached_llm(mem0.llm), "llm")
+    if not isinstance(mem0.db, ComponentProxy):
+        # mem0 shares one SQLite connection between all threads, so calls on it must not interleave
+        mem0.db = SerializedComponent(mem0.db, ("add_history", "get_history", "reset"))
+        mem0.db = InstrumentedComponent(mem0.db, "history_db")
+    if mem0.enable_graph and not isinstance(mem0.graph, ComponentProxy):
+        # Share the (batched) embedding model instead of keeping a second copy for the graph store
+        mem0.graph.embedding_model = mem0.embedding_model
+        mem0.graph.llm = InstrumentedComponent(cached_llm(mem0.graph.llm), "llm")
+        mem0.graph = InstrumentedComponent(mem0.graph, "graph_store")
+
+
+def warm_up_components():
+    """Build everything the first requests would otherwise build, and pay the first-call costs now."""
+    mem0 = get_mem0()
+    # The first encode allocates the model's buffers and is much slower than the following ones.
+    # Call the model directly so the warm-up text doesn't end up in the embedding cache or metrics.
+    find_component(mem0.embedding_model, BatchingEmbedder).wrapped.embed("warm up")
+    # Open the connections to the databases
+    mem0.vector_store.client.get_collections()
+    ensure_payload_indexes(mem0.vector_store, payload_index_config["fields"])
+    with mem0.db.lock:
+        mem0.db.connection.execute("SELECT 1").fetchone()
+    if mem0.enable_graph:
+        mem0.graph.graph.query("RETURN 1")
+    if rerank_config["default_mode"] == "cross-encoder":
+        load_cross_encoder(rerank_config["model"]).predict([("warm up", "warm up")], show_progress_bar=False)
+    get_job_queue()
+    get_result_cache()
+    get_executor()
+
+
+def reset_mem0():
+    """Reset the memory store and re-install the service components on the new vector store."""
+    mem0 = get_mem0()
+    mem0.reset()
+    install_components(mem0, current_tenant.get())
+    # The collection was recreated without its payload indexes
+    ensure_payload_indexes(mem0.vector_store, payload_index_config["fields"])
+
+
+_executor = None
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = MemoryExecutor(executor_config)
+    return _executor
+
+
+def shutdown_executor():
+    """Wait for the queued and running operations, then stop the pools. The next call builds new ones."""
+    global _executor
+    executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+_result_cache = None
+
+def get_result_cache() -> Optional[ScopedResultCache]:
+    """Return the search/listing result cache of the current tenant, or None when it is disabled."""
+    global _result_cache
+    if _result_cache is None and result_cache_config["enabled"]:
+        _result_cache = ScopedResultCache(
+            result_cache_config["max_size"],
+            result_cache_config["ttl_seconds"],
+            SharedScopeGenerations(result_cache_config["generations_path"]),
+        )
+    tenant = current_tenant.get()
+    if _result_cache is not None and tenant is not None:
+        # One cache for all tenants, with keys and scopes kept apart
+        return NamespacedResultCache(_result_cache, tenant)
+    return _result_cache
+
+
+_reranker = None
+
+def get_reranker():
+    """Return the cross-encoder reranker; its model is loaded by the first search that uses it."""
+    global _reranker
+    if _reranker is None:
+        _reranker = InstrumentedComponent(
+            CrossEncoderReranker(
+                rerank_config["model"],
+                batch_size=rerank_config["batch_size"],
+                cache_size=rerank_config["cache_size"],
+                ttl=rerank_config["cache_ttl_seconds"]
+            ),
+            "rerank"
+        )
+    return _reranker
+
+
+_job_queue = None
+
+def get_job_queue():
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(
+            job_config["db_path"],
+            lease_seconds=job_config["lease_seconds"],
+            max_attempts=job_config["max_attempts"],
+            retention_hours=job_config["retention_hours"]
+        )
+    return _job_queue
+
+
+_update_buffer = None
+
+def get_update_buffer() -> Optional[UpdateBuffer]:
+    """Return the write-ahead buffer of /update calls, or None when updates are applied right away."""
+    global _update_buffer
+    if _update_buffer is None and update_buffer_config["enabled"]:
+        _update_buffer = UpdateBuffer(
+            update_buffer_config["path"],
+            window=update_buffer_config["window_ms"] / 1000,
+            max_batch=update_buffer_config["max_batch"],
+            lease_seconds=update_buffer_config["lease_seconds"],
+            max_attempts=update_buffer_config["max_attempts"]
+        )
+    return _update_buffer
+
+
+def get_job_id(job_id: str, token=Depends(authorize)):
+    job = get_job_queue().get(job_id)
+    # Jobs of other tenants don't exist as far as this request is concerned
+    if job is None or job["tenant"] != current_tenant.get():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Job {job_id} not found')
+    return job_id
+
+
 def get_memory_id(
         memory_id: str = None,
+        token=Depends(authorize)
 ):
     if memory_id is None:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="memory_id cannot be None")
 
-    mem0 = get_mem0()
-    memory_histories: List[MemoryHistory] = mem0.history(memory_id=memory_id)
+    memory_index = get_memory_index()
+    is_live = memory_index.state(memory_id)
+    if is_live is None:
+        # Unknown to this process, e.g. stored by another server process: check the vector store once
+        is_live = get_mem0().vector_store.get(vector_id=memory_id) is not None
+        if is_live:
+            memory_index.mark_live([memory_id])
 
-    if len(memory_histories) == 0 or memory_histories[-1].get("is_deleted"):
+    if not is_live:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f'Memory {memory_id} not found')
 
     return memory_id
-
-
-def authorize(token: Optional[HTTPAuthorizationCredentials] = Depends(authorization_scheme)):
-    auth_key = env.str("MEM0_API_AUTH_KEY", default="")
-    if auth_key == "" or (token is not None and token.credentials == auth_key):
-        pass
-    else:
-        raise UnauthorizedException()
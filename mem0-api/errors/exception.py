@@ -42,3 +42,49 @@ class DatabaseRequestError(ErrorHttpException):
             error="DatabaseRequestError",
             message=f"数据库请求错误: {message}"
         )
+
+
+class ServiceOverloadedError(ErrorHttpException):
+    def __init__(self, operation: str):
+        super().__init__(
+            code=status.HTTP_429_TOO_MANY_REQUESTS,
+            error="ServiceOverloadedError",
+            message=f"Too many pending {operation} operations. Please retry later."
+        )
+
+
+class ServiceTimeoutError(ErrorHttpException):
+    def __init__(self, operation: str):
+        super().__init__(
+            code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            error="ServiceTimeoutError",
+            message=f"The {operation} operation waited too long in the queue. Please retry later."
+        )
+
+
+class UnindexedFilterError(ErrorHttpException):
+    def __init__(self, fields: list):
+        super().__init__(
+            code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            error="UnindexedFilterError",
+            message=f"Filtering on {', '.join(fields)} is not allowed: no payload index covers these fields. "
+                    "Add them to PAYLOAD_INDEX_FIELDS."
+        )
+
+
+class TenantError(ErrorHttpException):
+    def __init__(self, message: str):
+        super().__init__(
+            code=status.HTTP_400_BAD_REQUEST,
+            error="TenantError",
+            message=message
+        )
+
+
+class InvalidExportError(ErrorHttpException):
+    def __init__(self, message: str):
+        super().__init__(
+            code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            error="InvalidExportError",
+            message=message
+        )
@@ -1,6 +1,6 @@
 from fastapi import Request, status
 from fastapi.responses import JSONResponse
-from .exception import UnauthorizedException, DatabaseConnectionError, DatabaseRequestError
+from .exception import UnauthorizedException, DatabaseConnectionError, DatabaseRequestError, ErrorHttpException
 from response import ErrorResponse
 from qdrant_client.http.exceptions import UnexpectedResponse, ResponseHandlingException
 
@@ -60,3 +60,37 @@ def response_handling_exception_handler(request: Request, exc: ResponseHandlingE
             message=str(exc)
         ).dict()
     )
+
+
+def service_unavailable_handler(request: Request, exc: ErrorHttpException):
+    return JSONResponse(
+        status_code=exc.code,
+        content=ErrorResponse(
+            code=exc.code,
+            error=exc.error,
+            message=exc.message
+        ).dict(),
+        headers={"Retry-After": "1"}
+    )
+
+
+def tenant_error_handler(request: Request, exc: ErrorHttpException):
+    return JSONResponse(
+        status_code=exc.code,
+        content=ErrorResponse(
+            code=exc.code,
+            error=exc.error,
+            message=exc.message
+        ).dict()
+    )
+
+
+def unindexed_filter_error_handler(request: Request, exc: ErrorHttpException):
+    return JSONResponse(
+        status_code=exc.code,
+        content=ErrorResponse(
+            code=exc.code,
+            error=exc.error,
+            message=exc.message
+        ).dict()
+    )
@@ -0,0 +1,99 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from errors.exception import ServiceOverloadedError, ServiceTimeoutError
+
+
+class OperationPool:
+    """A bounded thread pool for one kind of mem0 operation.
+
+    At most `max_workers` calls run at the same time and at most `max_queue` more may wait
+    for a free worker. Calls beyond that are rejected immediately instead of piling up, and
+    calls that waited longer than `queue_timeout` seconds are dropped before they start.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, queue_timeout: float = 0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"mem0-{name}")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run `func(*args, **kwargs)` on the pool and wait for the result without blocking the event loop."""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise ServiceOverloadedError(self.name)
+            self._pending += 1
+
+        enqueued_at = time.monotonic()
+
+        def call():
+            try:
+                if self.queue_timeout and time.monotonic() - enqueued_at > self.queue_timeout:
+                    with self._lock:
+                        self._timed_out += 1
+                    raise ServiceTimeoutError(self.name)
+                with self._lock:
+                    self._running += 1
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    with self._lock:
+                        self._running -= 1
+            finally:
+                with self._lock:
+                    self._pending -= 1
+
+        loop = asyncio.get_running_loop()
+        # Run with the caller's context variables, e.g. the tenant of the request
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, context.run, call)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+class MemoryExecutor:
+    """Dispatches blocking mem0 calls onto separate pools per operation type.
+
+    Keeping writes, searches and admin operations apart means a saturated ingestion pool
+    (LLM extraction, embedding, vector and graph writes) never delays searches.
+    """
+
+    def __init__(self, config: Dict[str, Dict[str, Any]]):
+        self.pools = {
+            name: OperationPool(name, **pool_config)
+            for name, pool_config in config.items()
+        }
+
+    async def run(self, operation: str, func: Callable, *args, **kwargs) -> Any:
+        return await self.pools[operation].run(func, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def shutdown(self, wait: bool = True):
+        for pool in self.pools.values():
+            pool.shutdown(wait=wait)
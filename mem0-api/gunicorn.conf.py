@@ -0,0 +1,52 @@
+# Production server: gunicorn -c gunicorn.conf.py app:app
+#
+# The app and the embedding model are loaded once in the master process and the workers are
+# forked from it, so the model weights are shared between workers instead of copied into each.
+# Memory, its database connections and thread pools are created by each worker after the fork.
+import multiprocessing
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from typenv import Env
+
+env = Env()
+env.read_env(os.path.join(Path(__file__).parent.parent, ".env"))
+
+bind = f"0.0.0.0:{env.int('MEM0_API_PORT', default=8000)}"
+workers = env.int("MEM0_API_WORKERS", default=2)
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+# Model loading and warm-up happen in the lifespan, well within this timeout
+timeout = env.int("MEM0_API_WORKER_TIMEOUT", default=120)
+graceful_timeout = 30
+keepalive = 5
+
+# Split the cores between the workers' torch thread pools instead of each worker using all of them
+torch_threads = env.int("MEM0_API_TORCH_THREADS", default=max(1, multiprocessing.cpu_count() // workers))
+
+# Prometheus samples of all workers are merged from files in this directory. It has to be set
+# before the app (and prometheus_client) is imported, and start empty on every launch.
+prometheus_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "mem0-api-prometheus")
+)
+shutil.rmtree(prometheus_dir, ignore_errors=True)
+os.makedirs(prometheus_dir, exist_ok=True)
+
+
+def on_starting(server):
+    from mem0_config import embedding_config, rerank_config
+    from shared_models import preload_embedding_model, preload_rerank_model
+    preload_embedding_model(embedding_config)
+    preload_rerank_model(rerank_config)
+
+
+def post_fork(server, worker):
+    from shared_models import set_torch_threads
+    set_torch_threads(torch_threads)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
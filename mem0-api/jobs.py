@@ -0,0 +1,247 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Pass to JobQueue.stats to count the jobs of every tenant; tenant names never contain "*"
+ALL_TENANTS = "*"
+
+
+class JobQueue:
+    """A durable job queue stored in a local SQLite database.
+
+    Jobs survive restarts: a job claimed by a worker holds a lease, and if the process dies
+    before finishing it, the job becomes claimable again once the lease expires. Leases also
+    make the queue safe to share between several server processes using the same database file.
+    Each job kind has its own worker threads, registered with `register`. Long-running handlers
+    call `report_progress`, which also renews the lease, and resume from `current_progress`.
+    Jobs belong to the tenant that enqueued them ('' in the database for the default collection).
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = 300, max_attempts: int = 3,
+                 poll_interval: float = 1.0, retention_hours: float = 24):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_hours * 3600
+        self.connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        self._handlers: Dict[str, Callable[[dict], Any]] = {}
+        self._workers: Dict[str, int] = {}
+        self._threads: List[threading.Thread] = []
+        self._wakeups: Dict[str, threading.Event] = {}
+        self._stopping = threading.Event()
+        self._last_prune = 0.0
+        # The id of the job running on each worker thread
+        self._local = threading.local()
+        self._create_jobs_table()
+
+    def _create_jobs_table(self):
+        with self._lock:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT,
+                    status TEXT,
+                    payload TEXT,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER DEFAULT 0,
+                    lease_expires_at REAL,
+                    created_at REAL,
+                    updated_at REAL
+                )
+            """
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_kind_status ON jobs (kind, status, created_at)")
+            columns = {row[1] for row in self.connection.execute("PRAGMA table_info(jobs)")}
+            if "progress" not in columns:
+                # Added after the first release of the queue
+                self.connection.execute("ALTER TABLE jobs ADD COLUMN progress TEXT")
+            if "tenant" not in columns:
+                self.connection.execute("ALTER TABLE jobs ADD COLUMN tenant TEXT NOT NULL DEFAULT ''")
+
+    def register(self, kind: str, handler: Callable[[dict], Any], workers: int = 1):
+        """Register the handler run for jobs of `kind` and the number of worker threads draining them."""
+        self._handlers[kind] = handler
+        self._workers[kind] = workers
+        self._wakeups[kind] = threading.Event()
+
+    def start(self):
+        self._stopping.clear()
+        for kind, workers in self._workers.items():
+            for i in range(workers):
+                thread = threading.Thread(target=self._work, args=(kind,), name=f"mem0-job-{kind}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        for event in self._wakeups.values():
+            event.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def enqueue(self, kind: str, payload: dict, tenant: Optional[str] = None) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            self.connection.execute(
+                "INSERT INTO jobs (id, kind, status, payload, tenant, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), tenant or "", now, now),
+            )
+        self._wakeups[kind].set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT id, kind, status, result, error, attempts, created_at, updated_at, progress, tenant FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "result": json.loads(row[3]) if row[3] is not None else None,
+            "error": row[4],
+            "attempts": row[5],
+            "created_at": row[6],
+            "updated_at": row[7],
+            "progress": json.loads(row[8]) if row[8] is not None else None,
+            "tenant": row[9] or None,
+        }
+
+    def report_progress(self, progress: Any):
+        """Save the progress of the job running on this thread and renew its lease.
+
+        Does nothing outside of a job, so handlers can also be called directly.
+        """
+        job_id = getattr(self._local, "job_id", None)
+        if job_id is None:
+            return
+        now = time.time()
+        with self._lock:
+            self.connection.execute(
+                "UPDATE jobs SET progress = ?, lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(progress, default=str), now + self.lease_seconds, now, job_id),
+            )
+
+    def current_progress(self) -> Any:
+        """Return the last progress saved by the job running on this thread, e.g. before a restart, or None."""
+        job_id = getattr(self._local, "job_id", None)
+        if job_id is None:
+            return None
+        with self._lock:
+            row = self.connection.execute("SELECT progress FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None and row[0] is not None else None
+
+    def count(self, kind: str, status: str = "queued") -> int:
+        with self._lock:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE kind = ? AND status = ?", (kind, status)
+            ).fetchone()[0]
+
+    def stats(self, tenant: Optional[str] = ALL_TENANTS) -> Dict[str, Dict[str, int]]:
+        """Return the number of jobs of `tenant` per status for every registered kind."""
+        stats = {kind: {"queued": 0, "running": 0, "succeeded": 0, "failed": 0} for kind in self._handlers}
+        with self._lock:
+            if tenant == ALL_TENANTS:
+                rows = self.connection.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status").fetchall()
+            else:
+                rows = self.connection.execute(
+                    "SELECT kind, status, COUNT(*) FROM jobs WHERE tenant = ? GROUP BY kind, status", (tenant or "",)
+                ).fetchall()
+        for kind, status, count in rows:
+            stats.setdefault(kind, {})[status] = count
+        return stats
+
+    def _claim(self, kind: str) -> Optional[tuple]:
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so two processes can't claim the same job
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.connection.execute(
+                    """
+                    SELECT id, payload, attempts FROM jobs
+                    WHERE kind = ? AND (status = 'queued' OR (status = 'running' AND lease_expires_at < ?))
+                    ORDER BY created_at LIMIT 1
+                """,
+                    (kind, now),
+                ).fetchone()
+                if row is None:
+                    self.connection.execute("COMMIT")
+                    return None
+                self.connection.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                    (now + self.lease_seconds, now, row[0]),
+                )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return row[0], json.loads(row[1]), row[2] + 1
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: str = None):
+        with self._lock:
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, lease_expires_at = NULL, updated_at = ? WHERE id = ?",
+                (status, json.dumps(result, default=str) if result is not None else None, error, time.time(), job_id),
+            )
+
+    def _prune(self):
+        now = time.time()
+        if now - self._last_prune < 600:
+            return
+        self._last_prune = now
+        with self._lock:
+            self.connection.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?",
+                (now - self.retention_seconds,),
+            )
+
+    def _work(self, kind: str):
+        handler = self._handlers[kind]
+        wakeup = self._wakeups[kind]
+        while not self._stopping.is_set():
+            wakeup.clear()
+            try:
+                claimed = self._claim(kind)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to claim a {kind} job: {e}")
+                claimed = None
+            if claimed is None:
+                self._prune()
+                wakeup.wait(self.poll_interval)
+                continue
+
+            job_id, payload, attempts = claimed
+            self._local.job_id = job_id
+            try:
+                result = handler(payload)
+            except Exception as e:
+                logger.error(f"Job {job_id} ({kind}) failed on attempt {attempts}: {e}")
+                # Invalid input fails the same way every time, so only retry other errors
+                if attempts < self.max_attempts and not isinstance(e, ValueError):
+                    self._finish(job_id, "queued", error=str(e))
+                else:
+                    self._finish(job_id, "failed", error=str(e))
+                continue
+            finally:
+                self._local.job_id = None
+            self._finish(job_id, "succeeded", result=result)
@@ -0,0 +1,150 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Iterable, List, Optional
+
+from cache import SCOPE_KEYS
+from components import ComponentProxy
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordIndex:
+    """SQLite FTS5 (BM25) index of memory texts, kept next to the Qdrant collection.
+
+    Finds memories by exact terms (order numbers, product codes, names) that dense embeddings
+    rank poorly. Memories are indexed with their user/agent/run ids so keyword candidates can
+    be narrowed to a scope before ranking; any other filter is applied by Qdrant afterwards.
+    """
+
+    _term = re.compile(r"\w+", re.UNICODE)
+
+    def __init__(self, db_path: str, tokenizer: str = "unicode61 remove_diacritics 2"):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        with self._lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS keyword_docs "
+                "(rowid INTEGER PRIMARY KEY, memory_id TEXT UNIQUE, user_id TEXT, agent_id TEXT, run_id TEXT)"
+            )
+            # Table options can't be bound as parameters, so the tokenizer is quoted as an SQL string
+            tokenize = "'" + tokenizer.replace("'", "''") + "'"
+            self.connection.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS keyword_fts USING fts5(text, tokenize = {tokenize})")
+
+    def add(self, memory_ids: Iterable[str], payloads: Iterable[Optional[dict]]):
+        """Index (or re-index) memories from their vector store payloads."""
+        with self._lock, self.connection:
+            for memory_id, payload in zip(memory_ids, payloads):
+                payload = payload or {}
+                self._remove(str(memory_id))
+                cursor = self.connection.execute(
+                    "INSERT INTO keyword_docs (memory_id, user_id, agent_id, run_id) VALUES (?, ?, ?, ?)",
+                    (str(memory_id), *(payload.get(key) for key in SCOPE_KEYS)),
+                )
+                self.connection.execute(
+                    "INSERT INTO keyword_fts (rowid, text) VALUES (?, ?)", (cursor.lastrowid, payload.get("data") or "")
+                )
+
+    def _remove(self, memory_id: str):
+        row = self.connection.execute("SELECT rowid FROM keyword_docs WHERE memory_id = ?", (memory_id,)).fetchone()
+        if row is not None:
+            self.connection.execute("DELETE FROM keyword_fts WHERE rowid = ?", row)
+            self.connection.execute("DELETE FROM keyword_docs WHERE rowid = ?", row)
+
+    def remove(self, memory_ids: Iterable[str]):
+        with self._lock, self.connection:
+            for memory_id in memory_ids:
+                self._remove(str(memory_id))
+
+    def clear(self):
+        with self._lock, self.connection:
+            self.connection.execute("DELETE FROM keyword_fts")
+            self.connection.execute("DELETE FROM keyword_docs")
+
+    def search(self, query: str, filters: dict, limit: int) -> List[str]:
+        """Return the ids of the memories best matching any term of `query`, best first."""
+        terms = self._term.findall(query)
+        if not terms:
+            return []
+        match = " OR ".join('"' + term + '"' for term in dict.fromkeys(terms))
+        scope = [(key, filters[key]) for key in SCOPE_KEYS if isinstance(filters.get(key), str)]
+        sql = (
+            "SELECT d.memory_id FROM keyword_fts JOIN keyword_docs d ON d.rowid = keyword_fts.rowid "
+            "WHERE keyword_fts MATCH ?"
+            + "".join(f" AND d.{key} = ?" for key, _ in scope)
+            + " ORDER BY bm25(keyword_fts) LIMIT ?"
+        )
+        with self._lock:
+            rows = self.connection.execute(sql, (match, *(value for _, value in scope), limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM keyword_docs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+class KeywordIndexedVectorStore(ComponentProxy):
+    """Vector store wrapper that keeps a KeywordIndex current on every insert, update and delete."""
+
+    def __init__(self, vector_store, index: KeywordIndex):
+        super().__init__(vector_store)
+        self.index = index
+
+    def insert(self, vectors: list, payloads: list = None, ids: list = None):
+        result = self._component.insert(vectors=vectors, payloads=payloads, ids=ids)
+        if ids is not None:
+            self.index.add(ids, payloads or [None] * len(ids))
+        return result
+
+    def update(self, vector_id, vector=None, payload=None):
+        result = self._component.update(vector_id=vector_id, vector=vector, payload=payload)
+        if payload is not None:
+            self.index.add([vector_id], [payload])
+        return result
+
+    def update_many(self, vector_ids: list, vectors: list, payloads: list):
+        result = self._component.update_many(vector_ids, vectors, payloads)
+        self.index.add(vector_ids, payloads)
+        return result
+
+    def delete(self, vector_id):
+        result = self._component.delete(vector_id=vector_id)
+        self.index.remove([vector_id])
+        return result
+
+    def delete_many(self, vector_ids: list):
+        result = self._component.delete_many(vector_ids)
+        self.index.remove(vector_ids)
+        return result
+
+    def delete_col(self):
+        result = self._component.delete_col()
+        self.index.clear()
+        return result
+
+
+def rebuild_keyword_index(index: KeywordIndex, vector_store, page_size: int = 256):
+    """Index every memory already in the collection, e.g. when hybrid search is first enabled."""
+    offset = None
+    count = 0
+    while True:
+        points, offset = vector_store.client.scroll(
+            collection_name=vector_store.collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        index.add([str(point.id) for point in points], [point.payload for point in points])
+        count += len(points)
+        if offset is None:
+            break
+    logger.info(f"Built keyword index with {count} memories from the vector store")
@@ -3,6 +3,8 @@ from mem0.vector_stores.configs import VectorStoreConfig
 from mem0.llms.configs import LlmConfig
 from mem0.embeddings.configs import EmbedderConfig
 from typenv import Env
+from payload_index import parse_index_fields
+from tenancy import parse_tenant_tokens
 
 env = Env()
 env.read_env()
@@ -18,6 +20,59 @@ vector_config = {
     }
 }
 
+# Qdrant transport and collection tuning. HNSW, on-disk and quantization settings are applied when
+# the collection is created, and to an existing collection at startup (Qdrant re-indexes it in the background).
+qdrant_tuning_config = {
+    # Use the gRPC API (port 6334) instead of REST for vector operations
+    "prefer_grpc": env.bool(name="VECTOR_STORE_PREFER_GRPC", default=False),
+    "grpc_port": env.int(name="VECTOR_STORE_GRPC_PORT", default=6334),
+    # HNSW graph: edges per node and build-time candidate list (Qdrant defaults: 16 and 100)
+    "hnsw_m": env.int(name="VECTOR_STORE_HNSW_M", default=16),
+    "hnsw_ef_construct": env.int(name="VECTOR_STORE_HNSW_EF_CONSTRUCT", default=100),
+    # Search-time candidate list; 0 uses Qdrant's default
+    "hnsw_ef": env.int(name="VECTOR_STORE_HNSW_EF", default=0),
+    # Keep the original vectors on disk (memory-mapped), e.g. together with quantized vectors in RAM
+    "on_disk_vectors": env.bool(name="VECTOR_STORE_ON_DISK_VECTORS", default=False),
+    # none, scalar (int8) or binary
+    "quantization": env.str(name="VECTOR_STORE_QUANTIZATION", default="none").lower(),
+    "quantization_always_ram": env.bool(name="VECTOR_STORE_QUANTIZATION_ALWAYS_RAM", default=True),
+    # Re-rank quantized search results with the original vectors, over `oversampling * limit` candidates
+    "rescore": env.bool(name="VECTOR_STORE_QUANTIZATION_RESCORE", default=True),
+    "oversampling": env.float(name="VECTOR_STORE_QUANTIZATION_OVERSAMPLING", default=2.0)
+}
+
+# Payload indexes created on the collection at startup, so filtered searches and listings don't scan
+# every point. Search filters on fields without an index are let through ("allow"), logged ("warn")
+# or rejected ("reject").
+payload_index_config = {
+    "fields": parse_index_fields(env.str(
+        name="PAYLOAD_INDEX_FIELDS",
+        default="user_id:keyword,agent_id:keyword,run_id:keyword,created_at:datetime,updated_at:datetime,expires_at:datetime"
+    )),
+    "filter_policy": env.str(name="PAYLOAD_INDEX_FILTER_POLICY", default="warn")
+}
+
+# Multi-tenancy: every tenant gets its own collection (<collection>_<tenant>), history database and
+# indexes. The tenant is read from a request header ("header") or from the bearer token ("token",
+# with TENANT_TOKENS mapping each token to a tenant). Requests without a tenant use the default collection.
+tenancy_config = {
+    "mode": env.str(name="TENANT_MODE", default="off").lower(),
+    "header": env.str(name="TENANT_HEADER", default="X-Tenant-ID"),
+    "tokens": parse_tenant_tokens(env.str(name="TENANT_TOKENS", default="")),
+    # Reject requests without a tenant instead of serving them from the default collection
+    "required": env.bool(name="TENANT_REQUIRED", default=False),
+    # Memory instances (collection clients, history connections) kept open; the least recently used is dropped
+    "max_instances": env.int(name="TENANT_MAX_INSTANCES", default=32)
+}
+
+# The graph store adds a second LLM pass and Neo4j writes to every /store. It can be disabled per
+# deployment, skipped per request, and by default runs as a background job after the vector write.
+graph_stage_config = {
+    "enabled": env.bool(name="GRAPH_STORE_ENABLED", default=True),
+    "deferred": env.bool(name="GRAPH_STORE_DEFERRED", default=True),
+    "workers": env.int(name="GRAPH_STORE_WORKERS", default=1)
+}
+
 graph_config = {
         "provider": "neo4j",
         "config": {
@@ -32,7 +87,7 @@ graph_config = {
                 "temperature": env.float(name="GRAPH_STORE_LLM_TEMPERATURE", default=0.0),
             }
         }
-}
+} if graph_stage_config["enabled"] else None
 
 llm_config = LlmConfig(
     provider=env.str("LLM_PROVIDER", default="deepseek"),
@@ -45,11 +100,211 @@ llm_config = LlmConfig(
 ).dict()
 
 # Learn more: https://docs.mem0.ai/components/embedders/models/huggingface
+# EMBEDDING_PROVIDER=onnx runs the same Hugging Face model with ONNX Runtime instead of PyTorch.
+# mem0 only knows the "huggingface" provider, so the ONNX options travel in its model_kwargs.
+embedding_provider = env.str(name="EMBEDDING_PROVIDER", default="huggingface")
+onnx_embedding_config = {
+    "enabled": embedding_provider == "onnx",
+    "options": {
+        "backend": "onnx",
+        "path": env.str(name="EMBEDDING_ONNX_PATH", default=None) or None,
+        "quantize": env.bool(name="EMBEDDING_ONNX_QUANTIZE", default=False),
+        "threads": env.int(name="EMBEDDING_ONNX_THREADS", default=0),
+        "max_batch_size": env.int(name="EMBEDDING_ONNX_MAX_BATCH_SIZE", default=32)
+    }
+}
 embedding_config = EmbedderConfig(
-    provider=env.str(name="EMBEDDING_PROVIDER", default="huggingface"),
+    provider="huggingface" if onnx_embedding_config["enabled"] else embedding_provider,
     config={
-        "model": env.str(name="EMBEDDING_MODEL", default="multi-qa-MiniLM-L6-cos-v1")
+        "model": env.str(name="EMBEDDING_MODEL", default="multi-qa-MiniLM-L6-cos-v1"),
+        **({"model_kwargs": onnx_embedding_config["options"]} if onnx_embedding_config["enabled"] else {})
     }
 ).dict()
 
 
+# Thread pools used to run blocking mem0 calls off the event loop.
+# Requests beyond max_workers + max_queue are rejected with 429, and requests that waited
+# longer than queue_timeout seconds (0 disables) are rejected with 503.
+executor_config = {
+    "write": {
+        "max_workers": env.int(name="EXECUTOR_WRITE_MAX_WORKERS", default=4),
+        "max_queue": env.int(name="EXECUTOR_WRITE_MAX_QUEUE", default=32),
+        "queue_timeout": env.float(name="EXECUTOR_WRITE_QUEUE_TIMEOUT", default=60.0)
+    },
+    "search": {
+        "max_workers": env.int(name="EXECUTOR_SEARCH_MAX_WORKERS", default=8),
+        "max_queue": env.int(name="EXECUTOR_SEARCH_MAX_QUEUE", default=64),
+        "queue_timeout": env.float(name="EXECUTOR_SEARCH_QUEUE_TIMEOUT", default=10.0)
+    },
+    "admin": {
+        "max_workers": env.int(name="EXECUTOR_ADMIN_MAX_WORKERS", default=2),
+        "max_queue": env.int(name="EXECUTOR_ADMIN_MAX_QUEUE", default=8),
+        "queue_timeout": env.float(name="EXECUTOR_ADMIN_QUEUE_TIMEOUT", default=30.0)
+    }
+}
+
+# Micro-batching of concurrent embedding and vector store insert calls.
+# A batch is flushed when max_size items are queued or max_wait_ms has passed since the first one.
+batch_config = {
+    "max_size": env.int(name="BATCH_MAX_SIZE", default=64),
+    "max_wait_ms": env.float(name="BATCH_MAX_WAIT_MS", default=2.0),
+    # Maximum number of memories accepted by one /store/batch request
+    "store_max_items": env.int(name="STORE_BATCH_MAX_ITEMS", default=100),
+    # Maximum number of queries accepted by one /search/batch request
+    "search_max_queries": env.int(name="SEARCH_BATCH_MAX_QUERIES", default=20)
+}
+
+# /store with infer=false: similarity (0-1) at or above which a memory is skipped as a duplicate of an
+# existing one in the same scope; 0 disables the check
+raw_store_config = {
+    "dedup_threshold": env.float(name="STORE_RAW_DEDUP_THRESHOLD", default=0.0)
+}
+
+# Durable local job queue used by asynchronous writes (`async_mode` on /store)
+job_config = {
+    "db_path": env.str(name="JOB_QUEUE_DB_PATH", default=os.path.join(os.path.expanduser("~"), ".cache", "mem0-api", "jobs.db")),
+    "store_workers": env.int(name="JOB_STORE_WORKERS", default=2),
+    # A job whose worker died is retried once its lease expires
+    "lease_seconds": env.float(name="JOB_LEASE_SECONDS", default=300.0),
+    "max_attempts": env.int(name="JOB_MAX_ATTEMPTS", default=3),
+    # Finished jobs are kept this long so clients can fetch their results
+    "retention_hours": env.float(name="JOB_RETENTION_HOURS", default=24.0)
+}
+
+# /delete-all and /reset-all run as background jobs. Deletion goes page by page, saving its
+# progress after every page, and picks up where it stopped after a restart.
+bulk_delete_config = {
+    "page_size": env.int(name="BULK_DELETE_PAGE_SIZE", default=500),
+    "workers": env.int(name="BULK_DELETE_WORKERS", default=1)
+}
+
+# Background compaction. Every interval it deletes expired memories (those stored with a TTL: the
+# "ttl_seconds" metadata key or MEMORY_DEFAULT_TTL_SECONDS) and merges near-duplicate memories of each
+# user/agent/run, keeping the most recently written one. It uses at most `duty_cycle` of its worker's
+# time and waits while the service handles requests.
+compaction_config = {
+    "enabled": env.bool(name="COMPACTION_ENABLED", default=False),
+    "interval_seconds": env.float(name="COMPACTION_INTERVAL_SECONDS", default=3600.0),
+    "default_ttl_seconds": env.float(name="MEMORY_DEFAULT_TTL_SECONDS", default=0.0),
+    # Cosine similarity (0-1) at or above which two memories are merged; 0 disables merging
+    "dedup_threshold": env.float(name="COMPACTION_DEDUP_THRESHOLD", default=0.95),
+    # Scopes with more memories are not merged, to bound the work and memory of one pass
+    "max_scope_size": env.int(name="COMPACTION_MAX_SCOPE_SIZE", default=10000),
+    "page_size": env.int(name="COMPACTION_PAGE_SIZE", default=256),
+    "duty_cycle": env.float(name="COMPACTION_DUTY_CYCLE", default=0.25),
+    # Weight /search scores by recency: a memory last written this many days ago keeps half its score; 0 disables
+    "recency_half_life_days": env.float(name="SEARCH_RECENCY_HALF_LIFE_DAYS", default=0.0)
+}
+
+# PUT /update: with the buffer enabled, updates are appended to a local SQLite write-ahead log and applied
+# in bulk window_ms later; repeated updates of a memory within the window are coalesced into the last one
+update_buffer_config = {
+    "enabled": env.bool(name="UPDATE_BUFFER_ENABLED", default=False),
+    "path": env.str(
+        name="UPDATE_BUFFER_PATH",
+        default=os.path.join(
+            os.path.expanduser("~"), ".cache", "mem0-api",
+            f"update_buffer_{vector_config['config']['collection_name']}.db"
+        )
+    ),
+    "window_ms": env.float(name="UPDATE_BUFFER_WINDOW_MS", default=200.0),
+    "max_batch": env.int(name="UPDATE_BUFFER_MAX_BATCH", default=256),
+    # Updates claimed by a process that died are applied by another one once the lease expires
+    "lease_seconds": env.float(name="UPDATE_BUFFER_LEASE_SECONDS", default=60.0),
+    # An update failing this many times is moved to the failed_updates table of the buffer
+    "max_attempts": env.int(name="UPDATE_BUFFER_MAX_ATTEMPTS", default=3)
+}
+
+# Cache of embeddings keyed by normalized text and embedding model, used mostly by /search queries.
+# Set EMBEDDING_CACHE_PATH to also keep the cache in a local SQLite file that survives restarts.
+embedding_cache_config = {
+    "enabled": env.bool(name="EMBEDDING_CACHE_ENABLED", default=True),
+    "max_size": env.int(name="EMBEDDING_CACHE_MAX_SIZE", default=10000),
+    "ttl_seconds": env.float(name="EMBEDDING_CACHE_TTL_SECONDS", default=86400.0),
+    "lowercase": env.bool(name="EMBEDDING_CACHE_LOWERCASE", default=False),
+    "path": env.str(name="EMBEDDING_CACHE_PATH", default=None),
+    "disk_max_size": env.int(name="EMBEDDING_CACHE_DISK_MAX_SIZE", default=100000)
+}
+
+# Cache of LLM fact extraction and reconcile responses, keyed by model settings and prompt. Identical
+# /store requests (retries, duplicated workflow branches) then reuse the first response. Only
+# equivalent to calling the LLM again when TEMPERATURE is 0.
+llm_cache_config = {
+    "enabled": env.bool(name="LLM_CACHE_ENABLED", default=False),
+    "path": env.str(
+        name="LLM_CACHE_PATH", default=os.path.join(os.path.expanduser("~"), ".cache", "mem0-api", "llm_cache.db")
+    ),
+    "max_size": env.int(name="LLM_CACHE_MAX_SIZE", default=10000),
+    "ttl_seconds": env.float(name="LLM_CACHE_TTL_SECONDS", default=604800.0)
+}
+
+# Cache of /search and /retrieve results, invalidated whenever a write touches the same user/agent/run.
+# The TTL bounds staleness from writes made outside this process.
+result_cache_config = {
+    "enabled": env.bool(name="RESULT_CACHE_ENABLED", default=True),
+    "max_size": env.int(name="RESULT_CACHE_MAX_SIZE", default=2000),
+    "ttl_seconds": env.float(name="RESULT_CACHE_TTL_SECONDS", default=300.0),
+    # Invalidations are shared between the server processes through this SQLite database
+    "generations_path": env.str(name="RESULT_CACHE_GENERATIONS_PATH", default=job_config["db_path"])
+}
+
+# Existence index of memory ids, persisted as a compact log next to the other local service data
+memory_index_config = {
+    "path": env.str(
+        name="MEMORY_INDEX_PATH",
+        default=os.path.join(
+            os.path.expanduser("~"), ".cache", "mem0-api",
+            f"memory_index_{vector_config['config']['collection_name']}.log"
+        )
+    )
+}
+
+# Hybrid search: an SQLite FTS5 (BM25) keyword index maintained next to the collection,
+# fused with the dense results by weighted reciprocal rank fusion
+hybrid_search_config = {
+    "enabled": env.bool(name="HYBRID_SEARCH_ENABLED", default=False),
+    "path": env.str(
+        name="HYBRID_SEARCH_INDEX_PATH",
+        default=os.path.join(
+            os.path.expanduser("~"), ".cache", "mem0-api",
+            f"keyword_index_{vector_config['config']['collection_name']}.db"
+        )
+    ),
+    # FTS5 tokenizer, e.g. "trigram" to match parts of words and CJK text without spaces
+    "tokenizer": env.str(name="HYBRID_SEARCH_TOKENIZER", default="unicode61 remove_diacritics 2"),
+    # Search mode used when a request doesn't set one: "dense" or "hybrid"
+    "default_mode": env.str(name="HYBRID_SEARCH_DEFAULT_MODE", default="hybrid"),
+    "dense_weight": env.float(name="HYBRID_SEARCH_DENSE_WEIGHT", default=1.0),
+    "sparse_weight": env.float(name="HYBRID_SEARCH_SPARSE_WEIGHT", default=1.0),
+    "rrf_k": env.int(name="HYBRID_SEARCH_RRF_K", default=60),
+    # Candidates taken from each of the dense and keyword rankings before fusing
+    "candidates": env.int(name="HYBRID_SEARCH_CANDIDATES", default=50)
+}
+
+# Optional rerank stage of /search: over-fetch `candidates` results, then keep the best `limit` of them.
+# "cross-encoder" rescores each (query, memory) pair with a local CPU cross-encoder, "mmr" picks relevant
+# but mutually different memories by maximal marginal relevance; requests can choose with "rerank"
+rerank_config = {
+    # Rerank mode used when a request doesn't set one: "none", "cross-encoder" or "mmr"
+    "default_mode": env.str(name="RERANK_DEFAULT_MODE", default="none"),
+    "candidates": env.int(name="RERANK_CANDIDATES", default=50),
+    "model": env.str(name="RERANK_MODEL", default="cross-encoder/ms-marco-MiniLM-L-6-v2"),
+    "batch_size": env.int(name="RERANK_BATCH_SIZE", default=32),
+    # Cross-encoder scores cached by model, query and memory text; 0 disables the cache
+    "cache_size": env.int(name="RERANK_CACHE_SIZE", default=20000),
+    "cache_ttl_seconds": env.float(name="RERANK_CACHE_TTL_SECONDS", default=3600.0),
+    # MMR trade-off between relevance to the query (1.0) and diversity (0.0)
+    "mmr_lambda": env.float(name="RERANK_MMR_LAMBDA", default=0.5)
+}
+
+# /export and /import: points are written page by page, each page compressed separately
+archive_config = {
+    "page_size": env.int(name="EXPORT_PAGE_SIZE", default=256),
+    "compression_level": env.int(name="EXPORT_COMPRESSION_LEVEL", default=6)
+}
+
+# Startup warm-up: retried with exponential backoff (in seconds) until the databases are reachable
+warmup_config = {
+    "retry_initial_delay": env.float(name="WARMUP_RETRY_INITIAL_DELAY", default=1.0),
+    "retry_max_delay": env.float(name="WARMUP_RETRY_MAX_DELAY", default=30.0)
+}
@@ -0,0 +1,215 @@
+import fcntl
+import logging
+import os
+import struct
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+from components import ComponentProxy
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryIndex:
+    """In-memory index of which memory ids exist and which have been deleted.
+
+    Answers "does memory X exist and is it live" in O(1), so requests no longer scan the
+    history table just to validate a memory id. The index is persisted as an append-only
+    log of fixed-size records (16-byte UUID + 1 state byte) that is replayed on start and
+    compacted when it grows well past the number of known memories. The first start without
+    a log bootstraps the index from mem0's history table.
+
+    Server processes share the log: before answering, an index reads the records other
+    processes appended since it last looked, and reloads the log when another process
+    compacted or cleared it.
+    """
+
+    _record = struct.Struct("<16s?")
+
+    def __init__(self, path: str, history_connection=None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._states: Dict[bytes, bool] = {}
+        self._records = 0
+        # Inode of the log file and bytes of it already applied to _states
+        self._inode = None
+        self._offset = 0
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
+        elif history_connection is not None:
+            self._bootstrap(history_connection)
+        self._file = open(path, "ab")
+
+    @staticmethod
+    def _key(memory_id: str) -> Optional[bytes]:
+        try:
+            return uuid.UUID(str(memory_id)).bytes
+        except ValueError:
+            return None
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            inode = os.fstat(f.fileno()).st_ino
+            data = f.read()
+        # Ignore a torn record at the end of the file left by a crash mid-write
+        usable = len(data) - len(data) % self._record.size
+        self._states = {key: live for key, live in self._record.iter_unpack(data[:usable])}
+        self._records = usable // self._record.size
+        self._inode, self._offset = inode, usable
+        logger.info(f"Loaded memory index with {len(self._states)} memories from {self.path}")
+
+    def _catch_up(self):
+        """Apply the records appended to the log since the last look, or reload a rewritten log."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode:
+            self._load()
+            return
+        usable = (stat.st_size - self._offset) // self._record.size * self._record.size
+        if not usable:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read(usable)
+        usable = len(data) - len(data) % self._record.size
+        for key, live in self._record.iter_unpack(data[:usable]):
+            self._states[key] = live
+        self._offset += usable
+        self._records += usable // self._record.size
+
+    def _bootstrap(self, history_connection):
+        # mem0 never reuses memory ids, so a memory is deleted iff any of its history rows says so
+        rows = history_connection.execute(
+            "SELECT memory_id, MAX(is_deleted) FROM history GROUP BY memory_id"
+        ).fetchall()
+        for memory_id, is_deleted in rows:
+            key = self._key(memory_id)
+            if key is not None:
+                self._states[key] = not is_deleted
+        self._write_snapshot()
+        logger.info(f"Built memory index with {len(self._states)} memories from the history database")
+
+    def _write_snapshot(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"".join(self._record.pack(key, live) for key, live in self._states.items()))
+            f.flush()
+            os.fsync(f.fileno())
+            # Stat before the rename: other processes may append to the new log as soon as it is in place
+            stat = os.fstat(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._records = len(self._states)
+        self._inode, self._offset = stat.st_ino, stat.st_size
+
+    @contextmanager
+    def _exclusive(self):
+        """Lock the log against other server processes sharing it.
+
+        Another process may have compacted the log into a new file while we waited for the lock,
+        in which case we switch to the new file before writing.
+        """
+        while True:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+            if os.path.exists(self.path) and os.fstat(self._file.fileno()).st_ino == os.stat(self.path).st_ino:
+                break
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = open(self.path, "ab")
+        locked_file = self._file
+        try:
+            yield
+        finally:
+            fcntl.flock(locked_file, fcntl.LOCK_UN)
+            if locked_file is not self._file:
+                locked_file.close()
+
+    def _append(self, entries: Dict[bytes, bool]):
+        data = b"".join(self._record.pack(key, live) for key, live in entries.items())
+        with self._exclusive():
+            # Apply the records of other processes first, so our own are read back in log order
+            self._catch_up()
+            self._file.write(data)
+            self._file.flush()
+            self._offset += len(data)
+            self._records += len(entries)
+            self._states.update(entries)
+            if self._records > 2 * len(self._states) + 10000:
+                self._rewrite()
+
+    def _rewrite(self):
+        self._write_snapshot()
+        self._file = open(self.path, "ab")
+
+    def state(self, memory_id: str) -> Optional[bool]:
+        """Return True if the memory is live, False if it was deleted and None if it is unknown."""
+        key = self._key(memory_id)
+        if key is None:
+            return False
+        with self._lock:
+            self._catch_up()
+            return self._states.get(key)
+
+    def mark_live(self, memory_ids: Iterable[str]):
+        self._set(memory_ids, True)
+
+    def mark_deleted(self, memory_ids: Iterable[str]):
+        self._set(memory_ids, False)
+
+    def _set(self, memory_ids: Iterable[str], live: bool):
+        entries = {}
+        for memory_id in memory_ids:
+            key = self._key(memory_id)
+            if key is not None:
+                entries[key] = live
+        if not entries:
+            return
+        with self._lock:
+            self._append(entries)
+
+    def clear(self):
+        with self._lock, self._exclusive():
+            self._states.clear()
+            self._rewrite()
+
+    def __len__(self):
+        with self._lock:
+            self._catch_up()
+            return len(self._states)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class IndexedVectorStore(ComponentProxy):
+    """Vector store wrapper that keeps a MemoryIndex current on every insert and delete."""
+
+    def __init__(self, vector_store, index: MemoryIndex):
+        super().__init__(vector_store)
+        self.index = index
+
+    def insert(self, vectors: list, payloads: list = None, ids: list = None):
+        result = self._component.insert(vectors=vectors, payloads=payloads, ids=ids)
+        if ids is not None:
+            self.index.mark_live(ids)
+        return result
+
+    def delete(self, vector_id):
+        result = self._component.delete(vector_id=vector_id)
+        self.index.mark_deleted([vector_id])
+        return result
+
+    def delete_many(self, vector_ids: list):
+        result = self._component.delete_many(vector_ids)
+        self.index.mark_deleted(vector_ids)
+        return result
+
+    def delete_col(self):
+        result = self._component.delete_col()
+        self.index.clear()
+        return result
@@ -0,0 +1,159 @@
+import functools
+import logging
+import os
+import time
+from typing import Callable, Dict, Iterable
+
+from fastapi import Request, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from components import ComponentProxy
+
+logger = logging.getLogger(__name__)
+
+# Set by gunicorn.conf.py: every worker writes its samples to files in this directory
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUESTS = Counter(
+    "mem0_api_requests_total", "HTTP requests handled, by route and status code.", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "mem0_api_request_duration_seconds", "Time until the response headers were sent, by route.", ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+STAGE_LATENCY = Histogram(
+    "mem0_api_stage_duration_seconds", "Time spent in mem0 components, by stage and method.", ["stage", "operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+STAGE_ERRORS = Counter(
+    "mem0_api_stage_errors_total", "Exceptions raised by mem0 components, by stage and method.", ["stage", "operation"]
+)
+
+# The component methods timed for each stage of the memory pipeline
+STAGE_METHODS = {
+    "llm": ("generate_response",),
+    "embed": ("embed", "embed_batch"),
+    "vector_store": ("insert", "search", "update", "update_many", "delete", "get", "list", "delete_col"),
+    "graph_store": ("add", "search", "get_all", "delete_all"),
+    "history_db": ("add_history", "get_history", "reset"),
+    "rerank": ("score",),
+}
+
+
+class InstrumentedComponent(ComponentProxy):
+    """Component wrapper that records the latency and errors of the methods listed for its stage."""
+
+    def __init__(self, component, stage: str):
+        super().__init__(component)
+        self._stage = stage
+        self._methods = STAGE_METHODS[stage]
+
+    def __getattr__(self, name):
+        attribute = getattr(self._component, name)
+        if name not in self._methods:
+            return attribute
+
+        @functools.wraps(attribute)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            except Exception:
+                STAGE_ERRORS.labels(self._stage, name).inc()
+                raise
+            finally:
+                STAGE_LATENCY.labels(self._stage, name).observe(time.perf_counter() - start)
+
+        return timed
+
+
+class ServiceCollector:
+    """Exposes executor queue depth, background job counts and cache counters at scrape time.
+
+    `stats` returns a dict with optional "executor", "jobs" and "caches" entries shaped like
+    the `stats()` of MemoryExecutor, JobQueue and the caches.
+    """
+
+    def __init__(self, stats: Callable[[], Dict[str, dict]]):
+        self._stats = stats
+
+    def collect(self) -> Iterable:
+        try:
+            stats = self._stats()
+        except Exception as e:
+            logger.warning(f"Failed to collect service metrics: {e}")
+            return
+
+        executor = stats.get("executor", {})
+        for name, help_text, key in (
+            ("mem0_api_executor_running", "Calls running on the pool.", "running"),
+            ("mem0_api_executor_queued", "Calls waiting for a pool worker.", "queued"),
+            ("mem0_api_executor_max_workers", "Worker threads of the pool.", "max_workers"),
+        ):
+            gauge = GaugeMetricFamily(name, help_text, labels=["pool"])
+            for pool, pool_stats in executor.items():
+                gauge.add_metric([pool], pool_stats[key])
+            yield gauge
+        for name, help_text, key in (
+            ("mem0_api_executor_rejected", "Calls rejected because the pool queue was full.", "rejected"),
+            ("mem0_api_executor_timed_out", "Calls rejected after waiting too long for a worker.", "timed_out"),
+        ):
+            counter = CounterMetricFamily(name, help_text, labels=["pool"])
+            for pool, pool_stats in executor.items():
+                counter.add_metric([pool], pool_stats[key])
+            yield counter
+
+        jobs = GaugeMetricFamily("mem0_api_jobs", "Background jobs by kind and status.", labels=["kind", "status"])
+        for kind, counts in stats.get("jobs", {}).items():
+            for status, count in counts.items():
+                jobs.add_metric([kind, status], count)
+        yield jobs
+
+        caches = stats.get("caches", {})
+        hits = CounterMetricFamily("mem0_api_cache_hits", "Cache hits.", labels=["cache"])
+        misses = CounterMetricFamily("mem0_api_cache_misses", "Cache misses.", labels=["cache"])
+        size = GaugeMetricFamily("mem0_api_cache_size", "Entries held in memory.", labels=["cache"])
+        hit_rate = GaugeMetricFamily("mem0_api_cache_hit_rate", "Share of lookups served from the cache.", labels=["cache"])
+        for cache, cache_stats in caches.items():
+            hits.add_metric([cache], cache_stats["hits"])
+            misses.add_metric([cache], cache_stats["misses"])
+            size.add_metric([cache], cache_stats["size"])
+            hit_rate.add_metric([cache], cache_stats["hit_rate"])
+        yield from (hits, misses, size, hit_rate)
+
+
+async def metrics_middleware(request: Request, call_next):
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template rather than path, so memory ids don't create new series
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        REQUESTS.labels(request.method, route_path, str(status_code)).inc()
+        REQUEST_LATENCY.labels(request.method, route_path).observe(time.perf_counter() - start)
+
+
+_service_collectors = []
+
+def register_service_collector(collector: ServiceCollector):
+    _service_collectors.append(collector)
+    if not MULTIPROCESS:
+        REGISTRY.register(collector)
+
+
+def metrics_response() -> Response:
+    registry = REGISTRY
+    if MULTIPROCESS:
+        # Merge the samples of all workers. Service collectors report the worker answering the scrape.
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _service_collectors:
+            registry.register(collector)
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+from typing import List, Optional
+
+import numpy as np
+from mem0.configs.embeddings.base import BaseEmbedderConfig
+from mem0.embeddings.base import EmbeddingBase
+from mem0.utils.factory import EmbedderFactory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "multi-qa-MiniLM-L6-cos-v1"
+
+
+def resolve_model_dir(model_name: str, path: Optional[str] = None) -> str:
+    """Return a local directory holding `onnx/model.onnx`, `tokenizer.json` and the sentence-transformers configs.
+
+    Uses `path` when given, otherwise downloads the ONNX export published with the model on the Hugging Face Hub.
+    """
+    if path:
+        return path
+    from huggingface_hub import snapshot_download
+    repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    return snapshot_download(
+        repo_id,
+        allow_patterns=["onnx/model.onnx", "tokenizer.json", "modules.json", "sentence_bert_config.json", "1_Pooling/config.json"],
+    )
+
+
+def _read_json(path: str, default: dict) -> dict:
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+
+class OnnxSentenceEncoder:
+    """Runs a sentence-transformers model exported to ONNX with ONNX Runtime.
+
+    Mirrors the part of the SentenceTransformer interface mem0 and the service use (`encode`,
+    `get_sentence_embedding_dimension`), including the model's pooling and normalization, so
+    its vectors match the PyTorch ones. Each batch is padded only to its longest text, and texts
+    are sorted by length first so similar lengths share a batch.
+    """
+
+    def __init__(self, model_dir: str, quantize: bool = False, threads: int = 0):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, "onnx", "model.onnx")
+        if quantize:
+            model_path = self._quantized(model_path)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        max_seq_length = _read_json(os.path.join(model_dir, "sentence_bert_config.json"), {}).get("max_seq_length", 512)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding()
+
+        pooling = _read_json(os.path.join(model_dir, "1_Pooling", "config.json"), {"pooling_mode_mean_tokens": True})
+        if pooling.get("pooling_mode_cls_token"):
+            self.pooling = "cls"
+        elif pooling.get("pooling_mode_max_tokens"):
+            self.pooling = "max"
+        else:
+            self.pooling = "mean"
+        modules = _read_json(os.path.join(model_dir, "modules.json"), [])
+        self.normalize = any(module.get("type", "").endswith("Normalize") for module in modules)
+        self.dimension = pooling.get("word_embedding_dimension") or self._encode_batch(["dimension"]).shape[1]
+
+    @staticmethod
+    def _quantized(model_path: str) -> str:
+        """Return a dynamically int8-quantized copy of the model, creating it next to the model on first use."""
+        quantized_path = model_path.replace(".onnx", "_qint8.onnx")
+        if not os.path.exists(quantized_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            tmp_path = f"{quantized_path}.{os.getpid()}.tmp"
+            quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, quantized_path)
+            logger.info(f"Quantized {model_path} to {quantized_path}")
+        return quantized_path
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.array([encoding.type_ids for encoding in encodings], dtype=np.int64)
+        output = self.session.run(None, {name: value for name, value in inputs.items() if name in self.input_names})[0]
+
+        if output.ndim == 3:
+            mask = attention_mask[:, :, None].astype(output.dtype)
+            if self.pooling == "cls":
+                output = output[:, 0]
+            elif self.pooling == "max":
+                output = np.where(mask > 0, output, -np.inf).max(axis=1)
+            else:
+                output = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            output = output / np.clip(np.linalg.norm(output, axis=1, keepdims=True), 1e-12, None)
+        return output.astype(np.float32)
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            embeddings[indices] = self._encode_batch([texts[i] for i in indices])
+        return embeddings[0] if single else embeddings
+
+
+class OnnxEmbedding(EmbeddingBase):
+    """mem0 embedder running a Hugging Face sentence-transformers model with ONNX Runtime.
+
+    Options are read from `model_kwargs`: `path` (local export directory), `quantize` (int8
+    dynamic quantization), `threads` (intra-op threads, 0 for the runtime default) and
+    `max_batch_size`.
+    """
+
+    def __init__(self, config: Optional[BaseEmbedderConfig] = None):
+        super().__init__(config)
+        self.config.model = self.config.model or DEFAULT_MODEL
+        options = self.config.model_kwargs or {}
+        self.max_batch_size = options.get("max_batch_size", 32)
+        self.model = OnnxSentenceEncoder(
+            resolve_model_dir(self.config.model, options.get("path")),
+            quantize=options.get("quantize", False),
+            threads=options.get("threads", 0),
+        )
+        self.config.embedding_dims = self.config.embedding_dims or self.model.get_sentence_embedding_dimension()
+
+    def embed(self, text):
+        return self.model.encode(text, batch_size=self.max_batch_size).tolist()
+
+
+def register_onnx_embedder():
+    """Make mem0 build Hugging Face embedders with ONNX Runtime instead of PyTorch."""
+    EmbedderFactory.provider_to_class["huggingface"] = f"{__name__}.OnnxEmbedding"
@@ -0,0 +1,87 @@
+import logging
+from typing import Dict, List, Optional
+
+from qdrant_client.http import models
+
+from errors.exception import UnindexedFilterError
+
+logger = logging.getLogger(__name__)
+
+
+def parse_index_fields(spec: str) -> Dict[str, str]:
+    """Parse "field:type,field:type" into {field: type}, e.g. "user_id:keyword,created_at:datetime"."""
+    fields = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, kind = item.partition(":")
+        kind = (kind or "keyword").strip().lower()
+        if kind not in {schema.value for schema in models.PayloadSchemaType}:
+            raise ValueError(f"Unknown payload index type '{kind}' for field '{name}'")
+        fields[name.strip()] = kind
+    return fields
+
+
+def ensure_payload_indexes(vector_store, fields: Dict[str, str]) -> List[str]:
+    """Create the declared payload indexes missing from the collection and return their names.
+
+    Indexes are built by Qdrant in the background; `collection_status` reports their progress.
+    """
+    existing = vector_store.client.get_collection(vector_store.collection_name).payload_schema or {}
+    created = []
+    for name, kind in fields.items():
+        if name in existing:
+            if existing[name].data_type.value != kind:
+                logger.warning(
+                    f"Payload index on '{name}' has type {existing[name].data_type.value}, expected {kind}; "
+                    "delete the index to have it recreated"
+                )
+            continue
+        vector_store.client.create_payload_index(
+            collection_name=vector_store.collection_name,
+            field_name=name,
+            field_schema=models.PayloadSchemaType(kind),
+            wait=False,
+        )
+        created.append(name)
+    if created:
+        logger.info(f"Creating payload indexes on {', '.join(created)} in {vector_store.collection_name}")
+    return created
+
+
+def collection_status(vector_store, fields: Dict[str, str]) -> dict:
+    """Report the size of the collection and the state of its payload indexes."""
+    info = vector_store.client.get_collection(vector_store.collection_name)
+    existing = info.payload_schema or {}
+    return {
+        "collection": vector_store.collection_name,
+        "status": info.status.value,
+        # "ok", or the error message of the optimizers
+        "optimizer_status": getattr(info.optimizer_status, "error", None) or "ok",
+        "points_count": info.points_count,
+        "indexed_vectors_count": info.indexed_vectors_count,
+        "segments_count": info.segments_count,
+        "payload_indexes": {
+            name: {
+                "type": index.data_type.value,
+                "points": index.points,
+                "declared": name in fields,
+            }
+            for name, index in existing.items()
+        },
+        "missing_indexes": [name for name in fields if name not in existing],
+    }
+
+
+def check_filters(filters: Optional[dict], fields: Dict[str, str], policy: str):
+    """Apply the filter policy ("allow", "warn" or "reject") to filter keys that no payload index covers.
+
+    Qdrant filters on such keys by scanning every point, which gets slower as the collection grows.
+    """
+    unindexed = [key for key in (filters or {}) if key not in fields]
+    if not unindexed or policy == "allow":
+        return
+    if policy == "reject":
+        raise UnindexedFilterError(unindexed)
+    logger.warning(f"Filtering on fields without a payload index: {', '.join(unindexed)}")
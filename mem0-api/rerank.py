@@ -0,0 +1,65 @@
+import hashlib
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from cache import LRUCache
+from shared_models import load_cross_encoder
+
+
+class CrossEncoderReranker:
+    """Scores (query, memory text) pairs with a local cross-encoder.
+
+    All pairs passed to one `score` call go through the model in batches of `batch_size`, and the
+    scores are cached by model, query and text, so a repeated search only scores new memories.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 32, cache_size: int = 20000, ttl: float = 0):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache = LRUCache(cache_size, ttl) if cache_size else None
+
+    def _key(self, query: str, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{query}\0{text}".encode("utf-8")).hexdigest()
+
+    def score(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        keys = [self._key(query, text) for query, text in pairs]
+        scores = [self.cache.get(key) if self.cache is not None else None for key in keys]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            predicted = load_cross_encoder(self.model_name).predict(
+                [pairs[i] for i in missing], batch_size=self.batch_size, show_progress_bar=False
+            )
+            for i, score in zip(missing, predicted):
+                scores[i] = float(score)
+                if self.cache is not None:
+                    self.cache.set(keys[i], scores[i])
+        return scores
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats() if self.cache is not None else {}
+
+
+def mmr(query_vector: Sequence[float], vectors: Sequence[Sequence[float]], limit: int, lambda_: float) -> List[int]:
+    """Maximal marginal relevance: return the indexes of up to `limit` rows of `vectors`, in pick order.
+
+    Each pick maximizes `lambda_ * sim(query, row) - (1 - lambda_) * max(sim(row, picked rows))`.
+    """
+    if not len(vectors):
+        return []
+    # Copies: the vectors (e.g. a cached query embedding) are normalized in place
+    matrix = np.array(vectors, dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    query = np.array(query_vector, dtype=np.float32)
+    query /= max(float(np.linalg.norm(query)), 1e-12)
+    relevance = matrix @ query
+    redundancy = np.zeros(len(matrix), dtype=np.float32)
+    available = np.ones(len(matrix), dtype=bool)
+    picked = []
+    for _ in range(min(limit, len(matrix))):
+        gains = np.where(available, lambda_ * relevance - (1 - lambda_) * redundancy, -np.inf)
+        best = int(np.argmax(gains))
+        picked.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, matrix @ matrix[best])
+    return picked
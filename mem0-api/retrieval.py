@@ -0,0 +1,221 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple, Union
+
+from mem0 import Memory
+from qdrant_client.http import models
+
+from rerank import mmr
+
+# Payload keys mem0 maps to top-level fields; everything else in the payload is metadata
+_RESERVED_KEYS = {"user_id", "agent_id", "run_id", "hash", "data", "created_at", "updated_at"}
+
+
+def format_memory(point) -> dict:
+    """Format a vector store point the way `Memory.get_all` formats its results."""
+    payload = point.payload or {}
+    memory = {
+        "id": str(point.id),
+        "memory": payload.get("data"),
+        "hash": payload.get("hash"),
+        "created_at": payload.get("created_at"),
+        "updated_at": payload.get("updated_at"),
+        **{key: payload[key] for key in ("user_id", "agent_id", "run_id") if key in payload},
+    }
+    metadata = {key: value for key, value in payload.items() if key not in _RESERVED_KEYS}
+    if metadata:
+        memory["metadata"] = metadata
+    return memory
+
+
+def _parse_time(value) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def age_results(result: dict, half_life_days: float = 0, now: Optional[datetime] = None) -> dict:
+    """Drop expired memories from a search result and, with a half-life, weight scores by recency.
+
+    A memory last written `half_life_days` ago keeps half of its score, and the results are
+    re-ordered by the weighted score. Negative scores (e.g. cross-encoder logits) are divided by
+    the weight instead, so an older memory always ranks lower than a newer one with the same score.
+    """
+    now = now or datetime.now(timezone.utc)
+    memories = []
+    for memory in result.get("results", []):
+        expires_at = _parse_time((memory.get("metadata") or {}).get("expires_at"))
+        if expires_at is not None and expires_at <= now:
+            continue
+        written_at = _parse_time(memory.get("updated_at") or memory.get("created_at"))
+        if half_life_days and written_at is not None and memory.get("score") is not None:
+            age_days = max((now - written_at).total_seconds(), 0) / 86400
+            weight = 0.5 ** (age_days / half_life_days)
+            score = memory["score"]
+            memory = {**memory, "score": score * weight if score >= 0 else score / weight}
+        memories.append(memory)
+    if half_life_days:
+        memories.sort(key=lambda memory: memory.get("score") or 0, reverse=True)
+    return {**result, "results": memories}
+
+
+def parse_cursor(cursor: Optional[str]) -> Union[str, int, None]:
+    """Turn a `next_cursor` value back into a Qdrant scroll offset (a point id)."""
+    if cursor is None:
+        return None
+    if cursor.isdigit():
+        return int(cursor)
+    try:
+        return str(uuid.UUID(cursor))
+    except ValueError:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def scroll_memories(mem0: Memory, filters: dict, limit: int, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """Return one page of memories matching `filters` and the cursor of the next page (None on the last page)."""
+    vector_store = mem0.vector_store
+    points, next_offset = vector_store.client.scroll(
+        collection_name=vector_store.collection_name,
+        scroll_filter=vector_store._create_filter(filters) if filters else None,
+        limit=limit,
+        offset=parse_cursor(cursor),
+        with_payload=True,
+        with_vectors=False,
+    )
+    return [format_memory(point) for point in points], str(next_offset) if next_offset is not None else None
+
+
+def search_filters(user_id=None, agent_id=None, run_id=None, filters: Optional[dict] = None) -> dict:
+    """Build the filters of a search the way `Memory.search` does, including its scope check."""
+    filters = dict(filters or {})
+    for key, value in (("user_id", user_id), ("agent_id", agent_id), ("run_id", run_id)):
+        if value:
+            filters[key] = value
+    if not any(key in filters for key in ("user_id", "agent_id", "run_id")):
+        raise ValueError("One of the filters: user_id, agent_id or run_id is required!")
+    return filters
+
+
+def fuse_ranks(rankings: List[Tuple[List, float]], k: int) -> List[Tuple[object, float]]:
+    """Reciprocal rank fusion: score each point by the sum of `weight / (k + rank)` over the rankings it is in."""
+    scores, points = {}, {}
+    for ranking, weight in rankings:
+        for rank, point in enumerate(ranking, start=1):
+            key = str(point.id)
+            points.setdefault(key, point)
+            scores[key] = scores.get(key, 0.0) + weight / (k + rank)
+    return sorted(((points[key], score) for key, score in scores.items()), key=lambda item: item[1], reverse=True)
+
+
+def keyword_candidates(mem0: Memory, keyword_index, query: str, filters: dict, limit: int,
+                       with_vectors: bool = False) -> List:
+    """Return the points best matching the terms of `query` that also pass `filters`, in BM25 order."""
+    memory_ids = keyword_index.search(query, filters, limit)
+    if not memory_ids:
+        return []
+    vector_store = mem0.vector_store
+    scope_filter = vector_store._create_filter(filters) if filters else None
+    points, _ = vector_store.client.scroll(
+        collection_name=vector_store.collection_name,
+        scroll_filter=models.Filter(
+            must=[models.HasIdCondition(has_id=memory_ids), *((scope_filter.must or []) if scope_filter else [])]
+        ),
+        limit=len(memory_ids),
+        with_payload=True,
+        with_vectors=with_vectors,
+    )
+    order = {memory_id: rank for rank, memory_id in enumerate(memory_ids)}
+    return sorted(points, key=lambda point: order[str(point.id)])
+
+
+def candidate_count(limit: int, hybrid: Optional[dict], rerank: Optional[dict]) -> int:
+    """Number of results to fetch for a search: hybrid fusion and reranking both over-fetch."""
+    return max(limit, hybrid["candidates"] if hybrid else 0, rerank["candidates"] if rerank else 0)
+
+
+def search_batch(mem0: Memory, searches: List[Tuple[str, dict, int, Optional[dict], Optional[dict]]],
+                 keyword_index=None, reranker=None) -> List[dict]:
+    """Run several (query, filters, limit, hybrid, rerank) searches with one embedding batch and one Qdrant request.
+
+    `hybrid` is None for a dense search, or a dict with `dense_weight`, `sparse_weight`, `rrf_k`
+    and `candidates` to fuse the dense results with keyword matches from `keyword_index`.
+    `rerank` is None, or a dict with `mode` ("cross-encoder" or "mmr"), `candidates` and
+    `mmr_lambda` to re-order the first `candidates` results and keep `limit` of them; the
+    cross-encoder searches are scored by `reranker` in one call.
+    Returns one `Memory.search`-shaped result per search, in order.
+    """
+    queries = [query for query, _, _, _, _ in searches]
+    graph_futures = []
+    with ThreadPoolExecutor(max_workers=len(searches)) as executor:
+        if mem0.enable_graph:
+            graph_futures = [
+                executor.submit(mem0.graph.search, query, filters, limit) for query, filters, limit, _, _ in searches
+            ]
+        keyword_futures = [
+            executor.submit(
+                keyword_candidates, mem0, keyword_index, query, filters, candidate_count(limit, hybrid, rerank),
+                bool(rerank) and rerank["mode"] == "mmr"
+            )
+            if hybrid else None
+            for query, filters, limit, hybrid, rerank in searches
+        ]
+
+        embedder = mem0.embedding_model
+        if hasattr(embedder, "embed_batch"):
+            vectors = embedder.embed_batch(queries)
+        else:
+            vectors = [embedder.embed(query) for query in queries]
+
+        vector_store = mem0.vector_store
+        hits = vector_store.client.search_batch(
+            collection_name=vector_store.collection_name,
+            requests=[
+                models.SearchRequest(
+                    vector=vector,
+                    filter=vector_store._create_filter(filters) if filters else None,
+                    limit=candidate_count(limit, hybrid, rerank),
+                    params=getattr(vector_store, "search_params", None),
+                    with_payload=True,
+                    # MMR compares the candidates with each other
+                    with_vector=bool(rerank) and rerank["mode"] == "mmr",
+                )
+                for vector, (_, filters, limit, hybrid, rerank) in zip(vectors, searches)
+            ],
+        )
+
+        rankings = []
+        for i, points in enumerate(hits):
+            _, _, limit, hybrid, rerank = searches[i]
+            if hybrid:
+                ranking = fuse_ranks(
+                    [(points, hybrid["dense_weight"]), (keyword_futures[i].result(), hybrid["sparse_weight"])],
+                    hybrid["rrf_k"],
+                )
+            else:
+                ranking = [(point, point.score) for point in points]
+            ranking = ranking[:candidate_count(limit, None, rerank)]
+            if rerank and rerank["mode"] == "mmr":
+                picked = mmr(vectors[i], [point.vector for point, _ in ranking], limit, rerank["mmr_lambda"])
+                ranking = [ranking[j] for j in picked]
+            rankings.append(ranking)
+
+        cross_encoded = [i for i, search in enumerate(searches) if search[4] and search[4]["mode"] == "cross-encoder"]
+        if cross_encoded:
+            pairs = [(searches[i][0], (point.payload or {}).get("data") or "") for i in cross_encoded for point, _ in rankings[i]]
+            scores = iter(reranker.score(pairs))
+            for i in cross_encoded:
+                rankings[i] = sorted(
+                    ((point, next(scores)) for point, _ in rankings[i]), key=lambda item: item[1], reverse=True
+                )
+
+        results = []
+        for i, ranking in enumerate(rankings):
+            limit = searches[i][2]
+            result = {"results": [{**format_memory(point), "score": score} for point, score in ranking[:limit]]}
+            if graph_futures:
+                result["relations"] = graph_futures[i].result()
+            results.append(result)
+    return results
@@ -0,0 +1,88 @@
+import logging
+import threading
+from typing import Dict, Optional
+
+from mem0.configs.embeddings.base import BaseEmbedderConfig
+from mem0.embeddings.huggingface import HuggingFaceEmbedding
+from mem0.utils.factory import EmbedderFactory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "multi-qa-MiniLM-L6-cos-v1"
+
+_models: Dict[str, object] = {}
+_lock = threading.Lock()
+
+
+def load_sentence_transformer(model_name: str, model_kwargs: Optional[dict] = None):
+    """Load a SentenceTransformer once per process and return the same instance afterwards.
+
+    When the model is loaded in a pre-fork server's master process, the workers inherit its
+    weights as copy-on-write pages instead of each loading their own copy.
+    """
+    key = f"{model_name}:{sorted((model_kwargs or {}).items())}"
+    with _lock:
+        if key not in _models:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name, **(model_kwargs or {}))
+            model.eval()
+            _models[key] = model
+        return _models[key]
+
+
+def load_cross_encoder(model_name: str):
+    """Load a sentence-transformers CrossEncoder once per process, like `load_sentence_transformer`."""
+    key = f"cross-encoder:{model_name}"
+    with _lock:
+        if key not in _models:
+            from sentence_transformers import CrossEncoder
+            _models[key] = CrossEncoder(model_name)
+        return _models[key]
+
+
+class SharedHuggingFaceEmbedding(HuggingFaceEmbedding):
+    """mem0's Hugging Face embedder, using the process-wide model from `load_sentence_transformer`."""
+
+    def __init__(self, config: Optional[BaseEmbedderConfig] = None):
+        # Skip HuggingFaceEmbedding.__init__, which always loads a new copy of the model
+        super(HuggingFaceEmbedding, self).__init__(config)
+        self.config.model = self.config.model or DEFAULT_MODEL
+        self.model = load_sentence_transformer(self.config.model, self.config.model_kwargs)
+        self.config.embedding_dims = self.config.embedding_dims or self.model.get_sentence_embedding_dimension()
+
+
+def register_shared_embedders():
+    """Make mem0 build Hugging Face embedders on top of the shared model."""
+    EmbedderFactory.provider_to_class["huggingface"] = f"{__name__}.SharedHuggingFaceEmbedding"
+
+
+def preload_embedding_model(embedding_config: dict):
+    """Load the configured Hugging Face model into this process ahead of time.
+
+    Only the weights are loaded: running the model before forking would start thread pools
+    that don't survive the fork, so the first encode is left to each worker's warm-up.
+    """
+    config = embedding_config["config"]
+    # ONNX Runtime sessions don't survive a fork, so ONNX models are loaded by each worker
+    if embedding_config["provider"] != "huggingface" or (config.get("model_kwargs") or {}).get("backend") == "onnx":
+        return
+    model_name = config.get("model") or DEFAULT_MODEL
+    load_sentence_transformer(model_name, config.get("model_kwargs"))
+    logger.info(f"Preloaded embedding model {model_name}")
+
+
+def set_torch_threads(threads: int):
+    """Limit the CPU threads torch uses in this process, so workers don't oversubscribe the cores."""
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(max(1, threads))
+
+
+def preload_rerank_model(rerank_config: dict):
+    """Load the cross-encoder into this process ahead of time when searches rerank with it by default."""
+    if rerank_config["default_mode"] != "cross-encoder":
+        return
+    load_cross_encoder(rerank_config["model"])
+    logger.info(f"Preloaded rerank model {rerank_config['model']}")
@@ -0,0 +1,200 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import AbstractContextManager, ExitStack, contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+# The tenant of the request (or job) being served; None is the default, untenanted collection
+current_tenant: ContextVar[Optional[str]] = ContextVar("current_tenant", default=None)
+
+# What the request being served holds until its response is sent, see RequestScopeMiddleware
+_request_scope: ContextVar[Optional[ExitStack]] = ContextVar("request_scope", default=None)
+
+_tenant_name = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class InvalidTenantError(ValueError):
+    pass
+
+
+def validate_tenant(tenant: str) -> str:
+    """Tenant names become part of collection and file names, so only [A-Za-z0-9_-] is allowed."""
+    if not _tenant_name.fullmatch(tenant):
+        raise InvalidTenantError(f"Invalid tenant '{tenant}': use 1-64 letters, digits, '-' or '_'")
+    return tenant
+
+
+def parse_tenant_tokens(spec: str) -> Dict[str, str]:
+    """Parse "token:tenant,token:tenant" into {token: tenant}."""
+    tokens = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        token, _, tenant = item.rpartition(":")
+        if not token:
+            raise ValueError(f"Tenant token entry '{item}' must look like token:tenant")
+        tokens[token] = validate_tenant(tenant)
+    return tokens
+
+
+def resolve_tenant(mode: str, header: Optional[str], token: Optional[str], tokens: Dict[str, str]) -> Optional[str]:
+    """Return the tenant of a request: the tenant header in "header" mode, the bearer token's tenant in "token" mode."""
+    if mode == "header":
+        return validate_tenant(header) if header else None
+    if mode == "token":
+        return tokens.get(token) if token else None
+    return None
+
+
+def tenant_collection(collection: str, tenant: Optional[str]) -> str:
+    return f"{collection}_{tenant}" if tenant else collection
+
+
+def collection_tenants(collection: str, collections: List[str]) -> List[str]:
+    """Return the tenants whose collections (see `tenant_collection`) are among `collections`."""
+    prefix = f"{collection}_"
+    return sorted(
+        name[len(prefix):] for name in collections
+        if name.startswith(prefix) and _tenant_name.fullmatch(name[len(prefix):])
+    )
+
+
+def tenant_path(path: str, tenant: Optional[str]) -> str:
+    """Give a tenant its own copy of a file, e.g. index.db -> index_acme.db."""
+    if not tenant:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{tenant}{ext}"
+
+
+@contextmanager
+def tenant_context(tenant: Optional[str]):
+    """Serve the enclosed calls (e.g. a background job) for `tenant`."""
+    token = current_tenant.set(tenant)
+    try:
+        yield
+    finally:
+        current_tenant.reset(token)
+
+
+class RequestScopeMiddleware:
+    """ASGI middleware releasing what a request entered with `hold_for_request` once its response is sent.
+
+    Unlike FastAPI dependencies with yield, the release waits for the end of streamed responses.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with ExitStack() as stack:
+            token = _request_scope.set(stack)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _request_scope.reset(token)
+
+
+def hold_for_request(context_manager: AbstractContextManager):
+    """Enter `context_manager` until the end of the current request, or not at all outside of a request."""
+    stack = _request_scope.get()
+    if stack is not None:
+        stack.enter_context(context_manager)
+
+
+class TenantPool:
+    """LRU pool of per-tenant objects, built on first use by `factory(tenant)`.
+
+    At most `max_size` objects are kept; the least recently used one is dropped to make room,
+    and passed to `on_evict(tenant, value)`. A dropped object stays usable by the requests still
+    holding it and is rebuilt on the next request of its tenant. Different tenants are built
+    concurrently, one tenant only once.
+
+    Requests and jobs using a tenant's object wrap their work in `hold(tenant)`. A dropped object
+    is passed to `close(tenant, value)` once no block holds its tenant anymore.
+    """
+
+    def __init__(self, factory: Callable[[str], Any], max_size: int,
+                 on_evict: Optional[Callable[[str, Any], None]] = None,
+                 close: Optional[Callable[[str, Any], None]] = None):
+        self.factory = factory
+        self.max_size = max_size
+        self.on_evict = on_evict
+        self.close = close
+        self._entries: OrderedDict = OrderedDict()
+        self._building: Dict[str, threading.Lock] = {}
+        self._holds: Dict[str, int] = {}
+        # Dropped objects waiting for the blocks holding their tenant to end
+        self._retired: Dict[str, List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, tenant: str) -> Any:
+        with self._lock:
+            if tenant in self._entries:
+                self._entries.move_to_end(tenant)
+                return self._entries[tenant]
+            build_lock = self._building.setdefault(tenant, threading.Lock())
+        with build_lock:
+            with self._lock:
+                if tenant in self._entries:
+                    self._entries.move_to_end(tenant)
+                    return self._entries[tenant]
+            value = self.factory(tenant)
+            evicted = []
+            with self._lock:
+                self._entries[tenant] = value
+                self._building.pop(tenant, None)
+                while len(self._entries) > self.max_size:
+                    evicted.append(self._entries.popitem(last=False))
+        for item in evicted:
+            if self.on_evict is not None:
+                self.on_evict(*item)
+            self._retire(*item)
+        return value
+
+    @contextmanager
+    def hold(self, tenant: str):
+        """Keep the objects of `tenant` open until the end of the block, even if they are dropped meanwhile."""
+        with self._lock:
+            self._holds[tenant] = self._holds.get(tenant, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._holds[tenant] -= 1
+                retired = []
+                if not self._holds[tenant]:
+                    del self._holds[tenant]
+                    retired = self._retired.pop(tenant, [])
+            for value in retired:
+                self._close(tenant, value)
+
+    def _retire(self, tenant: str, value: Any):
+        with self._lock:
+            if self._holds.get(tenant):
+                self._retired.setdefault(tenant, []).append(value)
+                return
+        self._close(tenant, value)
+
+    def _close(self, tenant: str, value: Any):
+        if self.close is not None:
+            self.close(tenant, value)
+
+    def peek(self, tenant: str) -> Any:
+        """Return the object of `tenant` if it is already built, or None, without building it."""
+        with self._lock:
+            if tenant in self._entries:
+                self._entries.move_to_end(tenant)
+                return self._entries[tenant]
+        return None
+
+    def tenants(self) -> List[str]:
+        """Return the tenants that currently have an instance, least recently used first."""
+        with self._lock:
+            return list(self._entries)
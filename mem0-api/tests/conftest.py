@@ -0,0 +1,29 @@
+"""The service on an in-memory Qdrant, with the benchmark's stubs in place of the LLM and the embedding model."""
+import argparse
+import tempfile
+
+import pytest
+
+from bench.run import build_memory, prepare_environment
+
+STATE_DIR = tempfile.mkdtemp(prefix="mem0-api-tests-")
+# Before a test module imports the config
+prepare_environment(STATE_DIR)
+
+
+@pytest.fixture(scope="session")
+def mem0():
+    args = argparse.Namespace(
+        embedding_model="stub", embedding_dims=384, embed_latency_ms=0, llm_latency_ms=0, graph=False, graph_latency_ms=0
+    )
+    return build_memory(args, STATE_DIR)
+
+
+@pytest.fixture(scope="session")
+def client(mem0):
+    from fastapi.testclient import TestClient
+
+    import app
+
+    with TestClient(app.app) as client:
+        yield client
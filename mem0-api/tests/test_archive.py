@@ -0,0 +1,71 @@
+"""Export and import: round trip through the API and rejection of malformed files."""
+import uuid
+
+import numpy as np
+import pytest
+
+import archive
+from archive import MAGIC, encode_frame
+
+
+def header(dims=384):
+    return MAGIC + encode_frame({"type": "header", "version": archive.FORMAT_VERSION, "dims": dims})
+
+
+def points(count=1, dims=384, **overrides):
+    return encode_frame({
+        "type": "points",
+        "ids": [str(uuid.uuid4()) for _ in range(count)],
+        "payloads": [{"data": "imported", "user_id": "archive"}] * count,
+        "dims": dims,
+        "vectors": np.ones((count, dims), dtype="<f4").tobytes(),
+        **overrides,
+    })
+
+
+def end(points=0, history=0):
+    return encode_frame({"type": "end", "points": points, "history": history})
+
+
+def test_round_trip(client, mem0):
+    user_id = str(uuid.uuid4())
+    ids = [
+        client.post("/store", json={"data": f"fact {i}", "user_id": user_id, "infer": False}).json()["data"]["results"][0]["id"]
+        for i in range(3)
+    ]
+    exported = client.get("/export", params={"user_id": user_id}).content
+    before = {memory_id: mem0.vector_store.get(vector_id=memory_id) for memory_id in ids}
+    client.delete(f"/delete/{ids[0]}")
+
+    response = client.post("/import", content=exported)
+    assert response.status_code == 200, response.text
+    assert response.json()["data"]["points"] == 3
+    # The deleted memory is back with its vector, payload and history
+    restored = mem0.vector_store.get(vector_id=ids[0])
+    assert restored.payload == before[ids[0]].payload
+    history = client.get(f"/retrieve/{ids[0]}").json()["data"]
+    assert ("ADD", "fact 0") in [(row["event"], row["new_memory"]) for row in history]
+    point = mem0.vector_store.client.retrieve(mem0.vector_store.collection_name, [ids[1]], with_vectors=True)[0]
+    assert len(point.vector) == 384
+
+
+@pytest.mark.parametrize("body", [
+    b"NOTANEXPORT" + end(),
+    MAGIC + points() + end(1),
+    header() + header() + end(),
+    header() + points(vectors=b"short") + end(1),
+    header() + points(ids=["not-a-uuid"]) + end(1),
+    header() + points(payloads=None) + end(1),
+    header() + points(dims=8) + end(1),
+    header(dims=8) + end(),
+    header() + encode_frame({"type": "history", "rows": [{"old_memory": "no ids"}]}) + end(),
+    header() + encode_frame({"type": "unknown"}) + end(),
+    header() + encode_frame([1, 2, 3]) + end(),
+    header() + b"\x05\x00\x00\x00garbage" + end(),
+    header() + end() + end(),
+    header() + points(),
+])
+def test_malformed_import_is_rejected(client, body):
+    response = client.post("/import", content=body)
+    assert response.status_code == 422
+    assert response.json()["error"] == "InvalidExportError"
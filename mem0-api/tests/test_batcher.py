@@ -0,0 +1,103 @@
+"""Micro-batching of concurrent embedder calls."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from batcher import BatchingEmbedder, MicroBatcher
+
+
+def test_concurrent_calls_share_a_batch():
+    batches = []
+    started = threading.Barrier(8)
+
+    def handler(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(handler, max_batch_size=8, max_wait=0.2)
+
+    def submit(item):
+        started.wait()
+        return batcher.submit(item)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(submit, range(8)))
+    assert results == [item * 2 for item in range(8)]
+    assert len(batches) < 8
+    assert sorted(item for batch in batches for item in batch) == list(range(8))
+
+
+def test_batches_are_capped():
+    batches = []
+    batcher = MicroBatcher(lambda items: batches.append(len(items)) or list(items), max_batch_size=3, max_wait=0.2)
+    with ThreadPoolExecutor(7) as pool:
+        assert list(pool.map(batcher.submit, range(7))) == list(range(7))
+    assert max(batches) <= 3
+
+
+def test_a_failed_batch_fails_its_callers_only():
+    def handler(items):
+        if "bad" in items:
+            raise ValueError("bad item")
+        return items
+
+    batcher = MicroBatcher(handler, max_wait=0)
+    with pytest.raises(ValueError):
+        batcher.submit("bad")
+    assert batcher.submit("good") == "good"
+
+
+def test_idle_thread_exits_and_restarts():
+    batcher = MicroBatcher(lambda items: items, max_wait=0, idle_timeout=0.05)
+    assert batcher.submit(1) == 1
+    thread = batcher._thread
+    thread.join(timeout=1)
+    assert not thread.is_alive()
+    assert batcher._thread is None
+    assert batcher.submit(2) == 2
+
+
+class Embedder:
+    def __init__(self):
+        self.calls = 0
+
+    def embed(self, text):
+        self.calls += 1
+        return [float(len(text))]
+
+
+def test_batching_embedder_returns_each_callers_vector():
+    embedder = BatchingEmbedder(Embedder(), max_wait=0.05)
+    texts = ["a" * n for n in range(1, 9)]
+    with ThreadPoolExecutor(8) as pool:
+        assert list(pool.map(embedder.embed, texts)) == [[float(n)] for n in range(1, 9)]
+    assert embedder.embed_batch(["ab", "abc"]) == [[2.0], [3.0]]
+
+
+class Encoder:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.batch_sizes.append(batch_size)
+        return np.array([[float(len(text))] for text in texts])
+
+
+class EncoderEmbedder:
+    def __init__(self, max_batch_size=None):
+        self.model = Encoder()
+        if max_batch_size is not None:
+            self.max_batch_size = max_batch_size
+
+
+def test_embed_batch_keeps_the_configured_batch_size():
+    texts = ["a" * n for n in range(1, 101)]
+    onnx = EncoderEmbedder(max_batch_size=16)
+    assert BatchingEmbedder(onnx, max_batch_size=64).embed_batch(texts) == [[float(n)] for n in range(1, 101)]
+    assert onnx.model.batch_sizes == [16]
+
+    sentence_transformer = EncoderEmbedder()
+    BatchingEmbedder(sentence_transformer, max_batch_size=64).embed_batch(texts)
+    assert sentence_transformer.model.batch_sizes == [64]
@@ -0,0 +1,52 @@
+"""Bulk deletion: pages larger than SQLite's variable limit, and /delete-all."""
+import sqlite3
+import uuid
+
+import numpy as np
+import pytest
+
+from bulk_delete import count_memories, delete_page, id_chunks
+
+
+def test_id_chunks():
+    assert [len(chunk) for chunk in id_chunks([str(i) for i in range(1201)])] == [500, 500, 201]
+    assert list(id_chunks([])) == []
+
+
+def test_delete_page_larger_than_the_sqlite_variable_limit(mem0):
+    user_id = str(uuid.uuid4())
+    ids = [str(uuid.uuid4()) for _ in range(1200)]
+    vectors = np.random.default_rng(0).random((len(ids), 384)).tolist()
+    mem0.vector_store.insert(vectors=vectors, payloads=[{"data": "x", "user_id": user_id}] * len(ids), ids=ids)
+    with mem0.db.lock:
+        with mem0.db.connection:
+            mem0.db.connection.executemany(
+                "INSERT INTO history (id, memory_id, new_memory, event, is_deleted) VALUES (?, ?, 'x', 'ADD', 0)",
+                [(str(uuid.uuid4()), memory_id) for memory_id in ids],
+            )
+    points_filter = mem0.vector_store._create_filter({"user_id": user_id})
+
+    # The limit of older SQLite builds; recent ones allow 32766 variables
+    if not hasattr(mem0.db.connection, "setlimit"):
+        pytest.skip("Connection.setlimit needs Python 3.11")
+    limit = mem0.db.connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    try:
+        assert delete_page(mem0, points_filter, 2000) == (1200, 1200)
+    finally:
+        mem0.db.connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit)
+    assert count_memories(mem0, points_filter) == 0
+    assert mem0.db.connection.execute(
+        "SELECT COUNT(*) FROM history WHERE memory_id IN (?, ?)", (ids[0], ids[-1])
+    ).fetchone()[0] == 0
+    assert delete_page(mem0, points_filter, 2000) == (0, 0)
+
+
+def test_delete_all(client, mem0):
+    user_id = str(uuid.uuid4())
+    for i in range(3):
+        client.post("/store", json={"data": f"fact {i}", "user_id": user_id, "infer": False})
+    client.post("/store", json={"data": "other user", "user_id": "someone else", "infer": False})
+    response = client.delete("/delete-all", params={"user_id": user_id, "async_mode": False}).json()
+    assert response["data"]["deleted"] == 3
+    assert client.get("/retrieve", params={"user_id": user_id}).json()["data"]["results"] == []
+    assert client.get("/retrieve", params={"user_id": "someone else"}).json()["data"]["results"]
@@ -0,0 +1,74 @@
+"""Memory TTLs: validation, expiry through updates, and compaction."""
+import time
+import uuid
+
+import pytest
+from qdrant_client import models
+
+from compaction import EXPIRES_AT, Throttle, compact
+from dependencies import get_job_queue, get_tenant_pool
+from mem0_config import tenancy_config, vector_config
+from tenancy import tenant_collection
+from update_buffer import apply_updates
+
+SETTINGS = {"page_size": 100, "dedup_threshold": 0, "max_scope_size": 1000}
+
+
+def store(client, text, user_id, **metadata):
+    response = client.post("/store", json={"data": text, "user_id": user_id, "infer": False, "metadata": metadata})
+    assert response.status_code == 200, response.text
+    return response.json()["data"]["results"][0]["id"]
+
+
+def payload(mem0, memory_id):
+    memory = mem0.vector_store.get(vector_id=memory_id)
+    return memory.payload if memory is not None else None
+
+
+@pytest.mark.parametrize("ttl", ["abc", [1], -5, 0, True, 1e30])
+def test_invalid_ttl_is_rejected(client, ttl):
+    response = client.post("/store", json={"data": "x", "user_id": "ttl", "infer": False, "metadata": {"ttl_seconds": ttl}})
+    assert response.status_code == 422
+
+
+def test_updated_memory_keeps_its_ttl_and_is_compacted(client, mem0):
+    user_id = str(uuid.uuid4())
+    direct = store(client, "expires after a direct update", user_id, ttl_seconds=1)
+    buffered = store(client, "expires after a buffered update", user_id, ttl_seconds=1)
+    kept = store(client, "has no ttl", user_id)
+    expires_at = payload(mem0, direct)[EXPIRES_AT]
+
+    assert client.put(f"/update/{direct}", json={"data": "updated directly"}).status_code == 200
+    apply_updates(mem0, [(buffered, "updated in bulk")])
+    assert payload(mem0, direct)["data"] == "updated directly"
+    assert payload(mem0, direct)[EXPIRES_AT] == expires_at
+    assert EXPIRES_AT in payload(mem0, buffered)
+
+    time.sleep(1.1)
+    progress = compact(mem0, SETTINGS, Throttle(1.0), lambda progress: None)
+    assert progress["expired"] >= 2
+    assert payload(mem0, direct) is None
+    assert payload(mem0, buffered) is None
+    assert payload(mem0, kept) is not None
+
+
+def test_idle_tenants_are_compacted(client, mem0, monkeypatch):
+    import app
+
+    monkeypatch.setitem(tenancy_config, "mode", "header")
+    # A tenant with a collection but no open instance, e.g. evicted from the pool
+    tenant = "idle" + uuid.uuid4().hex[:8]
+    collection = tenant_collection(vector_config["config"]["collection_name"], tenant)
+    mem0.vector_store.client.create_collection(
+        collection, vectors_config=models.VectorParams(size=384, distance=models.Distance.COSINE)
+    )
+    assert tenant not in get_tenant_pool().tenants()
+
+    queued = []
+    job_queue = get_job_queue()
+    monkeypatch.setattr(job_queue, "count", lambda kind, status: 0)
+    monkeypatch.setattr(job_queue, "enqueue", lambda kind, payload, tenant=None: queued.append((kind, payload["tenant"])))
+    app.schedule_compaction()
+    mem0.vector_store.client.delete_collection(collection)
+    assert ("compact", None) in queued
+    assert ("compact", tenant) in queued
@@ -0,0 +1,59 @@
+"""CachedEmbedder: text normalization, batching and the on-disk store."""
+import time
+
+from cache import CachedEmbedder, EmbeddingStore
+
+
+class Embedder:
+    def __init__(self):
+        self.texts = []
+
+    def embed(self, text):
+        self.texts.append(text)
+        return [float(len(text)), 0.5]
+
+
+def test_equivalent_texts_share_an_entry():
+    embedder = Embedder()
+    cached = CachedEmbedder(embedder, "model", max_size=10, lowercase=True)
+    vector = cached.embed("Likes  tea\n")
+    assert cached.embed("likes tea") == vector
+    assert cached.embed("ｌｉｋｅｓ tea") == vector
+    # The text is embedded as given, normalization only builds the cache key
+    assert embedder.texts == ["Likes  tea\n"]
+    assert cached.stats()["hits"] == 2
+
+
+def test_models_do_not_share_entries():
+    embedder = Embedder()
+    CachedEmbedder(embedder, "small", max_size=10).embed("tea")
+    assert CachedEmbedder(embedder, "large", max_size=10).embed("tea") == [3.0, 0.5]
+    assert embedder.texts == ["tea", "tea"]
+
+
+def test_embed_batch_only_embeds_misses():
+    embedder = Embedder()
+    cached = CachedEmbedder(embedder, "model", max_size=10)
+    cached.embed("b")
+    assert cached.embed_batch(["a", "b", "ccc"]) == [[1.0, 0.5], [1.0, 0.5], [3.0, 0.5]]
+    assert embedder.texts == ["b", "a", "ccc"]
+
+
+def test_store_survives_a_restart(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    CachedEmbedder(Embedder(), "model", max_size=10, store=EmbeddingStore(path, 10)).embed("tea")
+
+    embedder = Embedder()
+    cached = CachedEmbedder(embedder, "model", max_size=10, store=EmbeddingStore(path, 10))
+    assert cached.embed("tea") == [3.0, 0.5]
+    assert embedder.texts == []
+    assert cached.stats()["persistent_hits"] == 1
+    assert cached.stats()["hit_rate"] == 1.0
+
+
+def test_expired_store_entries_are_recomputed(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "embeddings.db"), 10, ttl=0.05)
+    store.set("key", [1.0])
+    assert store.get("key") == [1.0]
+    time.sleep(0.1)
+    assert store.get("key") is None
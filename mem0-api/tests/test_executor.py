@@ -0,0 +1,91 @@
+"""Operation pools: bounded queues, queue timeouts, and the HTTP errors they map to."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+import dependencies
+from dependencies import get_executor, shutdown_executor
+from errors.exception import ServiceOverloadedError, ServiceTimeoutError
+from executor import MemoryExecutor, OperationPool
+
+
+def occupy(pool: OperationPool, calls: int, release: threading.Event) -> threading.Thread:
+    """Fill `pool` with `calls` calls blocked until `release` is set, from another event loop."""
+
+    async def run():
+        await asyncio.gather(*(pool.run(release.wait) for _ in range(calls)))
+
+    thread = threading.Thread(target=asyncio.run, args=(run(),), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while pool.stats()["running"] + pool.stats()["queued"] < calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return thread
+
+
+def test_calls_beyond_the_queue_are_rejected():
+    pool = OperationPool("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+    thread = occupy(pool, 2, release)
+    try:
+        assert pool.stats()["running"] == 1
+        assert pool.stats()["queued"] == 1
+        with pytest.raises(ServiceOverloadedError):
+            asyncio.run(pool.run(lambda: None))
+        assert pool.stats()["rejected"] == 1
+    finally:
+        release.set()
+        thread.join()
+    assert asyncio.run(pool.run(lambda: "ran")) == "ran"
+    pool.shutdown()
+
+
+def test_calls_waiting_past_the_queue_timeout_are_dropped():
+    pool = OperationPool("test", max_workers=1, max_queue=1, queue_timeout=0.05)
+
+    async def run():
+        return await asyncio.gather(pool.run(time.sleep, 0.2), pool.run(lambda: "ran"), return_exceptions=True)
+
+    first, second = asyncio.run(run())
+    assert first is None
+    assert isinstance(second, ServiceTimeoutError)
+    assert pool.stats()["timed_out"] == 1
+    assert pool.stats()["queued"] == 0
+    pool.shutdown()
+
+
+def test_overloaded_pool_returns_429(client, monkeypatch):
+    pool = OperationPool("write", max_workers=1, max_queue=0)
+    monkeypatch.setitem(get_executor().pools, "write", pool)
+    release = threading.Event()
+    thread = occupy(pool, 1, release)
+    try:
+        response = client.post("/store", json={"data": "x", "user_id": "overloaded", "infer": False})
+    finally:
+        release.set()
+        thread.join()
+        pool.shutdown()
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["error"] == "ServiceOverloadedError"
+
+
+def test_shutdown_drains_queued_operations(monkeypatch):
+    executor = MemoryExecutor({"write": {"max_workers": 1, "max_queue": 4}})
+    monkeypatch.setattr(dependencies, "_executor", executor)
+    done = []
+
+    async def run():
+        await asyncio.gather(*(executor.run("write", lambda i=i: time.sleep(0.05) or done.append(i)) for i in range(3)))
+
+    thread = threading.Thread(target=asyncio.run, args=(run(),), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while executor.stats()["write"]["queued"] + executor.stats()["write"]["running"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    shutdown_executor()
+    assert done == [0, 1, 2]
+    assert dependencies._executor is None
+    thread.join()
@@ -0,0 +1,55 @@
+"""The graph stage of raw stores: run inline or queued as a job, per GRAPH_STORE_DEFERRED."""
+import uuid
+
+import pytest
+
+from dependencies import get_job_queue
+from mem0_config import graph_stage_config
+
+
+@pytest.fixture
+def graph_calls(mem0, monkeypatch):
+    calls = []
+
+    def add_to_graph(messages, filters):
+        calls.append((messages, filters))
+        return [{"source": "user", "relationship": "likes", "target": "tea"}]
+
+    monkeypatch.setattr(mem0, "enable_graph", True)
+    monkeypatch.setattr(mem0, "_add_to_graph", add_to_graph)
+    return calls
+
+
+def store(client, user_id, **fields):
+    response = client.post("/store", json={"data": "likes tea", "user_id": user_id, "infer": False, **fields})
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def test_raw_store_runs_the_graph_stage_inline_when_not_deferred(client, graph_calls, monkeypatch):
+    monkeypatch.setitem(graph_stage_config, "deferred", False)
+    user_id = str(uuid.uuid4())
+    result = store(client, user_id, graph=True)
+    assert "graph_job" not in result
+    assert result["relations"] == [{"source": "user", "relationship": "likes", "target": "tea"}]
+    assert graph_calls == [([{"role": "user", "content": "likes tea"}], {"user_id": user_id})]
+
+
+def test_raw_store_queues_the_graph_stage_when_deferred(client, graph_calls, monkeypatch):
+    monkeypatch.setitem(graph_stage_config, "deferred", True)
+    jobs = []
+    # Not really queued: the job workers would run it during a later test
+    monkeypatch.setattr(get_job_queue(), "enqueue", lambda kind, payload, tenant=None: jobs.append(kind) or "job-id")
+    result = store(client, str(uuid.uuid4()), graph=True)
+    assert result["relations"] == []
+    assert result["graph_job"] == {"job_id": "job-id", "status": "queued"}
+    assert jobs == ["graph"]
+    assert graph_calls == []
+
+
+def test_raw_store_skips_the_graph_stage_unless_asked(client, graph_calls, monkeypatch):
+    monkeypatch.setitem(graph_stage_config, "deferred", False)
+    result = store(client, str(uuid.uuid4()))
+    assert result["relations"] == []
+    assert "graph_job" not in result
+    assert graph_calls == []
@@ -0,0 +1,113 @@
+"""JobQueue: leases, retries, progress and tenant scoping."""
+import threading
+import time
+
+import pytest
+
+from jobs import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), lease_seconds=60, max_attempts=3, poll_interval=0.05)
+    yield queue
+    queue.stop()
+
+
+def wait_for(queue, job_id, status="succeeded", timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} is {queue.get(job_id)['status']}, not {status}")
+
+
+def test_runs_jobs_and_keeps_results(queue):
+    queue.register("echo", lambda payload: {"echo": payload["value"]})
+    queue.start()
+    job = wait_for(queue, queue.enqueue("echo", {"value": 1}))
+    assert job["result"] == {"echo": 1}
+    assert job["attempts"] == 1
+
+
+def test_retries_errors_but_not_invalid_input(queue):
+    calls = []
+
+    def flaky(payload):
+        calls.append(payload["kind"])
+        if payload["kind"] == "invalid":
+            raise ValueError("bad input")
+        if calls.count("flaky") < 3:
+            raise RuntimeError("transient")
+        return "ok"
+
+    queue.register("work", flaky)
+    queue.start()
+    flaky_job = wait_for(queue, queue.enqueue("work", {"kind": "flaky"}))
+    assert flaky_job["attempts"] == 3 and flaky_job["result"] == "ok"
+    invalid_job = wait_for(queue, queue.enqueue("work", {"kind": "invalid"}), "failed")
+    assert invalid_job["attempts"] == 1 and invalid_job["error"] == "bad input"
+
+
+def test_gives_up_after_max_attempts(queue):
+    queue.register("fail", lambda payload: 1 / 0)
+    queue.start()
+    job = wait_for(queue, queue.enqueue("fail", {}), "failed")
+    assert job["attempts"] == 3
+
+
+def test_expired_lease_is_claimed_again_and_resumes(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    crashed = JobQueue(path, lease_seconds=0.2)
+    crashed.register("long", lambda payload: None)
+    job_id = crashed.enqueue("long", {})
+    # A worker claims the job, saves some progress and dies without finishing it
+    claimed_id, _, _ = crashed._claim("long")
+    crashed._local.job_id = claimed_id
+    crashed.report_progress({"done": 2})
+
+    restarted = JobQueue(path, lease_seconds=60, poll_interval=0.05)
+    assert restarted._claim("long") is None
+    resumed_from = []
+    restarted.register("long", lambda payload: resumed_from.append(restarted.current_progress()))
+    time.sleep(0.25)
+    restarted.start()
+    try:
+        job = wait_for(restarted, job_id)
+    finally:
+        restarted.stop()
+    assert resumed_from == [{"done": 2}]
+    assert job["attempts"] == 2
+
+
+def test_one_claim_per_job(queue):
+    queue.register("count", lambda payload: None)
+    for _ in range(50):
+        queue.enqueue("count", {})
+    claimed = []
+
+    def claim_all():
+        while (job := queue._claim("count")) is not None:
+            claimed.append(job[0])
+
+    threads = [threading.Thread(target=claim_all) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(claimed) == len(set(claimed)) == 50
+
+
+def test_jobs_belong_to_their_tenant(queue):
+    queue.register("store", lambda payload: None)
+    default_job = queue.enqueue("store", {})
+    acme_job = queue.enqueue("store", {}, "acme")
+    queue.enqueue("store", {}, "acme")
+    assert queue.get(default_job)["tenant"] is None
+    assert queue.get(acme_job)["tenant"] == "acme"
+    assert queue.stats()["store"]["queued"] == 3
+    assert queue.stats(None)["store"]["queued"] == 1
+    assert queue.stats("acme")["store"]["queued"] == 2
+    assert queue.stats("globex")["store"]["queued"] == 0
@@ -0,0 +1,67 @@
+"""CachedLLM: replayed responses, model settings in the key and coalesced concurrent calls."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from cache import CachedLLM, LLMResponseStore
+
+MESSAGES = [{"role": "user", "content": "Extract the facts"}]
+
+
+class LLM:
+    def __init__(self, model="small", release=None):
+        self.config = SimpleNamespace(model=model, temperature=0, top_p=1, max_tokens=100)
+        self.release = release
+        self.calls = 0
+
+    def generate_response(self, messages, response_format=None, tools=None, tool_choice="auto"):
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(5)
+        return '{"facts": ["likes tea"]}'
+
+
+def test_identical_requests_are_replayed_across_restarts(tmp_path):
+    path = str(tmp_path / "llm.db")
+    llm = LLM()
+    cached = CachedLLM(llm, LLMResponseStore(path, 10))
+    response = cached.generate_response(MESSAGES, response_format={"type": "json_object"})
+    assert cached.generate_response(MESSAGES, response_format={"type": "json_object"}) == response
+    assert llm.calls == 1
+
+    restarted = CachedLLM(llm, LLMResponseStore(path, 10))
+    assert restarted.generate_response(MESSAGES, response_format={"type": "json_object"}) == response
+    assert llm.calls == 1
+    assert restarted.stats()["hits"] == 1
+
+
+def test_different_requests_and_models_are_not_replayed(tmp_path):
+    store = LLMResponseStore(str(tmp_path / "llm.db"), 10)
+    llm = LLM()
+    cached = CachedLLM(llm, store)
+    cached.generate_response(MESSAGES)
+    cached.generate_response(MESSAGES, response_format={"type": "json_object"})
+    cached.generate_response([{"role": "user", "content": "Something else"}])
+    assert llm.calls == 3
+
+    other_model = LLM(model="large")
+    CachedLLM(other_model, store).generate_response(MESSAGES)
+    assert other_model.calls == 1
+
+
+def test_concurrent_identical_calls_are_coalesced(tmp_path):
+    release = threading.Event()
+    llm = LLM(release=release)
+    cached = CachedLLM(llm, LLMResponseStore(str(tmp_path / "llm.db"), 10))
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(cached.generate_response, MESSAGES) for _ in range(4)]
+        # The first call holds the LLM until the other three wait for it
+        deadline = time.monotonic() + 5
+        while cached.coalesced < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        responses = [future.result() for future in futures]
+    assert responses == ['{"facts": ["likes tea"]}'] * 4
+    assert llm.calls == 1
+    assert cached.stats()["coalesced"] == 3
@@ -0,0 +1,87 @@
+"""MemoryIndex: persistence, compaction and sharing the log between server processes."""
+import sqlite3
+import uuid
+
+from memory_index import MemoryIndex
+
+
+def ids(count):
+    return [str(uuid.uuid4()) for _ in range(count)]
+
+
+def test_states_survive_restart(tmp_path):
+    path = str(tmp_path / "index.log")
+    live, deleted = ids(3), ids(2)
+    index = MemoryIndex(path)
+    index.mark_live(live + deleted)
+    index.mark_deleted(deleted)
+
+    reopened = MemoryIndex(path)
+    assert all(reopened.state(memory_id) is True for memory_id in live)
+    assert all(reopened.state(memory_id) is False for memory_id in deleted)
+    assert reopened.state(str(uuid.uuid4())) is None
+    assert reopened.state("not-a-uuid") is False
+    assert len(reopened) == 5
+
+
+def test_torn_record_is_ignored(tmp_path):
+    path = str(tmp_path / "index.log")
+    (memory_id,) = ids(1)
+    MemoryIndex(path).mark_live([memory_id])
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    assert MemoryIndex(path).state(memory_id) is True
+
+
+def test_bootstrap_from_history(tmp_path):
+    connection = sqlite3.connect(":memory:")
+    connection.execute("CREATE TABLE history (memory_id TEXT, is_deleted INTEGER)")
+    live, deleted = ids(2)
+    connection.executemany(
+        "INSERT INTO history VALUES (?, ?)", [(live, 0), (deleted, 0), (deleted, 1)]
+    )
+    index = MemoryIndex(str(tmp_path / "index.log"), connection)
+    assert index.state(live) is True
+    assert index.state(deleted) is False
+
+
+def test_compaction_keeps_the_latest_states(tmp_path):
+    path = str(tmp_path / "index.log")
+    index = MemoryIndex(path)
+    memory_ids = ids(10)
+    # Enough rewrites of the same ids to trigger a compaction, the last write being a delete
+    for _ in range(1100):
+        index.mark_live(memory_ids)
+    index.mark_deleted(memory_ids[:5])
+    assert index._records < 1100 * 10
+    reopened = MemoryIndex(path)
+    assert [reopened.state(memory_id) for memory_id in memory_ids] == [False] * 5 + [True] * 5
+
+
+def test_processes_see_each_others_writes(tmp_path):
+    path = str(tmp_path / "index.log")
+    first, second = MemoryIndex(path), MemoryIndex(path)
+    (memory_id,) = ids(1)
+    first.mark_live([memory_id])
+    assert second.state(memory_id) is True
+    second.mark_deleted([memory_id])
+    assert first.state(memory_id) is False
+
+
+def test_processes_reload_a_compacted_or_cleared_log(tmp_path):
+    path = str(tmp_path / "index.log")
+    first, second = MemoryIndex(path), MemoryIndex(path)
+    memory_ids = ids(10)
+    first.mark_live(memory_ids)
+    for _ in range(1100):
+        first.mark_deleted(memory_ids[:1])
+    # The last appends went to the compacted file
+    first.mark_live(memory_ids[1:2])
+    assert second.state(memory_ids[0]) is False
+    assert second.state(memory_ids[1]) is True
+    second.mark_deleted(memory_ids[2:3])
+    assert first.state(memory_ids[2]) is False
+
+    second.clear()
+    assert first.state(memory_ids[1]) is None
+    assert len(first) == 0
@@ -0,0 +1,52 @@
+"""Prometheus metrics: route labels, stage timings, executor queues and cache counters."""
+import uuid
+
+from prometheus_client.parser import text_string_to_metric_families
+
+
+def scrape(client) -> dict:
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.text)
+        for sample in family.samples
+    }
+
+
+def samples(metrics: dict, name: str) -> dict:
+    return {labels: value for (sample, labels), value in metrics.items() if sample == name}
+
+
+def test_requests_are_labelled_by_route_template(client):
+    memory_ids = [str(uuid.uuid4()) for _ in range(2)]
+    for memory_id in memory_ids:
+        client.get(f"/retrieve/{memory_id}")
+    client.get("/no-such-route")
+
+    requests = samples(scrape(client), "mem0_api_requests_total")
+    routes = {dict(labels)["route"] for labels in requests}
+    assert "/retrieve/{memory_id}" in routes
+    assert "unmatched" in routes
+    assert not any(memory_id in route for route in routes for memory_id in memory_ids)
+    latency = samples(scrape(client), "mem0_api_request_duration_seconds_count")
+    assert latency[(("method", "GET"), ("route", "/retrieve/{memory_id}"))] >= 2
+
+
+def test_executor_queues_and_cache_counters_are_exported(client):
+    user_id = str(uuid.uuid4())
+    client.post("/store", json={"data": "likes green tea", "user_id": user_id, "infer": False})
+    for _ in range(2):
+        client.post("/search", json={"query": "green tea", "user_id": user_id})
+
+    metrics = scrape(client)
+    queued = samples(metrics, "mem0_api_executor_queued")
+    assert {dict(labels)["pool"] for labels in queued} >= {"write", "search", "admin"}
+    assert samples(metrics, "mem0_api_executor_max_workers")[(("pool", "search"),)] > 0
+    hits = {dict(labels)["cache"]: value for labels, value in samples(metrics, "mem0_api_cache_hits_total").items()}
+    assert hits["results"] >= 1
+    assert "embedding" in hits
+    stages = {dict(labels)["stage"] for labels in samples(metrics, "mem0_api_stage_duration_seconds_count")}
+    assert {"embed", "vector_store"} <= stages
+    rates = {dict(labels)["cache"]: value for labels, value in samples(metrics, "mem0_api_cache_hit_rate").items()}
+    assert 0 < rates["results"] <= 1
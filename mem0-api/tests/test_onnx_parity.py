@@ -0,0 +1,64 @@
+"""Parity of the ONNX Runtime embedder with the PyTorch sentence-transformers model.
+
+Needs torch, sentence-transformers, onnxruntime and either access to the Hugging Face Hub
+or a local export in EMBEDDING_ONNX_PATH; the tests are skipped otherwise.
+"""
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+sentence_transformers = pytest.importorskip("sentence_transformers")
+
+from onnx_embedder import OnnxSentenceEncoder, resolve_model_dir  # noqa: E402
+
+MODEL = os.environ.get("EMBEDDING_MODEL", "multi-qa-MiniLM-L6-cos-v1")
+
+TEXTS = [
+    "I like green tea in the morning.",
+    "The user asked about improving code performance.",
+    "My daughter's birthday is on the 3rd of March and she loves dinosaurs.",
+    "Short",
+    "用户喜欢在周末去爬山。",
+    " ".join(["A very long memory that goes past the model's maximum sequence length."] * 40),
+]
+
+
+@pytest.fixture(scope="module")
+def model_dir():
+    try:
+        return resolve_model_dir(MODEL, os.environ.get("EMBEDDING_ONNX_PATH"))
+    except Exception as e:
+        pytest.skip(f"ONNX export of {MODEL} is not available: {e}")
+
+
+@pytest.fixture(scope="module")
+def reference():
+    model = sentence_transformers.SentenceTransformer(MODEL, device="cpu")
+    return model.encode(TEXTS, convert_to_numpy=True)
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def test_onnx_matches_pytorch(model_dir, reference):
+    encoder = OnnxSentenceEncoder(model_dir)
+    embeddings = encoder.encode(TEXTS, batch_size=4)
+    assert embeddings.shape == reference.shape
+    assert cosine(embeddings, reference).min() > 0.9999
+
+
+def test_quantized_onnx_stays_close_to_pytorch(model_dir, reference):
+    encoder = OnnxSentenceEncoder(model_dir, quantize=True, threads=1)
+    embeddings = encoder.encode(TEXTS, batch_size=4)
+    assert cosine(embeddings, reference).min() > 0.98
+
+
+def test_single_text_matches_batch(model_dir):
+    encoder = OnnxSentenceEncoder(model_dir)
+    batch = encoder.encode(TEXTS, batch_size=len(TEXTS))
+    for text, expected in zip(TEXTS, batch):
+        np.testing.assert_allclose(encoder.encode(text), expected, atol=1e-5)
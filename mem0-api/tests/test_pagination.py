@@ -0,0 +1,52 @@
+"""Cursor pagination and NDJSON streaming of /retrieve."""
+import json
+import uuid
+
+import pytest
+
+from retrieval import parse_cursor
+
+
+def test_parse_cursor():
+    memory_id = str(uuid.uuid4())
+    assert parse_cursor(None) is None
+    assert parse_cursor("42") == 42
+    assert parse_cursor(memory_id.upper()) == memory_id
+    with pytest.raises(ValueError):
+        parse_cursor("not-a-cursor")
+
+
+@pytest.fixture(scope="module")
+def user_id(client):
+    user_id = str(uuid.uuid4())
+    for i in range(5):
+        response = client.post("/store", json={"data": f"page fact {i}", "user_id": user_id, "infer": False})
+        assert response.status_code == 200, response.text
+    return user_id
+
+
+def test_pages_cover_every_memory_once(client, user_id):
+    memories, cursor = [], None
+    while True:
+        params = {"user_id": user_id, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/retrieve", params=params).json()["data"]
+        assert len(page["results"]) <= 2
+        memories += [memory["memory"] for memory in page["results"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert sorted(memories) == [f"page fact {i}" for i in range(5)]
+
+
+def test_stream_returns_every_memory(client, user_id):
+    response = client.get("/retrieve", params={"user_id": user_id, "limit": 2, "stream": True})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["memory"] for line in lines) == [f"page fact {i}" for i in range(5)]
+
+
+def test_invalid_cursor_is_rejected(client, user_id):
+    for stream in (False, True):
+        response = client.get("/retrieve", params={"user_id": user_id, "cursor": "nope", "stream": stream})
+        assert response.status_code == 422
+        assert response.json()["error"] == "InvalidCursorError"
@@ -0,0 +1,22 @@
+"""PAYLOAD_INDEX_FILTER_POLICY on /search and /search/batch."""
+from mem0_config import payload_index_config
+
+
+def test_rejected_filters_return_422(client, monkeypatch):
+    monkeypatch.setitem(payload_index_config, "filter_policy", "reject")
+    search = {"query": "tea", "user_id": "policy", "filters": {"category": "drinks"}}
+
+    response = client.post("/search", json=search)
+    assert response.status_code == 422
+    assert response.json()["error"] == "UnindexedFilterError"
+    assert "category" in response.json()["message"]
+
+    response = client.post("/search/batch", json={"searches": [search]})
+    assert response.json()["data"][0]["error"] == "UnindexedFilterError"
+
+
+def test_indexed_filters_are_allowed(client, monkeypatch):
+    monkeypatch.setitem(payload_index_config, "filter_policy", "reject")
+    response = client.post("/search", json={"query": "tea", "user_id": "policy"})
+    assert response.status_code == 200
+    assert response.json()["code"] == 0
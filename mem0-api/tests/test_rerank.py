@@ -0,0 +1,44 @@
+"""Reranking: maximal marginal relevance and the cross-encoder score cache."""
+import numpy as np
+
+import rerank
+from rerank import CrossEncoderReranker, mmr
+
+
+def test_mmr_prefers_diverse_results():
+    query = [1.0, 0.0, 0.0]
+    vectors = [
+        [1.0, 0.1, 0.0],
+        [1.0, 0.11, 0.0],  # near copy of the first
+        [0.8, 0.0, 0.6],
+    ]
+    # Relevance alone picks the near copy second
+    assert mmr(query, vectors, 3, lambda_=1.0) == [0, 1, 2]
+    assert mmr(query, vectors, 2, lambda_=0.5) == [0, 2]
+    assert mmr(query, vectors, 10, lambda_=0.5) == [0, 2, 1]
+    assert mmr(query, [], 3, 0.5) == []
+
+
+def test_mmr_does_not_modify_its_input():
+    vectors = np.array([[3.0, 4.0], [1.0, 0.0]], dtype=np.float32)
+    mmr([1.0, 0.0], vectors, 2, 0.7)
+    assert vectors.tolist() == [[3.0, 4.0], [1.0, 0.0]]
+
+
+class FakeCrossEncoder:
+    def __init__(self):
+        self.pairs = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.pairs.extend(pairs)
+        return [float(len(text)) for _, text in pairs]
+
+
+def test_cross_encoder_scores_are_cached(monkeypatch):
+    model = FakeCrossEncoder()
+    monkeypatch.setattr(rerank, "load_cross_encoder", lambda name: model)
+    reranker = CrossEncoderReranker("fake", cache_size=100)
+    assert reranker.score([("q", "a"), ("q", "bbb")]) == [1.0, 3.0]
+    assert reranker.score([("q", "bbb"), ("q", "cc"), ("other", "a")]) == [3.0, 2.0, 1.0]
+    assert model.pairs == [("q", "a"), ("q", "bbb"), ("q", "cc"), ("other", "a")]
+    assert reranker.stats()["hits"] == 1
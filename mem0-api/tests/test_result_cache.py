@@ -0,0 +1,71 @@
+"""ScopedResultCache: scope invalidation, namespaces and invalidations shared between processes."""
+import pytest
+
+from cache import LocalScopeGenerations, NamespacedResultCache, ScopedResultCache, SharedScopeGenerations
+
+
+@pytest.fixture(params=["local", "shared"])
+def generations(request, tmp_path):
+    if request.param == "local":
+        return LocalScopeGenerations()
+    return SharedScopeGenerations(str(tmp_path / "generations.db"))
+
+
+def cache_result(cache, key, value, **ids):
+    scopes = cache.scopes(**ids)
+    cache.set(key, value, scopes, cache.generation(scopes))
+
+
+def test_writes_invalidate_their_scopes_only(generations):
+    cache = ScopedResultCache(100, generations=generations)
+    cache_result(cache, "alice", ["a"], user_id="alice")
+    cache_result(cache, "bob", ["b"], user_id="bob")
+    cache_result(cache, "everyone", ["a", "b"])
+
+    cache.invalidate(user_id="alice", agent_id="helper")
+    assert cache.get("alice") is None
+    assert cache.get("bob") == ["b"]
+    # Queries without scope ids depend on every write
+    assert cache.get("everyone") is None
+    assert cache.stats()["stale"] == 2
+
+
+def test_result_computed_before_a_write_is_not_served(generations):
+    cache = ScopedResultCache(100, generations=generations)
+    scopes = cache.scopes(user_id="alice")
+    generation = cache.generation(scopes)
+    cache.invalidate(user_id="alice")
+    cache.set("alice", ["old"], scopes, generation)
+    assert cache.get("alice") is None
+
+
+def test_clear(generations):
+    cache = ScopedResultCache(100, generations=generations)
+    cache_result(cache, "alice", ["a"], user_id="alice")
+    cache.clear()
+    assert cache.get("alice") is None
+
+
+def test_namespaces_are_kept_apart(generations):
+    cache = ScopedResultCache(100, generations=generations)
+    tenant_a, tenant_b = NamespacedResultCache(cache, "a"), NamespacedResultCache(cache, "b")
+    cache_result(tenant_a, "alice", ["a"], user_id="alice")
+    cache_result(tenant_b, "alice", ["b"], user_id="alice")
+    assert tenant_a.get("alice") == ["a"]
+    tenant_b.invalidate(user_id="alice")
+    assert tenant_a.get("alice") == ["a"]
+    assert tenant_b.get("alice") is None
+
+
+def test_writes_in_one_process_invalidate_the_others(tmp_path):
+    path = str(tmp_path / "generations.db")
+    first = ScopedResultCache(100, generations=SharedScopeGenerations(path))
+    second = ScopedResultCache(100, generations=SharedScopeGenerations(path))
+    cache_result(first, "alice", ["a"], user_id="alice")
+    cache_result(first, "bob", ["b"], user_id="bob")
+
+    second.invalidate(user_id="alice")
+    assert first.get("alice") is None
+    assert first.get("bob") == ["b"]
+    second.clear()
+    assert first.get("bob") is None
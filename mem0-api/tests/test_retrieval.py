@@ -0,0 +1,67 @@
+"""Search result post-processing: expiry, recency weighting and rank fusion."""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from retrieval import age_results, fuse_ranks
+
+NOW = datetime(2026, 1, 31, tzinfo=timezone.utc)
+
+
+def memory(memory_id, score, age_days, **metadata):
+    return {
+        "id": memory_id,
+        "score": score,
+        "created_at": (NOW - timedelta(days=age_days)).isoformat(),
+        "metadata": metadata or None,
+    }
+
+
+def ranked(results):
+    return [(memory["id"], round(memory["score"], 3)) for memory in results["results"]]
+
+
+def test_expired_memories_are_dropped():
+    result = {"results": [
+        memory("live", 0.9, 1, expires_at=(NOW + timedelta(hours=1)).isoformat()),
+        memory("expired", 0.8, 1, expires_at=(NOW - timedelta(hours=1)).isoformat()),
+        memory("forever", 0.7, 1),
+    ]}
+    assert [memory["id"] for memory in age_results(result, now=NOW)["results"]] == ["live", "forever"]
+
+
+def test_half_life_weights_scores_by_age():
+    result = {"results": [memory("old", 0.8, 30), memory("new", 0.6, 0)]}
+    assert ranked(age_results(result, 30, NOW)) == [("new", 0.6), ("old", 0.4)]
+    # Without a half-life, scores and order are unchanged
+    assert ranked(age_results(result, 0, NOW)) == [("old", 0.8), ("new", 0.6)]
+
+
+def test_age_lowers_negative_scores_too():
+    # Cross-encoder logits are often negative: older memories must still rank lower
+    result = {"results": [memory("old", -1.0, 30), memory("new", -1.0, 0), memory("older", -1.0, 60)]}
+    assert ranked(age_results(result, 30, NOW)) == [("new", -1.0), ("old", -2.0), ("older", -4.0)]
+    result = {"results": [memory("old", 0.5, 60), memory("new", -0.5, 0)]}
+    assert ranked(age_results(result, 30, NOW)) == [("old", 0.125), ("new", -0.5)]
+
+
+def points(*ids):
+    return [SimpleNamespace(id=point_id) for point_id in ids]
+
+
+def test_fuse_ranks_sums_weighted_reciprocal_ranks():
+    fused = fuse_ranks([(points("a", "b", "c"), 1.0), (points("c", "b"), 1.0)], k=60)
+    assert [(point.id, round(score, 5)) for point, score in fused] == [
+        ("c", round(1 / 63 + 1 / 61, 5)),
+        ("b", round(2 / 62, 5)),
+        ("a", round(1 / 61, 5)),
+    ]
+
+
+def test_fuse_ranks_weights_and_matches_ids_across_types():
+    vector, keyword = points("a", "b"), points("b", "a")
+    # The keyword ranking counts twice, so its order wins
+    assert [point.id for point, _ in fuse_ranks([(vector, 1.0), (keyword, 2.0)], k=1)] == ["b", "a"]
+    # Ids are compared as strings, and the first ranking's point is kept
+    fused = fuse_ranks([(points(1), 1.0), (points("1"), 1.0)], k=60)
+    assert len(fused) == 1 and fused[0][0].id == 1
+    assert fuse_ranks([], k=60) == []
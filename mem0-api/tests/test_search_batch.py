@@ -0,0 +1,79 @@
+"""POST /search/batch: several searches in one request, one embedding batch and one Qdrant request."""
+import pytest
+
+from mem0_config import batch_config
+
+
+@pytest.fixture(scope="module")
+def facts(client):
+    for user_id, text in (("batch-a", "likes green tea"), ("batch-a", "works in Berlin"), ("batch-b", "plays chess")):
+        response = client.post("/store", json={"data": text, "user_id": user_id, "infer": False})
+        assert response.status_code == 200
+
+
+class Counting:
+    def __init__(self, function):
+        self.function = function
+        self.calls = []
+
+    def __call__(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        return self.function(*args, **kwargs)
+
+
+def test_results_match_single_searches_in_order(client, mem0, facts, monkeypatch):
+    searches = [
+        {"query": "tea", "user_id": "batch-a", "limit": 1},
+        {"query": "chess", "user_id": "batch-b"},
+        {"query": "city", "user_id": "batch-a"},
+    ]
+    expected = [client.post("/search", json=search).json()["data"] for search in searches]
+
+    embed_batch = Counting(mem0.embedding_model.embed_batch)
+    search_batch = Counting(mem0.vector_store.client.search_batch)
+    monkeypatch.setattr(mem0.embedding_model, "embed_batch", embed_batch)
+    monkeypatch.setattr(mem0.vector_store.client, "search_batch", search_batch)
+    # rerank="none" keeps these out of the result cache entries the single searches made
+    response = client.post("/search/batch", json={"searches": [dict(search, rerank="none") for search in searches]})
+    assert response.status_code == 200
+    results = [result["data"] for result in response.json()["data"]]
+
+    def memories(result):
+        return [memory["memory"] for memory in result["results"]]
+
+    assert [memories(result) for result in results] == [memories(result) for result in expected]
+    assert memories(results[0]) == ["likes green tea"]
+    assert memories(results[1]) == ["plays chess"]
+    assert len(embed_batch.calls) == 1
+    assert embed_batch.calls[0][0][0] == ["tea", "chess", "city"]
+    assert len(search_batch.calls) == 1
+    assert len(search_batch.calls[0][1]["requests"]) == 3
+
+
+def test_invalid_searches_fail_on_their_own(client, facts):
+    response = client.post("/search/batch", json={"searches": [
+        {"query": "tea"},
+        {"query": "chess", "user_id": "batch-b", "rerank": "none"},
+    ]})
+    assert response.status_code == 200
+    invalid, valid = response.json()["data"]
+    assert invalid["code"] == 422
+    assert invalid["error"] == "ValueError"
+    assert valid["code"] == 0
+    assert [memory["memory"] for memory in valid["data"]["results"]] == ["plays chess"]
+
+
+def test_repeated_searches_are_served_from_the_cache(client, mem0, facts, monkeypatch):
+    search = {"query": "berlin", "user_id": "batch-a", "rerank": "none"}
+    first = client.post("/search/batch", json={"searches": [search]}).json()["data"]
+
+    search_batch = Counting(mem0.vector_store.client.search_batch)
+    monkeypatch.setattr(mem0.vector_store.client, "search_batch", search_batch)
+    assert client.post("/search/batch", json={"searches": [search]}).json()["data"] == first
+    assert search_batch.calls == []
+
+
+def test_batch_size_is_limited(client):
+    searches = [{"query": "tea", "user_id": "batch-a"}] * (batch_config["search_max_queries"] + 1)
+    assert client.post("/search/batch", json={"searches": searches}).status_code == 422
+    assert client.post("/search/batch", json={"searches": []}).status_code == 422
@@ -0,0 +1,93 @@
+"""Models shared between gunicorn workers and the serialized components they run with."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import sentence_transformers
+
+import shared_models
+from components import SerializedComponent
+
+
+class SlowModel:
+    loaded = 0
+
+    def __init__(self, model_name, **kwargs):
+        SlowModel.loaded += 1
+        time.sleep(0.05)
+        self.model_name = model_name
+
+    def eval(self):
+        pass
+
+
+def test_concurrent_loads_share_one_model(monkeypatch):
+    SlowModel.loaded = 0
+    monkeypatch.setattr(shared_models, "_models", {})
+    monkeypatch.setattr(sentence_transformers, "SentenceTransformer", SlowModel)
+    started = threading.Barrier(8)
+
+    def load(_):
+        started.wait()
+        return shared_models.load_sentence_transformer("model")
+
+    with ThreadPoolExecutor(8) as pool:
+        models = list(pool.map(load, range(8)))
+    assert SlowModel.loaded == 1
+    assert len({id(model) for model in models}) == 1
+    # Other model kwargs are another model
+    assert shared_models.load_sentence_transformer("model", {"device": "cpu"}) is not models[0]
+
+
+def test_preload_skips_models_workers_load_themselves(monkeypatch):
+    loaded = []
+    monkeypatch.setattr(shared_models, "load_sentence_transformer", lambda *args: loaded.append(args))
+
+    shared_models.preload_embedding_model({"provider": "openai", "config": {"model": "text-embedding-3-small"}})
+    shared_models.preload_embedding_model(
+        {"provider": "huggingface", "config": {"model": "model", "model_kwargs": {"backend": "onnx"}}}
+    )
+    assert loaded == []
+    shared_models.preload_embedding_model({"provider": "huggingface", "config": {}})
+    assert loaded == [(shared_models.DEFAULT_MODEL, None)]
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self.inside = 0
+        self.overlapped = False
+
+    def increment(self):
+        self.inside += 1
+        self.overlapped |= self.inside > 1
+        value = self.value
+        time.sleep(0.001)
+        self.value = value + 1
+        self.inside -= 1
+
+    def peek(self):
+        return self.value
+
+
+def test_serialized_component_runs_one_call_at_a_time():
+    counter = Counter()
+    serialized = SerializedComponent(counter, ["increment"])
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: serialized.increment(), range(80)))
+    assert counter.value == 80
+    assert not counter.overlapped
+
+
+def test_serialized_component_only_locks_the_listed_methods():
+    counter = Counter()
+    serialized = SerializedComponent(counter, ["increment"])
+    with serialized.lock:
+        # The lock is reentrant, and unlisted methods don't wait for it
+        serialized.increment()
+        result = []
+        reader = threading.Thread(target=lambda: result.append(serialized.peek()))
+        reader.start()
+        reader.join(timeout=1)
+        assert result == [1]
+    assert serialized.wrapped is counter
@@ -0,0 +1,153 @@
+"""Tenant resolution, the LRU pool of per-tenant instances and the closing of evicted ones."""
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+import dependencies
+from components import find_component
+from conftest import STATE_DIR
+from memory_index import IndexedVectorStore
+from mem0_config import tenancy_config
+
+from tenancy import (
+    InvalidTenantError, RequestScopeMiddleware, TenantPool, collection_tenants, hold_for_request, parse_tenant_tokens,
+    resolve_tenant, tenant_collection, tenant_path
+)
+
+
+def test_resolve_tenant():
+    tokens = parse_tenant_tokens("t1:acme, t2:globex")
+    assert resolve_tenant("header", "acme", None, tokens) == "acme"
+    assert resolve_tenant("header", None, None, tokens) is None
+    assert resolve_tenant("token", None, "t2", tokens) == "globex"
+    assert resolve_tenant("off", "acme", "t1", tokens) is None
+    with pytest.raises(InvalidTenantError):
+        resolve_tenant("header", "../etc", None, tokens)
+    assert tenant_path("/data/index.db", "acme") == "/data/index_acme.db"
+
+
+def test_collection_tenants():
+    collections = [tenant_collection("mem0", tenant) for tenant in (None, "acme", "globex-2")] + ["other", "mem0_a.b"]
+    assert collection_tenants("mem0", collections) == ["acme", "globex-2"]
+
+
+def test_pool_evicts_the_least_recently_used_tenant():
+    evicted = []
+    pool = TenantPool(lambda tenant: object(), max_size=2, on_evict=lambda tenant, value: evicted.append(tenant))
+    a = pool.get("a")
+    pool.get("b")
+    assert pool.get("a") is a
+    pool.get("c")
+    assert evicted == ["b"]
+    assert pool.tenants() == ["a", "c"]
+    assert pool.peek("b") is None
+    assert pool.peek("a") is a
+
+
+def test_pool_builds_a_tenant_once():
+    built = []
+    release = threading.Event()
+
+    def factory(tenant):
+        built.append(tenant)
+        release.wait(1)
+        return object()
+
+    pool = TenantPool(factory, max_size=4)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.get("a"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert built == ["a"]
+    assert len({id(result) for result in results}) == 1
+
+
+def test_evicted_objects_are_closed_once_released():
+    closed = []
+    pool = TenantPool(lambda tenant: object(), max_size=1, close=lambda tenant, value: closed.append(tenant))
+    with pool.hold("a"):
+        pool.get("a")
+        with pool.hold("b"):
+            pool.get("b")
+        # Evicted while held: closed when the hold ends
+        assert closed == []
+    assert closed == ["a"]
+    pool.get("c")
+    assert closed == ["a", "b"]
+
+
+def test_request_holds_last_until_the_streamed_response_ends():
+    events = []
+
+    @contextmanager
+    def held():
+        events.append("hold")
+        yield
+        events.append("release")
+
+    async def stream(request):
+        hold_for_request(held())
+
+        def body():
+            for chunk in ("a", "b"):
+                events.append(chunk)
+                yield chunk
+
+        return StreamingResponse(body())
+
+    app = Starlette(routes=[Route("/", stream)])
+    app.add_middleware(RequestScopeMiddleware)
+    assert TestClient(app).get("/").text == "ab"
+    assert events == ["hold", "a", "b", "release"]
+
+
+def test_evicted_tenant_instances_are_closed(client, mem0, monkeypatch):
+    from mem0 import Memory
+
+    def create_memory(tenant=None):
+        return Memory.from_config({
+            "vector_store": {"provider": "qdrant", "config": {
+                "client": mem0.vector_store.client.wrapped,
+                "collection_name": tenant_collection("bench", tenant),
+                "embedding_model_dims": 384,
+            }},
+            "llm": {"provider": "openai", "config": {"api_key": "test"}},
+            "embedder": {"provider": "huggingface", "config": {"model": "stub"}},
+            "history_db_path": tenant_path(os.path.join(STATE_DIR, "history.db"), tenant),
+            "version": "v1.1",
+        })
+
+    monkeypatch.setattr(dependencies, "create_memory", create_memory)
+    monkeypatch.setitem(tenancy_config, "mode", "header")
+    pool = dependencies.get_tenant_pool()
+    monkeypatch.setattr(pool, "max_size", 1)
+    first, second = "close" + uuid.uuid4().hex[:8], "close" + uuid.uuid4().hex[:8]
+
+    def store(tenant):
+        response = client.post(
+            "/store", json={"data": "likes tea", "user_id": "u1", "infer": False}, headers={"X-Tenant-ID": tenant}
+        )
+        assert response.status_code == 200, response.text
+
+    store(first)
+    evicted = pool.peek(first)
+    index = find_component(evicted.vector_store, IndexedVectorStore).index
+    store(second)
+    assert pool.peek(first) is None
+    assert index._file.closed
+    with pytest.raises(sqlite3.ProgrammingError):
+        evicted.db.connection.execute("SELECT 1")
+    # The shared client of the default instance stays open
+    assert mem0.vector_store.client.get_collections() is not None
+    store(first)
@@ -0,0 +1,89 @@
+"""The tuned Qdrant vector store: gRPC transport, collection settings and search parameters."""
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+import tuned_qdrant
+from mem0_config import qdrant_tuning_config
+from tuned_qdrant import TunedQdrant, quantization_config, search_params
+
+# In-memory Qdrant always reports these HNSW settings, whatever a collection was created with
+DEFAULTS = dict(qdrant_tuning_config, prefer_grpc=False, hnsw_m=16, hnsw_ef_construct=100, hnsw_ef=0,
+                on_disk_vectors=False, quantization="none")
+
+
+class RecordingClient(QdrantClient):
+    """In-memory Qdrant that records how it was built and the collection changes it was sent."""
+
+    def __init__(self, **params):
+        super().__init__(":memory:")
+        self.params = params
+        self.created = []
+        self.updated = []
+
+    def create_collection(self, collection_name, **kwargs):
+        self.created.append(kwargs)
+        return super().create_collection(collection_name, **kwargs)
+
+    def update_collection(self, collection_name, **kwargs):
+        self.updated.append(kwargs)
+        return super().update_collection(collection_name, **kwargs)
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    settings = dict(DEFAULTS)
+    monkeypatch.setattr(tuned_qdrant, "_settings", settings)
+    return settings
+
+
+def test_quantization_and_search_params():
+    assert quantization_config(DEFAULTS) is None
+    assert search_params(DEFAULTS) is None
+    scalar = dict(DEFAULTS, quantization="scalar", hnsw_ef=64)
+    assert quantization_config(scalar).scalar.type == models.ScalarType.INT8
+    params = search_params(scalar)
+    assert params.hnsw_ef == 64
+    assert (params.quantization.rescore, params.quantization.oversampling) == (True, 2.0)
+    assert search_params(dict(scalar, rescore=False)).quantization.oversampling is None
+    assert isinstance(quantization_config(dict(DEFAULTS, quantization="binary")), models.BinaryQuantization)
+    with pytest.raises(ValueError):
+        quantization_config(dict(DEFAULTS, quantization="product"))
+
+
+def test_grpc_client_is_used_when_preferred(settings, monkeypatch):
+    monkeypatch.setattr(tuned_qdrant, "QdrantClient", RecordingClient)
+    settings.update(prefer_grpc=True, grpc_port=6334)
+    store = TunedQdrant("grpc", 4, host="qdrant", port=6333)
+    assert store.client.params == {"host": "qdrant", "port": 6333, "api_key": None, "prefer_grpc": True, "grpc_port": 6334}
+    store = TunedQdrant("grpc", 4, url="http://qdrant:6333", api_key="key")
+    assert store.client.params == {"url": "http://qdrant:6333", "api_key": "key", "prefer_grpc": True, "grpc_port": 6334}
+
+
+def test_new_collections_are_created_with_the_settings(settings):
+    settings.update(hnsw_m=32, hnsw_ef_construct=200, on_disk_vectors=True, quantization="scalar", hnsw_ef=128)
+    client = RecordingClient()
+    store = TunedQdrant("tuned", 4, client=client)
+    [created] = client.created
+    assert created["vectors_config"] == models.VectorParams(size=4, distance=models.Distance.COSINE, on_disk=True)
+    assert created["hnsw_config"] == models.HnswConfigDiff(m=32, ef_construct=200)
+    assert created["quantization_config"] == quantization_config(settings)
+    assert store.search_params.hnsw_ef == 128
+    assert client.updated == []
+
+
+def test_existing_collections_are_updated_when_the_settings_differ(settings):
+    client = RecordingClient()
+    TunedQdrant("existing", 4, client=client)
+    # Same settings: nothing to change
+    TunedQdrant("existing", 4, client=client)
+    assert len(client.created) == 1
+    assert client.updated == []
+
+    settings.update(hnsw_m=32, quantization="binary", on_disk_vectors=True)
+    TunedQdrant("existing", 4, client=client)
+    assert len(client.created) == 1
+    [updated] = client.updated
+    assert updated["hnsw_config"] == models.HnswConfigDiff(m=32, ef_construct=100)
+    assert updated["quantization_config"] == quantization_config(settings)
+    assert updated["vectors_config"] == {"": models.VectorParamsDiff(on_disk=True)}
@@ -0,0 +1,72 @@
+"""UpdateBuffer: coalescing, retries and dead letters, and applying updates in bulk."""
+import uuid
+
+import pytest
+from qdrant_client.http import models
+
+import dependencies
+from update_buffer import UpdateBuffer, apply_updates
+
+
+@pytest.fixture
+def buffer(tmp_path):
+    return UpdateBuffer(str(tmp_path / "updates.db"), lease_seconds=0, max_attempts=2)
+
+
+def test_last_update_of_a_memory_wins(buffer):
+    applied = []
+    buffer._apply = lambda tenant, updates: applied.append((tenant, updates))
+    buffer.submit(None, "m1", "first")
+    buffer.submit(None, "m1", "second")
+    buffer.submit("acme", "m1", "other tenant")
+    assert buffer.flush() == 2
+    assert sorted(applied, key=str) == [("acme", [("m1", "other tenant")]), (None, [("m1", "second")])]
+    assert buffer.pending() == 0
+
+
+def test_failing_update_is_isolated_and_given_up(buffer):
+    applied = []
+
+    def apply(tenant, updates):
+        if any(memory_id == "bad" for memory_id, _ in updates):
+            raise RuntimeError("broken")
+        applied.extend(updates)
+
+    buffer._apply = apply
+    buffer.submit(None, "good", "ok")
+    buffer.submit(None, "bad", "fails")
+    # With no lease, the failed update is retried right away until it is given up on
+    assert buffer.flush() == 1
+    assert applied == [("good", "ok")]
+    assert buffer.pending() == 0
+    assert buffer.failed() == 1
+    assert buffer.connection.execute("SELECT memory_id, error FROM failed_updates").fetchall() == [("bad", "broken")]
+
+
+def store(client, text, **metadata):
+    response = client.post("/store", json={"data": text, "user_id": "buffer", "infer": False, "metadata": metadata})
+    return response.json()["data"]["results"][0]["id"]
+
+
+def test_apply_updates_keeps_metadata(client, mem0):
+    memory_id = store(client, "likes green tea", source="chat")
+    (payload,) = apply_updates(mem0, [(memory_id, "likes black tea"), (str(uuid.uuid4()), "deleted meanwhile")])
+    stored = mem0.vector_store.get(vector_id=memory_id).payload
+    assert stored == payload
+    assert stored["data"] == "likes black tea"
+    assert stored["source"] == "chat" and stored["user_id"] == "buffer"
+    assert [row["new_memory"] for row in mem0.history(memory_id)] == ["likes green tea", "likes black tea"]
+
+
+def test_update_of_a_deleted_memory_is_not_queued(client, mem0, buffer, monkeypatch):
+    monkeypatch.setattr(dependencies, "_update_buffer", buffer)
+    memory_id = store(client, "about to disappear")
+    assert client.put(f"/update/{memory_id}", json={"data": "still here"}).status_code == 200
+    assert buffer.pending() == 1
+    # Deleted behind the service's back, so its memory index still lists the memory
+    mem0.vector_store.client.delete(
+        collection_name=mem0.vector_store.collection_name, points_selector=models.PointIdsList(points=[memory_id])
+    )
+    buffer.discard(None, memory_id)
+    assert client.put(f"/update/{memory_id}", json={"data": "gone"}).status_code == 404
+    assert buffer.pending() == 0
@@ -0,0 +1,69 @@
+"""Warm-up at startup: retries, the readiness probe and building Memory once."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import dependencies
+from warmup import Readiness, warm_up
+
+
+def test_warm_up_retries_until_it_succeeds():
+    calls = []
+
+    def warm_up_components():
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            raise ConnectionError("qdrant is not up yet")
+
+    readiness = Readiness()
+    asyncio.run(warm_up(readiness, warm_up_components, initial_delay=0.01, max_delay=0.02))
+    status = readiness.status()
+    assert len(calls) == 3
+    assert status["status"] == "ready"
+    assert status["attempts"] == 2
+    assert status["last_error"] is None
+
+
+def test_readiness_probe_waits_for_the_warm_up(client, monkeypatch):
+    import app
+
+    readiness = Readiness()
+    readiness.mark_failed(ConnectionError("qdrant is not up yet"))
+    monkeypatch.setattr(app, "readiness", readiness)
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["error"] == "ServiceStarting"
+    assert response.json()["details"]["last_error"] == "qdrant is not up yet"
+    # Liveness doesn't depend on the warm-up
+    assert client.get("/health/live").status_code == 200
+
+    readiness.mark_ready()
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["data"]["status"] == "ready"
+
+
+def test_concurrent_first_calls_build_memory_once(monkeypatch):
+    built = []
+    started = threading.Barrier(8)
+
+    def create_memory(tenant=None):
+        built.append(tenant)
+        time.sleep(0.05)
+        return object()
+
+    monkeypatch.setattr(dependencies, "_mem0", None)
+    monkeypatch.setattr(dependencies, "create_memory", create_memory)
+    monkeypatch.setattr(dependencies, "install_components", lambda mem0, tenant=None: None)
+    for name in ("register_onnx_embedder", "register_shared_embedders", "register_tuned_qdrant"):
+        monkeypatch.setattr(dependencies, name, lambda *args: None)
+
+    def first_call(_):
+        started.wait()
+        return dependencies.get_mem0()
+
+    with ThreadPoolExecutor(8) as pool:
+        instances = list(pool.map(first_call, range(8)))
+    assert built == [None]
+    assert len({id(instance) for instance in instances}) == 1
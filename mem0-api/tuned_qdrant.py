@@ -0,0 +1,132 @@
+import logging
+from typing import Optional
+
+from mem0.vector_stores.qdrant import Qdrant
+from mem0.utils.factory import VectorStoreFactory
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+logger = logging.getLogger(__name__)
+
+# Set by `register_tuned_qdrant`, before mem0 builds the vector store
+_settings: dict = {}
+
+
+def quantization_config(settings: dict):
+    """Build the collection quantization config for "scalar" (int8, 4x smaller) or "binary" (32x smaller), or None."""
+    kind = settings["quantization"]
+    if kind == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=0.99, always_ram=settings["quantization_always_ram"]
+            )
+        )
+    if kind == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=settings["quantization_always_ram"])
+        )
+    if kind not in ("", "none"):
+        raise ValueError(f"Unknown quantization '{kind}', expected none, scalar or binary")
+    return None
+
+
+def search_params(settings: dict) -> Optional[models.SearchParams]:
+    """Build the search-time HNSW `ef` and quantization rescoring parameters, or None for Qdrant's defaults."""
+    quantization = None
+    if quantization_config(settings) is not None:
+        # Search the quantized vectors, then re-rank `oversampling * limit` candidates with the original vectors
+        quantization = models.QuantizationSearchParams(
+            rescore=settings["rescore"], oversampling=settings["oversampling"] if settings["rescore"] else None
+        )
+    if not settings["hnsw_ef"] and quantization is None:
+        return None
+    return models.SearchParams(hnsw_ef=settings["hnsw_ef"] or None, quantization=quantization)
+
+
+class TunedQdrant(Qdrant):
+    """mem0's Qdrant vector store with an optional gRPC transport and tuned collection settings.
+
+    New collections are created with the configured HNSW graph, on-disk vectors and quantization.
+    An existing collection is updated in place when its HNSW or quantization settings differ;
+    Qdrant then rebuilds its index in the background. Searches use the configured `ef` and rescoring.
+    """
+
+    def __init__(self, collection_name: str, embedding_model_dims: int, client: QdrantClient = None,
+                 host: str = None, port: int = None, path: str = None, url: str = None, api_key: str = None,
+                 on_disk: bool = False):
+        if client is None and (url or (host and port)) and _settings.get("prefer_grpc"):
+            # gRPC sends vectors as packed floats instead of JSON arrays
+            params = {"url": url} if url else {"host": host, "port": port}
+            client = QdrantClient(**params, api_key=api_key or None, prefer_grpc=True, grpc_port=_settings["grpc_port"])
+        self.search_params = search_params(_settings) if _settings else None
+        super().__init__(
+            collection_name=collection_name, embedding_model_dims=embedding_model_dims, client=client,
+            host=host, port=port, path=path, url=url, api_key=api_key, on_disk=on_disk
+        )
+
+    def create_col(self, vector_size: int, on_disk: bool, distance: models.Distance = models.Distance.COSINE):
+        if not _settings:
+            return super().create_col(vector_size, on_disk, distance)
+
+        hnsw = models.HnswConfigDiff(m=_settings["hnsw_m"], ef_construct=_settings["hnsw_ef_construct"])
+        quantization = quantization_config(_settings)
+        on_disk_vectors = _settings["on_disk_vectors"]
+        if any(collection.name == self.collection_name for collection in self.list_cols().collections):
+            self._update_col(hnsw, quantization, on_disk_vectors)
+            return
+
+        self.client.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=models.VectorParams(size=vector_size, distance=distance, on_disk=on_disk_vectors),
+            hnsw_config=hnsw,
+            quantization_config=quantization,
+        )
+
+    def _update_col(self, hnsw: models.HnswConfigDiff, quantization, on_disk_vectors: bool):
+        config = self.client.get_collection(self.collection_name).config
+        changes = {}
+        if (config.hnsw_config.m, config.hnsw_config.ef_construct) != (hnsw.m, hnsw.ef_construct):
+            changes["hnsw_config"] = hnsw
+        if config.quantization_config != quantization:
+            changes["quantization_config"] = quantization if quantization is not None else models.Disabled.DISABLED
+        vectors = config.params.vectors
+        if isinstance(vectors, models.VectorParams) and bool(vectors.on_disk) != on_disk_vectors:
+            changes["vectors_config"] = {"": models.VectorParamsDiff(on_disk=on_disk_vectors)}
+        if changes:
+            logger.info(f"Updating {', '.join(changes)} of collection {self.collection_name}")
+            self.client.update_collection(collection_name=self.collection_name, **changes)
+
+    def delete_many(self, vector_ids: list):
+        """Delete several points in one request."""
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.PointIdsList(points=vector_ids),
+            wait=True,
+        )
+
+    def update_many(self, vector_ids: list, vectors: list, payloads: list):
+        """Rewrite several points (vector and payload) in one request."""
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=[
+                models.PointStruct(id=vector_id, vector=vector, payload=payload)
+                for vector_id, vector, payload in zip(vector_ids, vectors, payloads)
+            ],
+            wait=True,
+        )
+
+    def search(self, query: list, limit: int = 5, filters: dict = None) -> list:
+        return self.client.search(
+            collection_name=self.collection_name,
+            query_vector=query,
+            query_filter=self._create_filter(filters) if filters else None,
+            limit=limit,
+            search_params=self.search_params,
+        )
+
+
+def register_tuned_qdrant(settings: dict):
+    """Make mem0 build Qdrant vector stores with the given transport and collection settings."""
+    _settings.clear()
+    _settings.update(settings)
+    VectorStoreFactory.provider_to_class["qdrant"] = f"{__name__}.TunedQdrant"
@@ -0,0 +1,295 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pytz
+from mem0 import Memory
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateBuffer:
+    """Write-ahead buffer of memory updates, applied in bulk.
+
+    `submit` appends an update to a local SQLite log and returns. A memory updated again while its
+    update is pending keeps only the latest text (last writer wins). `window` seconds after an update
+    arrives, a flusher thread claims up to `max_batch` pending updates and passes them to
+    `apply(tenant, [(memory_id, data), ...])`, once per tenant. Updates leave the log only after
+    `apply` returns, so the ones logged before a crash are applied after the restart. Claims hold a
+    lease, like jobs in the job queue, so several server processes can share the log.
+
+    When a batch fails, its updates are applied one by one to find the failing ones, which are
+    retried once their lease expires. An update failing `max_attempts` times is moved to the
+    `failed_updates` table with its error.
+    """
+
+    def __init__(self, db_path: str, window: float = 0.2, max_batch: int = 256, lease_seconds: float = 60,
+                 max_attempts: int = 3, poll_interval: float = 1.0):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.window = window
+        self.max_batch = max_batch
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        self._apply: Optional[Callable[[Optional[str], List[Tuple[str, str]]], None]] = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        with self._lock:
+            # `version` grows with every coalesced update, so a flush can tell whether a row changed meanwhile
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pending_updates (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tenant TEXT NOT NULL,
+                    memory_id TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    version INTEGER DEFAULT 0,
+                    attempts INTEGER DEFAULT 0,
+                    lease_expires_at REAL,
+                    updated_at REAL,
+                    UNIQUE (tenant, memory_id)
+                )
+            """
+            )
+            columns = {row[1] for row in self.connection.execute("PRAGMA table_info(pending_updates)")}
+            if "attempts" not in columns:
+                # Added after the first release of the buffer
+                self.connection.execute("ALTER TABLE pending_updates ADD COLUMN attempts INTEGER DEFAULT 0")
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS failed_updates (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tenant TEXT NOT NULL,
+                    memory_id TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    error TEXT,
+                    failed_at REAL
+                )
+            """
+            )
+
+    def submit(self, tenant: Optional[str], memory_id: str, data: str):
+        with self._lock:
+            self.connection.execute(
+                """
+                INSERT INTO pending_updates (tenant, memory_id, data, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (tenant, memory_id) DO UPDATE
+                SET data = excluded.data, version = version + 1, attempts = 0, updated_at = excluded.updated_at
+            """,
+                (tenant or "", memory_id, data, time.time()),
+            )
+        self._wakeup.set()
+
+    def discard(self, tenant: Optional[str], memory_id: str):
+        """Drop the pending update of a memory, e.g. because it is being deleted."""
+        with self._lock:
+            self.connection.execute(
+                "DELETE FROM pending_updates WHERE tenant = ? AND memory_id = ?", (tenant or "", memory_id)
+            )
+
+    def pending(self) -> int:
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM pending_updates").fetchone()[0]
+
+    def failed(self) -> int:
+        """Return the number of updates given up on after `max_attempts` failures."""
+        with self._lock:
+            return self.connection.execute("SELECT COUNT(*) FROM failed_updates").fetchone()[0]
+
+    def start(self, apply: Callable[[Optional[str], List[Tuple[str, str]]], None]):
+        """Start flushing with `apply`, beginning with the updates left in the log by a previous run."""
+        self._apply = apply
+        self._stopping.clear()
+        self._wakeup.set()
+        self._thread = threading.Thread(target=self._run, name="mem0-update-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """Stop the flusher and apply what is still pending."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+            self.flush()
+
+    def flush(self) -> int:
+        """Apply every claimable pending update; returns the number applied."""
+        applied = 0
+        while True:
+            rows = self._claim()
+            if not rows:
+                return applied
+            by_tenant: Dict[str, list] = {}
+            for row in rows:
+                by_tenant.setdefault(row[1], []).append(row)
+            for tenant, tenant_rows in by_tenant.items():
+                try:
+                    self._apply(tenant or None, [(memory_id, data) for _, _, memory_id, data, _ in tenant_rows])
+                except Exception as e:
+                    logger.error(f"Failed to apply {len(tenant_rows)} buffered updates: {e}")
+                    if len(tenant_rows) == 1:
+                        self._fail(tenant_rows[0], e)
+                    else:
+                        # Find the failing updates, so they don't hold back the others
+                        applied += self._apply_one_by_one(tenant, tenant_rows)
+                    continue
+                self._finish(tenant_rows)
+                applied += len(tenant_rows)
+
+    def _apply_one_by_one(self, tenant: str, rows: List[tuple]) -> int:
+        applied = 0
+        for row in rows:
+            try:
+                self._apply(tenant or None, [(row[2], row[3])])
+            except Exception as e:
+                logger.error(f"Failed to apply the buffered update of memory {row[2]}: {e}")
+                self._fail(row, e)
+                continue
+            self._finish([row])
+            applied += 1
+        return applied
+
+    def _claim(self) -> List[tuple]:
+        now = time.time()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so two processes can't claim the same updates
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.connection.execute(
+                    """
+                    SELECT id, tenant, memory_id, data, version FROM pending_updates
+                    WHERE lease_expires_at IS NULL OR lease_expires_at < ?
+                    ORDER BY id LIMIT ?
+                """,
+                    (now, self.max_batch),
+                ).fetchall()
+                if rows:
+                    self.connection.executemany(
+                        "UPDATE pending_updates SET lease_expires_at = ? WHERE id = ?",
+                        [(now + self.lease_seconds, row[0]) for row in rows],
+                    )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return rows
+
+    def _finish(self, rows: List[tuple]):
+        """Remove the applied updates, and release the rows that got a newer update while being applied."""
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                self.connection.executemany(
+                    "DELETE FROM pending_updates WHERE id = ? AND version = ?", [(row[0], row[4]) for row in rows]
+                )
+                self.connection.executemany(
+                    "UPDATE pending_updates SET lease_expires_at = NULL WHERE id = ?", [(row[0],) for row in rows]
+                )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def _fail(self, row: tuple, error: Exception):
+        """Count a failed attempt. The row stays claimed until its lease expires, then it is retried."""
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                self.connection.execute(
+                    "UPDATE pending_updates SET attempts = attempts + 1 WHERE id = ? AND version = ?", (row[0], row[4])
+                )
+                gave_up = self.connection.execute(
+                    "SELECT tenant, memory_id, data FROM pending_updates WHERE id = ? AND version = ? AND attempts >= ?",
+                    (row[0], row[4], self.max_attempts),
+                ).fetchone()
+                if gave_up is not None:
+                    self.connection.execute(
+                        "INSERT INTO failed_updates (tenant, memory_id, data, error, failed_at) VALUES (?, ?, ?, ?, ?)",
+                        (*gave_up, str(error), time.time()),
+                    )
+                    self.connection.execute("DELETE FROM pending_updates WHERE id = ?", (row[0],))
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        if gave_up is not None:
+            logger.error(f"Gave up on the buffered update of memory {row[2]} after {self.max_attempts} attempts")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            # Also poll, for updates logged by other processes and expired leases
+            if not self._wakeup.wait(self.poll_interval):
+                continue
+            self._wakeup.clear()
+            # Let more updates of the same memories arrive and be coalesced
+            self._stopping.wait(self.window)
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to flush buffered updates: {e}")
+
+
+def apply_updates(mem0: Memory, updates: List[Tuple[str, str]]) -> List[dict]:
+    """Apply (memory_id, data) updates the way `Memory.update` does, in bulk.
+
+    All texts are embedded in one batch, the points are rewritten with one Qdrant upsert and the
+    history rows are added in one transaction. Unlike `Memory.update`, the metadata stored with a
+    memory is kept. Memories deleted in the meantime are skipped.
+    Returns the new payloads.
+    """
+    vector_store = mem0.vector_store
+    points = vector_store.client.retrieve(
+        collection_name=vector_store.collection_name,
+        ids=[memory_id for memory_id, _ in updates],
+        with_payload=True,
+        with_vectors=False,
+    )
+    existing = {str(point.id): point.payload or {} for point in points}
+    updates = [(memory_id, data) for memory_id, data in updates if memory_id in existing]
+    if not updates:
+        return []
+
+    embedder = mem0.embedding_model
+    texts = [data for _, data in updates]
+    if hasattr(embedder, "embed_batch"):
+        vectors = embedder.embed_batch(texts)
+    else:
+        vectors = [embedder.embed(text) for text in texts]
+
+    updated_at = datetime.now(pytz.timezone("US/Pacific")).isoformat()
+    payloads = []
+    for memory_id, data in updates:
+        # The metadata stored with the memory (scope ids, expiry, custom fields) is kept
+        payloads.append({
+            **existing[memory_id],
+            "data": data,
+            "hash": hashlib.md5(data.encode()).hexdigest(),
+            "updated_at": updated_at,
+        })
+    # Through the wrappers, so the keyword index sees the new texts
+    vector_store.update_many([memory_id for memory_id, _ in updates], vectors, payloads)
+    with mem0.db.lock:
+        with mem0.db.connection:
+            mem0.db.connection.executemany(
+                """
+                INSERT INTO history (id, memory_id, old_memory, new_memory, event, created_at, updated_at, is_deleted)
+                VALUES (?, ?, ?, ?, 'UPDATE', ?, ?, 0)
+            """,
+                [
+                    (str(uuid.uuid4()), memory_id, existing[memory_id].get("data"), payload["data"],
+                     payload["created_at"], updated_at)
+                    for (memory_id, _), payload in zip(updates, payloads)
+                ],
+            )
+    return payloads
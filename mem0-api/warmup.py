@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Tracks whether the service finished warming up and can serve requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+
+    def mark_ready(self):
+        with self._lock:
+            self.ready = True
+            self.last_error = None
+            self.ready_at = time.time()
+
+    def mark_failed(self, error: Exception):
+        with self._lock:
+            self.attempts += 1
+            self.last_error = str(error)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "status": "ready" if self.ready else "starting",
+                "attempts": self.attempts,
+                "last_error": self.last_error,
+                "startup_seconds": (self.ready_at or time.time()) - self.started_at,
+            }
+
+
+async def warm_up(readiness: Readiness, warm_up_components: Callable[[], None],
+                  initial_delay: float = 1.0, max_delay: float = 30.0):
+    """Run `warm_up_components` in a worker thread until it succeeds, backing off exponentially.
+
+    Waiting between attempts doesn't block the event loop, so liveness checks keep answering
+    while the databases are still coming up.
+    """
+    delay = initial_delay
+    while True:
+        try:
+            start = time.perf_counter()
+            await run_in_threadpool(warm_up_components)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            readiness.mark_failed(e)
+            logger.warning(f"Warm-up attempt {readiness.attempts} failed: {e}. Retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+            continue
+        readiness.mark_ready()
+        logger.info(f"Service warmed up in {time.perf_counter() - start:.1f}s")
+        return